@@ -2,13 +2,30 @@ import streamlit as st
 import time
 
 # Import Utils
-from utils.ai_analysis import initialize_ai, analyze_resume, mock_analysis
-from utils.pdf_processor import extract_text_from_pdf
+# (startup first, so its clock covers the remaining imports; the AI client
+# library and pypdf are only loaded on first use or by the background warm-up)
+from utils.startup import record_first_render, warm_up_in_background
+from utils import metrics
+from utils.pdf_processor import extract_pages, PdfProcessingError
+from utils.incremental import analyze_revision
+from utils.history import record_analysis, upload_hash
+from utils.session_store import save_snapshot, load_snapshot, snapshot_key, current_session_id
+from utils.scheduler import session_scope
+from utils.profiling import profile_analysis, profiling_requested
+from utils.replay import RECORD_SESSIONS, record_session
+from utils.cancellation import cancellable, rerun_requested
+from utils.speculation import speculate, claim_speculation
 
 # Import Components
-from components.hero import show_hero
-from components.upload import show_upload_section
-from components.results import show_results
+from components.static import prerender_static_fragments, show_static_css, show_landing_page
+from components.upload import JOB_CATEGORIES, ANALYSIS_DEPTHS, show_upload_section
+from components.results import (
+    show_results, show_revision_changes, show_near_duplicate, show_queue_status, show_highlights, ProgressiveResults
+)
+from components.export import show_export_section
+from components.history import get_user_id, show_history_panel
+from components.batch import run_batch, load_batch, show_batch_ranking, show_deep_dive
+from components.operations import show_operations_panel
 
 # Page Config
 st.set_page_config(
@@ -18,160 +35,199 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Load Custom CSS
-def load_css():
-    with open("styles/main.css") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# Prerender the stylesheet and landing sections (cached once per process)
+prerender_static_fragments()
 
-def show_features():
-    """Display feature cards for the AI Resume Advisor"""
-    st.markdown("<div class='header-container'><h2>Why Choose Our AI Resume Analyzer?</h2></div>", unsafe_allow_html=True)
-    
-    features = [
-        {
-            "icon": "🎯",
-            "title": "Role-Specific Analysis",
-            "description": "Tailored feedback based on your target job position with specific skill gap identification."
-        },
-        {
-            "icon": "📊",
-            "title": "Resume Scoring",
-            "description": "Get a comprehensive score with breakdown of strengths and areas for improvement."
-        },
-        {
-            "icon": "🔍",
-            "title": "Hiring Manager Simulation",
-            "description": "See how a recruiter would evaluate your resume in 30 seconds."
-        },
-        {
-            "icon": "✏️",
-            "title": "Smart Rewrites",
-            "description": "Get specific examples of how to improve your resume bullets and descriptions."
-        }
-    ]
-    
-    st.markdown('<div class="features-grid">', unsafe_allow_html=True)
-    for i, feature in enumerate(features):
-        st.markdown(f"""
-        <div class="feature-card fade-in-delay-{i+1}">
-            <div class="feature-icon">{feature['icon']}</div>
-            <div class="feature-title">{feature['title']}</div>
-            <div class="feature-desc">{feature['description']}</div>
-        </div>
-        """, unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
-
-def show_stats():
-    """Display statistics to build trust"""
-    st.markdown("<h3 style='text-align: center; margin: 2rem 0;'>Our Impact</h3>", unsafe_allow_html=True)
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div class="stat-card">
-            <div class="stat-number">95%</div>
-            <div class="stat-label">Accuracy Rate</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="stat-card">
-            <div class="stat-number">50K+</div>
-            <div class="stat-label">Resumes Analyzed</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="stat-card">
-            <div class="stat-number">2.3x</div>
-            <div class="stat-label">Better Response</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown("""
-        <div class="stat-card">
-            <div class="stat-number">100%</div>
-            <div class="stat-label">ATS Compatible</div>
-        </div>
-        """, unsafe_allow_html=True)
 
-def main():
-    load_css()
-    
-    # Initialize floating elements
-    st.markdown("""
-    <div class="floating-element floating-1"></div>
-    <div class="floating-element floating-2"></div>
-    <div class="floating-element floating-3"></div>
-    """, unsafe_allow_html=True)
-    
-    # Initialize AI (silent)
-    initialize_ai()
-    
-    # Hero Section
-    show_hero()
-    
-    # Stats Section
-    show_stats()
-    
-    st.markdown("---")
-    
-    # Features Section
-    show_features()
-    
-    st.markdown("---")
-    
-    # Main Interaction Area
-    uploaded_file, selected_job, analyze_clicked = show_upload_section()
+@st.fragment
+def upload_area():
+    """
+    Upload, role and depth options. Changing an option reruns only this
+    fragment; Analyze reruns the page so the results area picks it up.
+    """
+    with metrics.thread_cpu('script_run_cpu_seconds', scope='upload'):
+        uploaded_files, selected_job, depth, analyze_clicked = show_upload_section()
+        # A single upload is extracted, scored and, where that needs no model
+        # call, analyzed while the options are picked (see utils.speculation)
+        uploaded_files = uploaded_files or []
+        speculate(
+            current_session_id(), uploaded_files[0] if len(uploaded_files) == 1 else None,
+            selected_job, depth, JOB_CATEGORIES, get_user_id()
+        )
+    if analyze_clicked:
+        st.session_state['analyze_requested'] = True
+        st.rerun()
+
+
+@st.fragment
+def results_area():
+    """
+    History, analysis and results. Widgets in here (history, export format,
+    deep-dives) rerun only this fragment; results are redrawn from the
+    session store rather than recomputed.
+    """
+    with metrics.thread_cpu('script_run_cpu_seconds', scope='results'):
+        _show_results_area()
+
+
+def _show_results_area():
+    uploaded_files = st.session_state.get('resume_files') or []
+    selected_job = st.session_state.get('target_role', JOB_CATEGORIES[0])
+    depth = st.session_state.get('analysis_depth', ANALYSIS_DEPTHS[0])
+    analyze_clicked = st.session_state.pop('analyze_requested', False)
+    # One resume gets the full analysis; several are ranked as a batch
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+    batch_upload = len(uploaded_files) > 1
+    batch = load_batch(uploaded_files, selected_job) if batch_upload and not analyze_clicked else None
+    
+    # Previous analyses of this user, loaded from the history store
+    user_id = get_user_id()
+    if analyze_clicked:
+        st.session_state.pop('history_selection', None)
+    history_snapshot = show_history_panel(user_id)
     
     # Logic Handling
-    if uploaded_file and analyze_clicked:
-        # Spinner with modern text
-        with st.spinner(">> Scanning Document... [AI Analysis In Progress]"):
+    if batch_upload and analyze_clicked:
+        # Scored locally and ranked as each resume finishes; the model is
+        # only asked for deep-dives on request
+        batch = run_batch(uploaded_files, selected_job)
+        show_deep_dive(batch)
+
+    elif batch:
+        # Reruns (e.g. a deep-dive request) redraw the stored ranking
+        show_batch_ranking(batch)
+        show_deep_dive(batch)
+
+    elif uploaded_file and analyze_clicked:
+        # Spinner with modern text; with PROFILE_ANALYSIS=1 or ?profile=1
+        # the whole run is profiled (see utils.profiling), and with
+        # RECORD_SESSIONS=1 it is recorded for offline replay (see utils.replay).
+        # Changing an input while it runs cancels extraction, the remaining
+        # stages and pending model calls (see utils.cancellation)
+        profiling = profiling_requested(st.query_params.to_dict())
+        with st.spinner(">> Scanning Document... [AI Analysis In Progress]"), \
+                cancellable(current_session_id(), rerun_requested()) as cancel_token, \
+                profile_analysis(profiling, selected_job) as profile, \
+                record_session(RECORD_SESSIONS, selected_job, depth) as recording:
+            
+            speculation = claim_speculation(current_session_id(), uploaded_file.file_id)
+            
+            # Artificial delay for effect (can be removed for speed); skipped
+            # when the upload has been worked on since it arrived
+            if speculation is None:
+                progress_bar = st.progress(0)
+                for i in range(100):
+                    time.sleep(0.01)
+                    progress_bar.progress(i + 1)
+            if recording:
+                recording.mark('progress')
             
-            # Artificial delay for effect (can be removed for speed)
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(i + 1)
+            # 1. Extract Text (one entry per page), usually done and prepared
+            # for analysis already while the options were picked
+            upload = uploaded_file.getvalue()
+            resume_hash = upload_hash(upload)
+            try:
+                speculated = speculation.pages() if speculation else None
+                pages, prepared = speculated or (extract_pages(upload), None)
+            except PdfProcessingError as e:
+                st.error(f"❌ Error reading PDF: {e}")
+                pages = None
+            # Only the hash and the page texts are needed from here on
+            del upload
+            uploaded_file.close()
+            if recording:
+                recording.set_upload(resume_hash, pages)
+                recording.mark('extract')
             
-            # 1. Extract Text
-            resume_text = extract_text_from_pdf(uploaded_file)
+            # Sections analyzed one prompt at a time are shown as they finish
+            progressive = ProgressiveResults()
             
-            if resume_text:
+            if pages:
                 # 2. Analyze (Mock or Real)
-                # We prioritize mock for stability if key is missing/limit reached,
-                # but try real if configured.
-                
-                # For this demo, we'll try to use the generic 'analyze_resume' logic.
-                # If it returns None (e.g. no key), we fallback to mock.
-                analysis_result = analyze_resume(resume_text, selected_job)
-                
-                if not analysis_result:
-                    analysis_result = mock_analysis(resume_text, selected_job)
+                # Re-uploads of the same resume only re-analyze the sections
+                # that changed since this user's previous version; if the AI
+                # model is unavailable the local mock analysis is used.
+                # Model calls are rate limited per session and queued fairly
+                # against the global quota (see utils.scheduler). The depth
+                # picks local, hybrid or full analysis, each with its own
+                # latency budget and stored snapshot. Near copies of a resume
+                # analyzed before reuse that analysis (see utils.near_duplicates).
+                # An analysis run ahead for the same options is taken as is
+                previous = load_snapshot(snapshot_key(depth))
+                speculative = speculation.analysis(selected_job, depth, previous) if speculation else None
+                with session_scope(current_session_id()) as usage:
+                    snapshot, changes = speculative or analyze_revision(
+                        pages, selected_job, previous,
+                        on_section=progressive, depth=depth, user_id=user_id, prepared=prepared
+                    )
+                show_queue_status(usage)
+                if recording:
+                    recording.mark('analyze')
+            else:
+                snapshot = None
+            
+            if snapshot:
+                # Kept compact and within the session memory budget (see utils.session_store)
+                save_snapshot(snapshot, snapshot_key(depth))
+                st.session_state['resume_changes'] = changes
+                st.session_state['resume_file_id'] = uploaded_file.file_id
+                st.session_state['resume_depth'] = depth
+                if changes['llm_mode'] != 'reused':
+                    # Queued; committed by the background history writer
+                    record_analysis(user_id, resume_hash, snapshot, changes['llm_mode'])
+                show_revision_changes(changes)
+                show_near_duplicate(changes)
                 
-                # 3. Show Results
-                show_results(analysis_result)
+                # 3. Show Results (typed report in JSON mode)
+                if progressive.rendered:
+                    progressive.finish()
+                else:
+                    show_results(snapshot['report'] or snapshot['analysis_text'])
+                show_highlights(snapshot.get('highlights'))
+                if recording:
+                    recording.set_result(snapshot, changes)
+                    recording.mark('render')
                 
-                # Download Button
-                st.markdown("<br>", unsafe_allow_html=True)
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    st.download_button(
-                        label="📥 Save Analysis Report [TXT]",
-                        data=analysis_result,
-                        file_name=f"resume_analysis_{selected_job.replace(' ', '_')}.txt",
-                        mime="text/plain",
-                        use_container_width=True
-                    )
+                # Download (rendered on demand, cached by analysis and format)
+                show_export_section(snapshot)
+
+        if cancel_token.stopped_at:
+            st.info("⏹️ Analysis stopped because the inputs changed. Click Analyze to run it again.")
+        if profile and profile.path:
+            st.caption(f"Profile written to {profile.path}")
 
     elif analyze_clicked and not uploaded_file:
         st.warning("⚠️ System Alert: No Resume Detected. Please upload a PDF file.")
 
+    elif history_snapshot:
+        show_results(history_snapshot['report'] or history_snapshot['analysis_text'])
+        show_export_section(history_snapshot)
+
+    elif uploaded_file and st.session_state.get('resume_file_id') == uploaded_file.file_id:
+        # Any other rerun (e.g. choosing an export format or downloading)
+        # redraws the last analysis of this upload from session state
+        show_revision_changes(st.session_state['resume_changes'])
+        snapshot = load_snapshot(snapshot_key(st.session_state.get('resume_depth')))
+        if snapshot:
+            show_results(snapshot['report'] or snapshot['analysis_text'])
+            show_highlights(snapshot.get('highlights'))
+            show_export_section(snapshot)
+
+
+def main():
+    # Minified CSS, then floating elements, hero, stats and features as a
+    # single cached HTML payload
+    show_static_css()
+    show_landing_page()
+    
+    # Main Interaction Area: fragments that rerun on their own when their
+    # widgets change, without redrawing the landing sections
+    upload_area()
+    results_area()
+    
+    # Metrics of this process, with OPERATIONS_PANEL=1
+    show_operations_panel()
+    
     # Footer
     st.markdown("<div class='footer'>", unsafe_allow_html=True)
     st.markdown(
@@ -181,6 +237,12 @@ def main():
         unsafe_allow_html=True
     )
     st.markdown("</div>", unsafe_allow_html=True)
+    
+    # Page is painted: load the AI client and PDF workers in the background
+    record_first_render()
+    warm_up_in_background()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Full page runs; fragment reruns are recorded by each fragment
+    with metrics.thread_cpu('script_run_cpu_seconds', scope='app'):
+        main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+import streamlit as st
+
+from utils.batch import BATCH_DEEP_DIVE_TOP, BATCH_MAX_FILES, score_resumes, rank_candidates, ranking_rows
+from utils.incremental import analyze_revision
+from utils.scheduler import session_scope
+from utils.cancellation import cancellable, rerun_requested
+from utils.session_store import current_session_id, save_value, load_value
+from components.results import show_results, show_queue_status, show_highlights
+from components.export import show_export_section
+
+
+def batch_file_ids(uploaded_files):
+    return [uploaded_file.file_id for uploaded_file in uploaded_files]
+
+
+def run_batch(uploaded_files, job_category):
+    """
+    Score every uploaded resume concurrently, redrawing the ranked table as
+    each one finishes. The batch is kept in the session store for reruns.
+    """
+    st.markdown("---")
+    st.subheader(f"🏆 Candidate Ranking - {job_category}")
+    if len(uploaded_files) > BATCH_MAX_FILES:
+        st.warning(f"⚠️ Only the first {BATCH_MAX_FILES} resumes are ranked.")
+        uploaded_files = uploaded_files[:BATCH_MAX_FILES]
+
+    files = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+    progress_bar = st.progress(0)
+    table = st.empty()
+    candidates = []
+    for candidate in score_resumes(files, job_category):
+        candidates.append(candidate)
+        progress_bar.progress(len(candidates) / len(files))
+        table.dataframe(ranking_rows(rank_candidates(candidates)), use_container_width=True, hide_index=True)
+    progress_bar.empty()
+    del files
+
+    batch = {
+        'job_category': job_category,
+        'file_ids': batch_file_ids(uploaded_files),
+        'candidates': rank_candidates(candidates),
+        'deep_dives': {},
+    }
+    save_value('resume_batch', batch)
+    return batch
+
+
+def load_batch(uploaded_files, job_category):
+    """
+    The stored batch for these uploads and role, or None
+    """
+    batch = load_value('resume_batch')
+    if batch and batch['job_category'] == job_category and batch['file_ids'] == batch_file_ids(uploaded_files):
+        return batch
+    return None
+
+
+def show_batch_ranking(batch):
+    st.markdown("---")
+    st.subheader(f"🏆 Candidate Ranking - {batch['job_category']}")
+    st.dataframe(ranking_rows(batch['candidates']), use_container_width=True, hide_index=True)
+
+
+def show_deep_dive(batch):
+    """
+    Full AI analysis of one of the top candidates, run only when asked for
+    and kept with the batch
+    """
+    top = [candidate for candidate in batch['candidates'] if candidate['score'] is not None][:BATCH_DEEP_DIVE_TOP]
+    if not top:
+        return
+
+    st.markdown("#### 🔬 AI Deep Dive")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        # By rank: several uploads may have the same file name
+        position = st.selectbox(
+            "Top candidates:",
+            options=range(len(top)),
+            format_func=lambda i: f"#{i + 1} {top[i]['name']}",
+            key="deep_dive_candidate"
+        )
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        run_clicked = st.button("Run Deep Dive", use_container_width=True, key="deep_dive_run")
+
+    candidate = top[position]
+    name = candidate['name']
+    snapshot = batch['deep_dives'].get(candidate['upload_hash'])
+    if snapshot is None and run_clicked:
+        with st.spinner(f">> Analyzing {name}..."):
+            with cancellable(current_session_id(), rerun_requested()), \
+                    session_scope(current_session_id()) as usage:
+                snapshot, _ = analyze_revision(candidate['pages'], batch['job_category'])
+            show_queue_status(usage)
+        if snapshot:
+            batch['deep_dives'][candidate['upload_hash']] = snapshot
+            save_value('resume_batch', batch)
+
+    if snapshot:
+        show_results(snapshot['report'] or snapshot['analysis_text'])
+        show_highlights(snapshot.get('highlights'))
+        show_export_section(snapshot)
@@ -0,0 +1,30 @@
+import streamlit as st
+
+from utils.export import EXPORT_FORMATS, render_export
+
+
+def show_export_section(snapshot):
+    """
+    Download the analysis in the chosen format; only that format is
+    rendered, and it is served from the export cache on later reruns
+    """
+    job_category = snapshot['job_category']
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        fmt = st.radio(
+            "Report format:",
+            options=list(EXPORT_FORMATS),
+            format_func=lambda key: EXPORT_FORMATS[key][0],
+            horizontal=True,
+            key="export_format"
+        )
+        label, mime, extension = EXPORT_FORMATS[fmt]
+        st.download_button(
+            label=f"📥 Save Analysis Report [{extension.upper()}]",
+            data=render_export(fmt, snapshot['analysis_text'], snapshot['report'], title=f"Resume Analysis - {job_category}"),
+            file_name=f"resume_analysis_{job_category.replace(' ', '_')}.{extension}",
+            mime=mime,
+            use_container_width=True
+        )
@@ -1,7 +1,6 @@
 import streamlit as st
 
-def show_hero():
-    st.markdown("""
+HERO_HTML = """
         <div class="hero-container">
             <div class="hero-code">
                 const AIResumeAdvisor = () => analyzeYourCareer();
@@ -21,4 +20,8 @@ def show_hero():
                 </span>
             </div>
         </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+"""
+
+
+def show_hero():
+    st.markdown(HERO_HTML, unsafe_allow_html=True)
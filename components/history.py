@@ -0,0 +1,61 @@
+import time
+import uuid
+
+import streamlit as st
+
+from utils.history import list_history, load_analysis
+
+
+def get_user_id():
+    """
+    Anonymous id that keys a browser's history, kept for the session. It
+    grants access to the history, so it is only in the page URL (for a
+    reload or bookmark to return to the same history) when the user opted
+    in with the history panel's link toggle, or opened such a link.
+    """
+    if 'user_id' not in st.session_state:
+        user_id = st.query_params.get('user')
+        st.session_state['history_link'] = bool(user_id)
+        st.session_state['user_id'] = user_id or uuid.uuid4().hex
+    return st.session_state['user_id']
+
+
+def _show_history_link(user_id):
+    keep = st.toggle(
+        "Keep my history in this page's link",
+        key='history_link',
+        help="Lets a reload or bookmark return to these analyses"
+    )
+    if keep:
+        st.query_params['user'] = user_id
+        st.warning("Anyone with this link can open your previous analyses; don't share it.")
+    elif 'user' in st.query_params:
+        del st.query_params['user']
+
+
+def show_history_panel(user_id):
+    """
+    List the user's previous analyses; opening one loads it from the store
+    without re-running extraction or the model.
+    Returns the opened analysis, or None.
+    """
+    history = list_history(user_id)
+    if not history:
+        return None
+
+    with st.expander(f"🕘 Previous Analyses ({len(history)})"):
+        _show_history_link(user_id)
+        for entry in history:
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry['created_at']))
+                st.markdown(
+                    f"<div class='breakdown-item'>{when} | {entry['job_category']} | Score: {entry['score']}/100</div>",
+                    unsafe_allow_html=True
+                )
+            with col2:
+                if st.button("Open", key=f"history_{entry['id']}", use_container_width=True):
+                    st.session_state['history_selection'] = entry['id']
+
+    selection = st.session_state.get('history_selection')
+    return load_analysis(user_id, selection) if selection else None
@@ -0,0 +1,41 @@
+import os
+
+import streamlit as st
+
+from utils import metrics
+from utils.session_store import memory_report
+
+# Show the operations panel (metrics of this server process) under the
+# page; every visitor sees it, so enable it only where they are operators
+OPERATIONS_PANEL = os.environ.get("OPERATIONS_PANEL", "").lower() in ("1", "true", "yes")
+
+# Panel sections and the metric name prefixes they show
+METRIC_GROUPS = {
+    "Model calls": ('llm_requests_total', 'llm_latency_seconds', 'llm_hedge', 'llm_circuit_'),
+    "Scheduling": ('llm_queue_', 'llm_throttled_total'),
+    "Routing": ('llm_routes_total', 'llm_responses_total', 'llm_tier_quality', 'resume_complexity'),
+    "Cancellation": ('analyses_cancelled_total', 'speculation'),
+    "Session memory": ('session_memory_',),
+}
+
+
+def show_operations_panel():
+    """
+    Metrics of this process by area, the session store's memory per
+    session, and every metric as a Prometheus-format download
+    """
+    if not OPERATIONS_PANEL:
+        return
+
+    with st.expander("🛠️ Operations"):
+        for title, prefixes in METRIC_GROUPS.items():
+            st.markdown(f"**{title}**")
+            st.json(metrics.snapshot(prefixes), expanded=False)
+        st.markdown("**Session store**")
+        st.json(memory_report(), expanded=False)
+        st.download_button(
+            label="📥 Download metrics",
+            data=metrics.export_text(),
+            file_name="metrics.txt",
+            mime="text/plain",
+        )
@@ -1,20 +1,38 @@
 import streamlit as st
 import re
+import html
 
+from utils.report_schema import AnalysisReport, SECTION_HEADINGS
 
-def show_results(analysis_text):
-    if not analysis_text:
+
+def show_results(analysis):
+    """
+    Show an analysis: either a typed AnalysisReport (JSON mode) or the
+    markdown text of the report.
+    """
+    if not analysis:
         return
 
-    st.markdown("---")
-    st.markdown("### <span style='color: var(--accent-primary)'>02.</span> Analysis Results", unsafe_allow_html=True)
+    show_results_header()
     
-    # Parse the analysis text into sections
-    sections = parse_analysis_into_sections(analysis_text)
-    
-    # Display each section with proper formatting
-    display_parsed_sections(sections)
+    if isinstance(analysis, AnalysisReport):
+        display_report(analysis)
+    else:
+        # Parse the analysis text into sections
+        sections = parse_analysis_into_sections(analysis)
+        
+        # Display each section with proper formatting
+        display_parsed_sections(sections)
     
+    show_results_footer()
+
+
+def show_results_header():
+    st.markdown("---")
+    st.markdown("### <span style='color: var(--accent-primary)'>02.</span> Analysis Results", unsafe_allow_html=True)
+
+
+def show_results_footer():
     st.markdown("""
     <div style="margin-top: 2rem; text-align: center;">
         <div class="success-badge">Analysis Completed Successfully</div>
@@ -22,6 +40,40 @@ def show_results(analysis_text):
     """, unsafe_allow_html=True)
 
 
+class ProgressiveResults:
+    """
+    Render report sections as they finish: one slot per section, in report
+    order, is laid out on the first section and filled as each arrives.
+    Call with (section, body), e.g. as on_section of analyze_revision().
+    """
+
+    def __init__(self):
+        self._container = st.container()
+        self._slots = None
+        self.rendered = []
+
+    def __call__(self, name, content):
+        if self._slots is None:
+            with self._container:
+                show_results_header()
+                self._slots = {}
+                for section, heading in SECTION_HEADINGS.items():
+                    slot = st.container()
+                    pending = slot.empty()
+                    pending.caption(f"⏳ {heading.lstrip('# ')}...")
+                    self._slots[section] = (slot, pending)
+        slot, pending = self._slots[name]
+        pending.empty()
+        with slot:
+            display_section(name, content)
+        self.rendered.append(name)
+
+    def finish(self):
+        if self.rendered:
+            with self._container:
+                show_results_footer()
+
+
 def parse_analysis_into_sections(analysis_text):
     """
     Parse the analysis text into structured sections
@@ -52,11 +104,19 @@ def display_parsed_sections(sections):
     """
     Display parsed sections with appropriate formatting
     """
+    for name in SECTION_HEADINGS:
+        if name in sections:
+            display_section(name, sections[name])
+
+
+def display_section(name, content):
+    """
+    Display one parsed section
+    """
     # Quick Summary
-    if 'quick_summary' in sections:
+    if name == 'quick_summary':
         with st.expander("📊 Quick Summary (TL;DR)", expanded=True):
             # Format bullet points
-            content = sections['quick_summary']
             lines = content.split('\n')
             for line in lines:
                 line = line.strip()
@@ -64,12 +124,11 @@ def display_parsed_sections(sections):
                     st.markdown(f"<div class='bullet-item'>{line}</div>", unsafe_allow_html=True)
     
     # Resume Score
-    if 'resume_score' in sections:
+    elif name == 'resume_score':
         st.subheader("💯 Resume Score & Breakdown")
-        score_content = sections['resume_score']
         
         # Extract the overall score
-        overall_match = re.search(r'Overall Score: (\d+)/100', score_content)
+        overall_match = re.search(r'Overall Score: (\d+)/100', content)
         if overall_match:
             overall_score = int(overall_match.group(1))
             # Display score visually
@@ -81,7 +140,7 @@ def display_parsed_sections(sections):
         
         # Display breakdown
         st.markdown("<div class='score-breakdown'>", unsafe_allow_html=True)
-        breakdown_lines = [line for line in score_content.split('\n') if 'Overall Score:' not in line and ':' in line]
+        breakdown_lines = [line for line in content.split('\n') if 'Overall Score:' not in line and ':' in line]
         for line in breakdown_lines:
             line = line.strip()
             if line:
@@ -89,21 +148,20 @@ def display_parsed_sections(sections):
         st.markdown("</div>", unsafe_allow_html=True)
     
     # Role Fit Analysis
-    if 'role_fit' in sections:
+    elif name == 'role_fit':
         with st.expander("🎯 Role Fit Analysis", expanded=True):
-            st.markdown(f"<div class='role-fit-content'>{sections['role_fit']}</div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='role-fit-content'>{content}</div>", unsafe_allow_html=True)
     
     # Skill Gap Matrix
-    if 'skill_gap' in sections:
+    elif name == 'skill_gap':
         st.subheader("🧩 Skill Gap Matrix")
         # Render as a table
-        st.markdown(sections['skill_gap'])
+        st.markdown(content)
     
     # Hiring Manager Simulation
-    if 'hiring_manager' in sections:
+    elif name == 'hiring_manager':
         st.subheader("🔍 Hiring Manager Simulation")
         # Format the simulation content
-        content = sections['hiring_manager']
         lines = content.split('\n')
         for line in lines:
             line = line.strip()
@@ -113,25 +171,22 @@ def display_parsed_sections(sections):
                 st.markdown(f"<div class='simulation-header'>{line}</div>", unsafe_allow_html=True)
     
     # Resume Risks
-    if 'risks' in sections:
+    elif name == 'risks':
         st.subheader("⚠️ Resume Risk Detection")
-        content = sections['risks']
         risk_items = [item.strip() for item in content.split('\n') if item.strip().startswith('- ')]
         for item in risk_items:
             st.markdown(f"<div class='risk-item'>{item}</div>", unsafe_allow_html=True)
     
     # Improvement Actions
-    if 'improvements' in sections:
+    elif name == 'improvements':
         st.subheader("🛠️ Improvement Actions (Prioritized)")
-        content = sections['improvements']
         improvement_items = [item.strip() for item in content.split('\n') if item.strip().startswith(('1.', '2.', '3.', '4.', '5.'))]
         for item in improvement_items:
             st.markdown(f"<div class='improvement-item'>{item}</div>", unsafe_allow_html=True)
     
     # Example Rewrites
-    if 'rewrites' in sections:
+    elif name == 'rewrites':
         st.subheader("✏️ Example Rewrites")
-        content = sections['rewrites']
         # Split into before/after sections
         rewrite_parts = content.split('**After:**')
         if len(rewrite_parts) > 1:
@@ -151,3 +206,155 @@ def display_parsed_sections(sections):
             
             if explanation:
                 st.markdown("<div class='rewrite-explanation'><strong>Why better:</strong> {}</div>".format(explanation), unsafe_allow_html=True)
+
+
+def display_report(report):
+    """
+    Display a typed report; no text parsing is needed
+    """
+    with st.expander("📊 Quick Summary (TL;DR)", expanded=True):
+        for item in report.summary:
+            st.markdown(f"<div class='bullet-item'>- {item}</div>", unsafe_allow_html=True)
+    
+    st.subheader("💯 Resume Score & Breakdown")
+    score = report.score
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        st.markdown(f"<div class='score-display'>Score: {score.overall}/100</div>", unsafe_allow_html=True)
+        st.progress(min(max(score.overall, 0), 100) / 100)
+    breakdown = [
+        ("Role Alignment", score.role_alignment),
+        ("Impact Clarity", score.impact_clarity),
+        ("ATS Friendliness", score.ats_friendliness),
+        ("Project Relevance", score.project_relevance),
+    ]
+    st.markdown(
+        "<div class='score-breakdown'>"
+        + "".join(f"<div class='breakdown-item'>- {label}: {value}/25</div>" for label, value in breakdown)
+        + "</div>",
+        unsafe_allow_html=True
+    )
+    
+    with st.expander("🎯 Role Fit Analysis", expanded=True):
+        st.markdown(f"<div class='role-fit-content'>{report.role_fit}</div>", unsafe_allow_html=True)
+    
+    if report.skill_gap:
+        st.subheader("🧩 Skill Gap Matrix")
+        rows = "\n".join(
+            f"| {row.category} | {row.strong_match} | {row.partial_match} | {row.missing} |"
+            for row in report.skill_gap
+        )
+        st.markdown(
+            "| Skill Category | Strong Match | Partial Match | Missing But Important |\n"
+            "|----------------|--------------|---------------|----------------------|\n" + rows
+        )
+    
+    st.subheader("🔍 Hiring Manager Simulation")
+    view = report.hiring_manager
+    for label, value in (("First impression", view.first_impression), ("What stands out", view.stands_out),
+                         ("What raises doubts", view.raises_doubts), ("Shortlist decision", view.decision)):
+        st.markdown(f"<div class='simulation-item'>- {label}: {value}</div>", unsafe_allow_html=True)
+    
+    if report.risks:
+        st.subheader("⚠️ Resume Risk Detection")
+        for risk in report.risks:
+            st.markdown(f"<div class='risk-item'>- {risk}</div>", unsafe_allow_html=True)
+    
+    if report.improvements:
+        st.subheader("🛠️ Improvement Actions (Prioritized)")
+        for i, item in enumerate(report.improvements, start=1):
+            st.markdown(f"<div class='improvement-item'>{i}. {item}</div>", unsafe_allow_html=True)
+    
+    if report.rewrites:
+        st.subheader("✏️ Example Rewrites")
+        for rewrite in report.rewrites:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("<div class='rewrite-section-title'>Before:</div>", unsafe_allow_html=True)
+                st.markdown(f"<div class='rewrite-before'>{rewrite.before}</div>", unsafe_allow_html=True)
+            with col2:
+                st.markdown("<div class='rewrite-section-title'>After:</div>", unsafe_allow_html=True)
+                st.markdown(f"<div class='rewrite-after'>{rewrite.after}</div>", unsafe_allow_html=True)
+            st.markdown("<div class='rewrite-explanation'><strong>Why better:</strong> {}</div>".format(rewrite.why_better), unsafe_allow_html=True)
+
+
+def show_revision_changes(changes):
+    """
+    Show how a re-uploaded resume differs from the previous version
+    """
+    if not changes or changes['previous_score'] is None:
+        return
+
+    st.markdown("---")
+    st.subheader("🔁 Changes Since Your Last Upload")
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric(
+            "Resume Score",
+            f"{changes['score']}/100",
+            delta=changes['score'] - changes['previous_score']
+        )
+    with col2:
+        edited = changes['changed_sections'] + changes['added_sections']
+        if edited:
+            st.markdown(f"<div class='breakdown-item'>Updated sections: {', '.join(edited)}</div>", unsafe_allow_html=True)
+        if changes['removed_sections']:
+            st.markdown(f"<div class='breakdown-item'>Removed sections: {', '.join(changes['removed_sections'])}</div>", unsafe_allow_html=True)
+        if changes['llm_mode'] == 'reused':
+            st.markdown("<div class='breakdown-item'>No changes detected - previous analysis reused</div>", unsafe_allow_html=True)
+
+    if changes.get('previous_components'):
+        labels = {
+            'role_alignment': 'Role Alignment',
+            'impact_clarity': 'Impact Clarity',
+            'ats_friendly': 'ATS Friendliness',
+            'project_relevance': 'Project Relevance'
+        }
+        for key, label in labels.items():
+            delta = changes['score_components'][key] - changes['previous_components'][key]
+            if delta:
+                st.markdown(f"<div class='breakdown-item'>{label}: {delta:+d}/25</div>", unsafe_allow_html=True)
+
+
+def show_near_duplicate(changes):
+    """
+    Tell the user when the upload nearly matches a resume analyzed before
+    """
+    near_duplicate = changes.get('near_duplicate') if changes else None
+    if not near_duplicate:
+        return
+    similarity = round(near_duplicate['similarity'] * 100)
+    if near_duplicate['reused']:
+        st.info(f"♻️ This resume is {similarity}% similar to one analyzed before, so that AI analysis was reused.")
+    else:
+        st.caption(f"Near-duplicate of a resume analyzed before ({similarity}% similar)")
+
+
+def show_queue_status(usage):
+    """
+    Tell the user when their analysis waited for, or was refused, model capacity
+    """
+    if usage.throttled:
+        st.info(
+            f"⏳ High demand: {usage.throttled} of {usage.calls} AI requests were over the rate limit, "
+            "so those parts use the local analysis. Try again in a minute for the full AI review."
+        )
+    elif usage.wait_seconds >= 1:
+        st.caption(f"Queued {usage.wait_seconds:.1f}s for AI model capacity")
+
+
+def show_highlights(highlights):
+    """
+    Point to the page of each resume line the rewrites suggest changing
+    """
+    if not highlights:
+        return
+
+    st.markdown("#### 📍 Where to Edit")
+    for highlight in highlights:
+        text = highlight['text'] if len(highlight['text']) <= 90 else highlight['text'][:87] + "..."
+        st.markdown(
+            f"<div class='breakdown-item'>Page {highlight['page']}: {html.escape(text)}</div>",
+            unsafe_allow_html=True
+        )
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+import streamlit as st
+
+from components.hero import HERO_HTML
+
+CSS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "styles", "main.css")
+
+FLOATING_ELEMENTS_HTML = """
+<div class="floating-element floating-1"></div>
+<div class="floating-element floating-2"></div>
+<div class="floating-element floating-3"></div>
+"""
+
+STATS = [
+    ("95%", "Accuracy Rate"),
+    ("50K+", "Resumes Analyzed"),
+    ("2.3x", "Better Response"),
+    ("100%", "ATS Compatible"),
+]
+
+FEATURES = [
+    {
+        "icon": "🎯",
+        "title": "Role-Specific Analysis",
+        "description": "Tailored feedback based on your target job position with specific skill gap identification."
+    },
+    {
+        "icon": "📊",
+        "title": "Resume Scoring",
+        "description": "Get a comprehensive score with breakdown of strengths and areas for improvement."
+    },
+    {
+        "icon": "🔍",
+        "title": "Hiring Manager Simulation",
+        "description": "See how a recruiter would evaluate your resume in 30 seconds."
+    },
+    {
+        "icon": "✏️",
+        "title": "Smart Rewrites",
+        "description": "Get specific examples of how to improve your resume bullets and descriptions."
+    }
+]
+
+
+def minify_css(css):
+    """
+    Strip comments and redundant whitespace from a stylesheet
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def _minify_html(html):
+    return re.sub(r'>\s+<', '><', re.sub(r'\s+', ' ', html)).strip()
+
+
+@lru_cache(maxsize=None)
+def css_bundle():
+    """
+    Read, minify and content-hash the stylesheet once per process.
+    Returns (style_tag, content_hash).
+    """
+    with open(CSS_PATH, encoding="utf-8") as f:
+        css = minify_css(f.read())
+    content_hash = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+    return f'<style data-css-hash="{content_hash}">{css}</style>', content_hash
+
+
+def render_stats_html():
+    """Statistics to build trust"""
+    cards = "".join(
+        f'<div class="stat-card"><div class="stat-number">{number}</div><div class="stat-label">{label}</div></div>'
+        for number, label in STATS
+    )
+    return (
+        "<h3 style='text-align: center; margin: 2rem 0;'>Our Impact</h3>"
+        f'<div class="stats-container">{cards}</div>'
+    )
+
+
+def render_features_html():
+    """Feature cards for the AI Resume Advisor"""
+    cards = "".join(
+        f"""
+        <div class="feature-card fade-in-delay-{i+1}">
+            <div class="feature-icon">{feature['icon']}</div>
+            <div class="feature-title">{feature['title']}</div>
+            <div class="feature-desc">{feature['description']}</div>
+        </div>
+        """
+        for i, feature in enumerate(FEATURES)
+    )
+    return (
+        "<div class='header-container'><h2>Why Choose Our AI Resume Analyzer?</h2></div>"
+        f'<div class="features-grid">{cards}</div>'
+    )
+
+
+@lru_cache(maxsize=None)
+def landing_page_html():
+    """
+    Floating elements, hero, stats and features prerendered as one HTML blob
+    """
+    return _minify_html(
+        FLOATING_ELEMENTS_HTML
+        + HERO_HTML
+        + render_stats_html()
+        + "<hr>"
+        + render_features_html()
+        + "<hr>"
+    )
+
+
+def prerender_static_fragments():
+    """Build every cached fragment; called once when the app module loads."""
+    css_bundle()
+    landing_page_html()
+
+
+def show_static_css():
+    st.markdown(css_bundle()[0], unsafe_allow_html=True)
+
+
+def show_landing_page():
+    st.markdown(landing_page_html(), unsafe_allow_html=True)
@@ -1,5 +1,17 @@
 import streamlit as st
 
+JOB_CATEGORIES = [
+    "Software Engineer", "Data Scientist", "Product Manager", 
+    "Full Stack Developer", "DevOps Engineer", "Machine Learning Engineer",
+    "Frontend Developer", "Backend Developer", "UX Designer",
+    "Cybersecurity Specialist", "Data Analyst", "Project Manager",
+    "Business Analyst", "Marketing Manager", "Sales Manager",
+    "HR Manager", "Financial Analyst", "Operations Manager"
+]
+
+# See DEPTH_TIERS in utils.ai_analysis for what each one runs
+ANALYSIS_DEPTHS = ["Standard", "Detailed", "Comprehensive"]
+
 def show_upload_section():
     st.markdown("### <span style='color: var(--accent-primary)'>01.</span> Upload & Analyze Your Resume", unsafe_allow_html=True)
     
@@ -9,15 +21,17 @@ def show_upload_section():
         st.markdown("""
         <div class="upload-zone">
             <h4>📁 Upload Resume</h4>
-            <p style="color: #666; font-size: 0.9rem;">Drag & drop your PDF resume here</p>
+            <p style="color: #666; font-size: 0.9rem;">Drag & drop your PDF resume here, or several to rank candidates</p>
             <p style="color: #888; font-size: 0.8rem;">or click to browse files</p>
         </div>
         """, unsafe_allow_html=True)
         
-        uploaded_file = st.file_uploader(
+        uploaded_files = st.file_uploader(
             "Upload Resume",
             type="pdf",
-            label_visibility="collapsed"
+            accept_multiple_files=True,
+            label_visibility="collapsed",
+            key="resume_files"
         )
         
         # Mascot / Toy Animation
@@ -32,26 +46,20 @@ def show_upload_section():
 
     with col2:
         st.markdown("#### 🎯 Select Target Role")
-        job_categories = [
-            "Software Engineer", "Data Scientist", "Product Manager", 
-            "Full Stack Developer", "DevOps Engineer", "Machine Learning Engineer",
-            "Frontend Developer", "Backend Developer", "UX Designer",
-            "Cybersecurity Specialist", "Data Analyst", "Project Manager",
-            "Business Analyst", "Marketing Manager", "Sales Manager",
-            "HR Manager", "Financial Analyst", "Operations Manager"
-        ]
-        
         selected_job = st.selectbox(
             "Choose your target role:",
-            options=job_categories,
-            index=0
+            options=JOB_CATEGORIES,
+            index=0,
+            key="target_role"
         )
         
         st.markdown("#### ⚙️ Analysis Options")
         analysis_depth = st.radio(
             "Select analysis depth:",
-            options=["Standard", "Detailed", "Comprehensive"],
-            horizontal=True
+            options=ANALYSIS_DEPTHS,
+            captions=["Instant local score", "+ AI narrative", "Full AI report"],
+            horizontal=True,
+            key="analysis_depth"
         )
         
         analyze_clicked = st.button(
@@ -69,4 +77,4 @@ def show_upload_section():
             - For best results, use a recent version of your resume
             """)
 
-    return uploaded_file, selected_job, analyze_clicked
\ No newline at end of file
+    return uploaded_files, selected_job, analysis_depth, analyze_clicked
\ No newline at end of file
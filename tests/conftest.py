@@ -0,0 +1,40 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ai_analysis, scheduler  # noqa: E402
+from utils.fake_gemini import FakeGeminiBackend  # noqa: E402
+
+_names = itertools.count()
+
+
+def fake_backend(**kwargs):
+    """
+    A FakeGeminiBackend with a name of its own, so it gets a fresh circuit
+    breaker and latency tracker (see utils.llm_client)
+    """
+    kwargs.setdefault('latency', 0)
+    name = kwargs.pop('name', 'fake')
+    return FakeGeminiBackend(name=f"{name}-test-{next(_names)}", **kwargs)
+
+
+@pytest.fixture
+def backend():
+    backend = fake_backend()
+    ai_analysis.set_model_backend(backend)
+    yield backend
+    ai_analysis.set_model_backend(None)
+
+
+@pytest.fixture
+def fair_scheduler():
+    """A scheduler without global budgets, replacing the shared one"""
+    previous = scheduler.get_scheduler()
+    fresh = scheduler.FairScheduler(rpm=0, tpm=0)
+    scheduler.set_scheduler(fresh)
+    yield fresh
+    scheduler.set_scheduler(previous)
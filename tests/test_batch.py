@@ -0,0 +1,76 @@
+import pytest
+
+from utils import batch
+from utils.batch import rank_candidates, score_resumes
+from utils.pdf_processor import InvalidPdfError
+
+STRONG = """Alex Example
+Experience
+Senior Software Engineer at Acme Jan 2016 - Present
+- Cut deployment time by 40% for 12 teams
+- Built a billing pipeline processing 2M events a day
+Skills
+Python, Java, SQL, Docker, Kubernetes, AWS, Git, Linux
+"""
+WEAK = """Sam Example
+Skills
+Communication
+"""
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Uploads are page texts separated by form feeds; counts the parses"""
+    calls = []
+
+    def extract_pages(data):
+        calls.append(data)
+        if data == b"broken":
+            raise InvalidPdfError("File does not start with a PDF header.")
+        return data.decode().split("\f")
+
+    monkeypatch.setattr(batch, 'extract_pages', extract_pages)
+    return calls
+
+
+def _candidate(name, score, high_risks=0):
+    return {'name': name, 'score': score, 'high_risks': high_risks}
+
+
+def test_candidates_rank_by_score_then_risks_then_name():
+    ranked = rank_candidates([
+        _candidate("d", None), _candidate("c", 70, high_risks=1), _candidate("b", 70),
+        _candidate("e", 85), _candidate("a", 70),
+    ])
+    assert [candidate['name'] for candidate in ranked] == ["e", "a", "b", "c", "d"]
+
+
+def test_batch_ranks_scored_resumes_and_lists_unreadable_last(parsed):
+    files = [("broken.pdf", b"broken"), ("weak.pdf", WEAK.encode()), ("strong.pdf", STRONG.encode())]
+    ranked = rank_candidates(score_resumes(files, "Software Engineer"))
+
+    assert [candidate['name'] for candidate in ranked] == ["strong.pdf", "weak.pdf", "broken.pdf"]
+    assert ranked[0]['score'] > ranked[1]['score']
+    assert "python" in ranked[0]['matched_skills']
+    assert ranked[2]['score'] is None
+    assert "PDF header" in ranked[2]['error']
+
+
+def test_identical_uploads_are_scored_once_under_each_name(parsed):
+    files = [("alex.pdf", STRONG.encode()), ("copy.pdf", STRONG.encode()), ("sam.pdf", WEAK.encode())]
+    candidates = list(score_resumes(files, "Software Engineer"))
+
+    assert len(parsed) == 2
+    assert sorted(candidate['name'] for candidate in candidates) == ["alex.pdf", "copy.pdf", "sam.pdf"]
+    copies = [candidate for candidate in candidates if candidate['name'] != "sam.pdf"]
+    assert copies[0]['score'] == copies[1]['score']
+    assert copies[0]['upload_hash'] == copies[1]['upload_hash']
+
+
+def test_only_top_candidates_keep_their_pages(parsed, monkeypatch):
+    monkeypatch.setattr(batch, 'BATCH_DEEP_DIVE_TOP', 2)
+    files = [(f"{i}.pdf", (STRONG + "Go\n" * i).encode()) for i in range(4)] + [("weak.pdf", WEAK.encode())]
+    ranked = rank_candidates(score_resumes(files, "Software Engineer"))
+
+    assert [candidate['pages'] is not None for candidate in ranked] == [True, True, False, False, False]
+    assert ranked[0]['pages'] == (STRONG + "Go\n" * int(ranked[0]['name'][0])).split("\f")
@@ -0,0 +1,56 @@
+import types
+
+import pytest
+import streamlit
+import streamlit.runtime.scriptrunner as scriptrunner
+
+from utils import cancellation
+from utils.cancellation import AnalysisCancelled, cancellable, check, rerun_requested
+
+
+@pytest.fixture
+def script_requests(monkeypatch):
+    """The current script run's requests, with a settable pending state"""
+    monkeypatch.setattr(cancellation, '_pending_state_checked', None)
+    requests = types.SimpleNamespace(_state=types.SimpleNamespace(name='CONTINUE'))
+    ctx = types.SimpleNamespace(script_requests=requests)
+    monkeypatch.setattr(scriptrunner, 'get_script_run_ctx', lambda: ctx)
+    return requests
+
+
+def test_newer_analysis_cancels_older():
+    with cancellable('session') as first:
+        with cancellable('session'):
+            assert first.cancelled
+            assert first.reason == 'superseded'
+            check('stage')
+        check('stage')
+    assert first.stopped_at == 'stage'
+
+
+def test_cancelled_check_raises():
+    with cancellable() as token:
+        token.cancel()
+        with pytest.raises(AnalysisCancelled):
+            check('stage')
+
+
+def test_rerun_requested_reads_pending_state(script_requests):
+    superseded = rerun_requested()
+    assert not superseded()
+    script_requests._state.name = 'RERUN_REQUESTED'
+    assert superseded()
+
+
+def test_rerun_requested_without_private_state(script_requests, capsys):
+    del script_requests._state
+    assert rerun_requested() is None
+    assert rerun_requested() is None
+    assert capsys.readouterr().out.count("no ScriptRequests._state") == 1
+
+
+def test_untested_streamlit_version_is_reported_once(script_requests, monkeypatch, capsys):
+    monkeypatch.setattr(streamlit, '__version__', '9.0.0')
+    assert rerun_requested() is not None
+    assert rerun_requested() is not None
+    assert capsys.readouterr().out.count("tested with 1.37") == 1
@@ -0,0 +1,56 @@
+import uuid
+
+import pytest
+
+from utils.ai_analysis import DIGEST_HEADING, resume_for_prompt
+from utils.chunking import LLM_PROMPT_BUDGET_CHARS, split_chunks
+from utils.scheduler import LLM_SESSION_BURST, session_scope
+
+
+def _long_resume(chunks):
+    # Unique text, so no summary comes from the chunk cache
+    run = uuid.uuid4().hex
+    lines = ["Experience"]
+    for i in range(chunks * 80):
+        lines.append(f"- Led project {run}-{i}, cutting deployment time by {i % 90 + 5}% for {i % 40 + 2} teams")
+    return "\n".join(lines)
+
+
+def test_split_chunks_respects_size():
+    text = _long_resume(5)
+    chunks = split_chunks(text, max_chars=8000)
+    assert all(len(chunk) <= 8000 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+
+def test_short_resume_is_sent_as_is(backend):
+    heading, body, _ = resume_for_prompt("short", "short")
+    assert body == "short"
+    assert backend.calls == 0
+
+
+def test_long_resume_in_session_scope_is_one_admission(backend, fair_scheduler):
+    text = _long_resume(20)
+    chunks = split_chunks(text)
+    assert len(text) > LLM_PROMPT_BUDGET_CHARS
+    assert len(chunks) > LLM_SESSION_BURST
+
+    with session_scope('long-cv') as usage:
+        heading, body, _ = resume_for_prompt(text, text, budget_seconds=30)
+
+    assert heading == DIGEST_HEADING
+    assert backend.calls == len(chunks)
+    assert usage.throttled == 0
+    assert fair_scheduler._buckets['long-cv'].tokens == pytest.approx(LLM_SESSION_BURST - 1, abs=0.1)
+
+
+def test_fan_out_over_session_rate_is_rejected_whole(backend, fair_scheduler):
+    fair_scheduler.session_burst = 1
+    with session_scope('busy') as usage:
+        resume_for_prompt(*[_long_resume(6)] * 2, budget_seconds=30)
+        first_calls = backend.calls
+        resume_for_prompt(*[_long_resume(6)] * 2, budget_seconds=30)
+
+    assert first_calls > 1
+    assert backend.calls == first_calls
+    assert usage.throttled == len(split_chunks(_long_resume(6)))
@@ -0,0 +1,87 @@
+import copy
+import json
+
+import pytest
+
+from utils import export
+from utils.export import markdown_to_html, render_export
+from utils.report_schema import report_from_dict, report_to_markdown
+
+REPORT = {
+    "summary": ["One", "Two", "Three", "Four", "Five"],
+    "score": {"overall": 72, "role_alignment": 20, "impact_clarity": 15, "ats_friendliness": 22, "project_relevance": 15},
+    "role_fit": "Good fit for backend roles.",
+    "skill_gap": [{"category": "Technical Skills", "strong_match": "Python", "partial_match": "Go", "missing": "Rust"}],
+    "hiring_manager": {"first_impression": "Clear", "stands_out": "Impact", "raises_doubts": "Gaps", "decision": "Yes - strong"},
+    "risks": ["Short tenure"],
+    "improvements": ["Quantify", "Reorder", "Trim"],
+    "rewrites": [{"before": "Did stuff", "after": "Cut costs 20%", "why_better": "Quantified"}],
+}
+TEXT = "## 📊 QUICK SUMMARY (TL;DR)\n- One\n- Two"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(export, '_cache', type(export._cache)())
+
+
+def _report(**changes):
+    data = copy.deepcopy(REPORT)
+    data.update(changes)
+    return report_from_dict(data)
+
+
+def test_repeated_export_comes_from_the_cache(monkeypatch):
+    first = render_export('html', TEXT)
+    monkeypatch.setattr(export, 'render_html', lambda *args: pytest.fail("rendered again"))
+    assert render_export('html', TEXT) is first
+
+
+def test_same_text_with_another_report_is_rendered_again():
+    report = _report()
+    text = report_to_markdown(report)
+    first = json.loads(render_export('json', text, report))
+    second = json.loads(render_export('json', text, _report(role_fit="Better fit for data roles.")))
+    assert first['role_fit'] == "Good fit for backend roles."
+    assert second['role_fit'] == "Better fit for data roles."
+    assert 'sections' in json.loads(render_export('json', text))
+
+
+def test_same_text_with_another_title_is_rendered_again():
+    first = render_export('html', TEXT, title="Alex")
+    second = render_export('html', TEXT, title="Sam")
+    assert b"<title>Alex</title>" in first
+    assert b"<title>Sam</title>" in second
+
+
+def test_least_recently_used_export_is_evicted(monkeypatch):
+    monkeypatch.setattr(export, 'EXPORT_CACHE_ENTRIES', 2)
+    first = render_export('md', "first")
+    render_export('md', "second")
+    # Using the first again makes the second the oldest
+    render_export('md', "first")
+    render_export('md', "third")
+    assert len(export._cache) == 2
+    assert render_export('md', "first") is first
+    keys = [key[0] for key in export._cache]
+    assert export.analysis_hash("second") not in keys
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        render_export('docx', TEXT)
+
+
+def test_markdown_is_escaped_in_html():
+    converted = markdown_to_html(
+        "## Risks & <gaps>\n"
+        "- **<script>alert(1)</script>** in a bullet\n"
+        "| Skill | Note |\n|---|---|\n| C++ | a < b |\n"
+        "Plain \"quoted\" <b>text</b>"
+    )
+    assert "<script>" not in converted and "<b>text" not in converted
+    assert "<h2>Risks &amp; &lt;gaps&gt;</h2>" in converted
+    assert "<li><strong>&lt;script&gt;alert(1)&lt;/script&gt;</strong> in a bullet</li>" in converted
+    assert "<td>a &lt; b</td>" in converted
+    assert "<p>Plain &quot;quoted&quot; &lt;b&gt;text&lt;/b&gt;</p>" in converted
+    assert b"<title>&lt;Alex&gt;</title>" in render_export('html', TEXT, title="<Alex>")
@@ -0,0 +1,100 @@
+import random
+import time
+
+import pytest
+
+from utils import history, near_duplicates
+from utils.fake_gemini import render_fake_report_json
+from utils.near_duplicates import NearDuplicateIndex
+from utils.report_schema import parse_report_json, report_to_dict
+
+REPORT = parse_report_json(render_fake_report_json('"summary" JSON object', random.Random(0)))
+
+
+def _snapshot(score=70, job_category="Software Engineer", report=REPORT):
+    return {
+        'job_category': job_category,
+        'depth': 'Comprehensive',
+        'structured_data': {'raw_text': "Alex Example\nPython", 'skills': {'technical': ['python']}},
+        'score': score,
+        'score_components': {'role_alignment': 20, 'impact_clarity': 15, 'ats_friendly': 20, 'project_relevance': 15},
+        'analysis_text': "## 📊 QUICK SUMMARY (TL;DR)\n- One",
+        'report': report,
+        'signature': None,
+    }
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    """A history database of its own, with a fresh near-duplicate index"""
+    pool = history.ConnectionPool(str(tmp_path / "history.db"), 2)
+    monkeypatch.setattr(history, '_pool', pool)
+    monkeypatch.setattr(near_duplicates, '_index', NearDuplicateIndex())
+    monkeypatch.setattr(near_duplicates, '_loader', object())
+    yield pool
+    pool.close()
+
+
+def _write(user_id, created_at, **snapshot):
+    history._write_batch([(user_id, "hash", _snapshot(**snapshot), 'full', created_at)])
+
+
+def test_saved_analysis_is_listed_and_loaded(pool):
+    history.record_analysis('alex', "hash", _snapshot(score=81), 'full')
+    history.flush()
+
+    listed = history.list_history('alex')
+    assert [(row['job_category'], row['score'], row['llm_mode']) for row in listed] == [
+        ("Software Engineer", 81, 'full')
+    ]
+    loaded = history.load_analysis('alex', listed[0]['id'])
+    assert loaded['score'] == 81
+    assert loaded['structured_data'] == _snapshot()['structured_data']
+    assert loaded['analysis_text'] == _snapshot()['analysis_text']
+    assert report_to_dict(loaded['report']) == report_to_dict(REPORT)
+
+
+def test_history_is_listed_newest_first(pool):
+    now = time.time()
+    _write('alex', now - 60, score=60)
+    _write('alex', now, score=70)
+    _write('alex', now - 30, score=65)
+    assert [row['score'] for row in history.list_history('alex')] == [70, 65, 60]
+    assert [row['score'] for row in history.list_history('alex', limit=1)] == [70]
+
+
+def test_users_see_only_their_own_analyses(pool):
+    _write('alex', time.time(), score=60)
+    _write('sam', time.time(), score=90)
+    [alex] = history.list_history('alex')
+    [sam] = history.list_history('sam')
+
+    assert alex['score'] == 60 and sam['score'] == 90
+    assert history.load_analysis('sam', alex['id']) is None
+    assert history.load_analysis('alex', sam['id']) is None
+    assert history.load_analysis('alex', alex['id'])['score'] == 60
+
+
+def test_analysis_with_an_outdated_report_loads_from_its_markdown(pool):
+    _write('alex', time.time())
+    [row] = history.list_history('alex')
+    with pool.connection() as conn:
+        conn.execute("UPDATE analyses SET report = ?", (history._pack('{"summary": []}'),))
+    loaded = history.load_analysis('alex', row['id'])
+    assert loaded['report'] is None
+    assert loaded['analysis_text'] == _snapshot()['analysis_text']
+
+
+def test_compaction_removes_old_and_surplus_analyses(pool):
+    now = time.time()
+    _write('alex', now - 100 * 86400, score=10)
+    for minutes, score in ((3, 30), (2, 40), (1, 50)):
+        _write('alex', now - minutes * 60, score=score)
+    _write('sam', now - 60, score=90)
+
+    assert history.compact(retention_days=90, max_per_user=2) == 2
+    assert [row['score'] for row in history.list_history('alex')] == [50, 40]
+    assert [row['score'] for row in history.list_history('sam')] == [90]
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] == 3
+    assert history.compact(retention_days=90, max_per_user=2) == 0
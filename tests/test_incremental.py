@@ -0,0 +1,97 @@
+import pytest
+
+from utils import incremental
+from utils.incremental import analyze_revision
+
+PAGES = [
+    """Alex Example
+alex@example.com
+
+Summary
+Backend engineer building reliable data services.
+
+Experience
+Software Engineer at Acme Jan 2019 - Present
+- Cut deployment time by 40% for 12 teams
+- Built a billing pipeline processing 2M events a day
+""",
+    """Skills
+Python, SQL, Docker, Kubernetes, AWS
+
+Education
+Bachelor of Science, State University 2016
+""",
+]
+
+
+def test_near_duplicate_reuse_keeps_its_score(backend, monkeypatch):
+    reused = {
+        'report': None,
+        'analysis_text': "## 💯 RESUME SCORE & BREAKDOWN\nOverall: 91/100",
+        'score': 91,
+        'score_components': {'role_alignment': 25, 'impact_clarity': 22, 'ats_friendly': 24, 'project_relevance': 20},
+    }
+    monkeypatch.setattr(
+        incremental, 'find_near_duplicate',
+        lambda *args: {'analysis_id': 1, 'similarity': 0.95, 'snapshot': reused}
+    )
+    snapshot, changes = analyze_revision(PAGES, "Software Engineer", depth='Detailed', user_id='user')
+
+    assert changes['llm_mode'] == 'near_duplicate'
+    assert snapshot['analysis_text'] == reused['analysis_text']
+    assert snapshot['score'] == changes['score'] == 91
+    assert snapshot['score_components'] == changes['score_components'] == reused['score_components']
+    assert backend.calls == 0
+
+
+@pytest.fixture
+def prompts(backend, monkeypatch):
+    """Prompts sent to the fake backend"""
+    sent = []
+    plan = backend._plan
+    monkeypatch.setattr(backend, '_plan', lambda prompt: sent.append(prompt) or plan(prompt))
+    return sent
+
+
+def test_unchanged_upload_is_reused(backend, fair_scheduler):
+    first, _ = analyze_revision(PAGES, "Software Engineer", depth='Comprehensive')
+    calls = backend.calls
+    snapshot, changes = analyze_revision(list(PAGES), "Software Engineer", previous=first, depth='Comprehensive')
+
+    assert snapshot is first
+    assert changes['llm_mode'] == 'reused'
+    assert changes['score'] == changes['previous_score'] == first['score']
+    assert backend.calls == calls
+
+
+def test_one_section_edit_sends_a_delta_prompt(prompts, fair_scheduler):
+    first, changes = analyze_revision(PAGES, "Software Engineer", depth='Comprehensive')
+    assert changes['llm_mode'] == 'full'
+    edited = [PAGES[0], PAGES[1].replace("Kubernetes, AWS", "Kubernetes, AWS, Terraform")]
+    del prompts[:]
+    snapshot, changes = analyze_revision(edited, "Software Engineer", previous=first, depth='Comprehensive')
+
+    assert changes['llm_mode'] == 'delta'
+    assert changes['changed_pages'] == [1]
+    assert changes['changed_sections'] == ['skills']
+    assert len(prompts) == 1
+    assert "only the top-level keys" in prompts[0]
+    assert "Terraform" in prompts[0]
+    assert snapshot['report'].role_fit == first['report'].role_fit
+
+
+@pytest.mark.parametrize('job_category, depth, llm_mode', [
+    ("Data Scientist", 'Comprehensive', 'full'),
+    ("Software Engineer", 'Detailed', 'hybrid'),
+])
+def test_other_role_or_depth_is_analyzed_in_full(prompts, fair_scheduler, job_category, depth, llm_mode):
+    first, _ = analyze_revision(PAGES, "Software Engineer", depth='Comprehensive')
+    del prompts[:]
+    snapshot, changes = analyze_revision(PAGES, job_category, previous=first, depth=depth)
+
+    assert snapshot is not first
+    assert changes['llm_mode'] == llm_mode
+    assert changes['previous_score'] is None
+    assert prompts and not any("only the top-level keys" in prompt for prompt in prompts)
+    assert snapshot['job_category'] == job_category
+    assert snapshot['depth'] == depth
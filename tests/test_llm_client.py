@@ -0,0 +1,106 @@
+import threading
+import time
+
+from conftest import fake_backend
+from utils import llm_client, metrics
+from utils.cancellation import cancellable
+from utils.llm_client import CircuitBreaker, complete, get_breaker, get_latency_tracker
+
+
+def _latencies(backend, *seconds):
+    # Latency of each call in turn, then the last one
+    remaining = list(seconds)
+    backend._sample_latency = lambda rng: remaining.pop(0) if len(remaining) > 1 else remaining[0]
+
+
+def test_breaker_opens_after_repeated_failures():
+    breaker = CircuitBreaker('breaker-open', failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+
+def test_breaker_lets_one_probe_through_and_closes_on_success():
+    breaker = CircuitBreaker('breaker-close', failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker('breaker-reopen', failure_threshold=3, reset_seconds=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+
+def test_complete_short_circuits_once_open():
+    backend = fake_backend(error_rate=1.0)
+    for _ in range(llm_client.BREAKER_FAILURE_THRESHOLD):
+        assert complete("prompt", backend, hedge=False) is None
+    assert get_breaker(backend).state == 'open'
+    calls = backend.calls
+    assert complete("prompt", backend, hedge=False) is None
+    assert backend.calls == calls
+    assert metrics.get_counter('llm_requests_total', backend=backend.name, outcome='short_circuited') == 1
+
+
+def test_complete_falls_back_when_budget_runs_out():
+    backend = fake_backend(latency=1.0)
+    started = time.monotonic()
+    assert complete("prompt", backend, budget_seconds=0.1, hedge=False) is None
+    assert time.monotonic() - started < 0.5
+    assert get_breaker(backend).failures == 1
+    assert metrics.get_counter('llm_requests_total', backend=backend.name, outcome='timeout') == 1
+
+
+def test_slow_request_is_hedged():
+    backend = fake_backend(response_text="answer")
+    tracker = get_latency_tracker(backend)
+    for _ in range(llm_client.HEDGE_MIN_SAMPLES):
+        tracker.record(0.05)
+    _latencies(backend, 2.0, 0.0)
+
+    started = time.monotonic()
+    assert complete("prompt", backend, budget_seconds=5, hedge=True) == "answer"
+    assert time.monotonic() - started < 1.0
+    assert backend.calls == 2
+    assert metrics.get_counter('llm_hedge_wins_total', backend=backend.name) == 1
+
+
+def test_no_hedge_without_enough_latencies():
+    backend = fake_backend(response_text="answer", latency=0.2)
+    assert complete("prompt", backend, budget_seconds=5, hedge=True) == "answer"
+    assert backend.calls == 1
+
+
+def test_hedge_stops_when_analysis_is_cancelled(monkeypatch):
+    backend = fake_backend(response_text="answer", latency=1.0)
+    tracker = get_latency_tracker(backend)
+    for _ in range(llm_client.HEDGE_MIN_SAMPLES):
+        tracker.record(0.05)
+    tokens = []
+    generate = llm_client._timed_generate
+
+    def timed_generate(backend, prompt, token=None):
+        tokens.append(token)
+        return generate(backend, prompt, token)
+
+    monkeypatch.setattr(llm_client, '_timed_generate', timed_generate)
+    with cancellable() as token:
+        threading.Timer(0.3, token.cancel).start()
+        assert complete("prompt", backend, budget_seconds=5, hedge=True) is None
+
+    assert len(tokens) == 2
+    assert all(seen is token for seen in tokens)
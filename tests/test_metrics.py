@@ -0,0 +1,18 @@
+from utils import metrics
+
+
+def test_snapshot_filters_by_prefix():
+    metrics.increment('prefix_test_calls_total', outcome='ok')
+    metrics.set_gauge('other_test_gauge', 1)
+    current = metrics.snapshot(['prefix_test_'])
+    assert current['counters'] == {'prefix_test_calls_total{outcome=ok}': 1}
+    assert current['gauges'] == {}
+
+
+def test_export_text_is_prometheus_format():
+    metrics.increment('export_test_total', backend='fake', outcome='ok')
+    metrics.observe('export_test_seconds', 0.25, backend='fake')
+    lines = metrics.export_text(['export_test_']).splitlines()
+    assert 'export_test_total{backend="fake",outcome="ok"} 1' in lines
+    assert 'export_test_seconds_count{backend="fake"} 1' in lines
+    assert 'export_test_seconds{backend="fake",quantile="0.95"} 0.25' in lines
@@ -0,0 +1,98 @@
+import pytest
+
+from conftest import fake_backend
+from utils import ai_analysis, model_router
+from utils.ai_analysis import generate_analysis, get_model_backend
+from utils.llm_client import get_breaker, get_latency_tracker
+from utils.model_router import (
+    ROUTER_MIN_QUALITY, ROUTER_MIN_SAMPLES, QualityTracker, choose_tier, record_response, use_route,
+)
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    """A fake backend per tier and fresh quality trackers"""
+    backends = {tier: fake_backend(name=f"fake-{tier}", response_text="ok") for tier in model_router.MODEL_TIERS}
+    monkeypatch.setattr(ai_analysis, '_backends', dict(backends))
+    monkeypatch.setattr(ai_analysis, '_backend_override', None)
+    monkeypatch.setattr(model_router, '_quality', {tier: QualityTracker() for tier in model_router.MODEL_TIERS})
+    monkeypatch.setattr(model_router, 'ROUTER_ENABLED', True)
+    return backends
+
+
+def _features(complexity):
+    return {'tokens': int(model_router.ROUTER_REFERENCE['tokens'] * complexity), 'sections': 1, 'skills': 0}
+
+
+def test_depth_thresholds(tiers):
+    features = _features(0.8)
+    assert choose_tier(features, 'Detailed') == ('fast', 'simple')
+    assert choose_tier(features, 'Comprehensive') == ('strong', 'complex')
+    assert choose_tier(features) == ('strong', 'complex')
+    assert choose_tier(_features(1.2), 'Detailed') == ('strong', 'complex')
+    assert choose_tier(_features(0.2), 'Comprehensive') == ('fast', 'simple')
+
+
+def test_route_sends_calls_to_its_tier(tiers):
+    with use_route({'tier': 'fast'}):
+        assert get_model_backend() is tiers['fast']
+        assert generate_analysis("prompt") == "ok"
+    assert tiers['fast'].calls == 1
+    assert tiers['strong'].calls == 0
+    assert get_model_backend() is tiers[model_router.DEFAULT_TIER]
+
+
+def test_low_fast_quality_routes_to_strong(tiers):
+    with use_route({'tier': 'fast'}):
+        for i in range(ROUTER_MIN_SAMPLES):
+            record_response(i / ROUTER_MIN_SAMPLES >= ROUTER_MIN_QUALITY)
+    assert choose_tier(_features(0.2), 'Detailed') == ('strong', 'fast_quality')
+
+
+def test_good_fast_quality_keeps_fast(tiers):
+    with use_route({'tier': 'fast'}):
+        for _ in range(ROUTER_MIN_SAMPLES):
+            record_response(True)
+    assert choose_tier(_features(0.2), 'Detailed') == ('fast', 'simple')
+
+
+def test_quality_needs_enough_samples(tiers):
+    with use_route({'tier': 'fast'}):
+        record_response(False)
+    assert choose_tier(_features(0.2), 'Detailed') == ('fast', 'simple')
+
+
+def test_responses_outside_a_route_are_not_recorded(tiers):
+    for _ in range(ROUTER_MIN_SAMPLES):
+        record_response(False)
+    assert model_router._quality['fast'].quality(min_samples=1) is None
+    assert model_router._quality['strong'].quality(min_samples=1) is None
+
+
+def test_open_circuit_swaps_tier(tiers):
+    breaker = get_breaker(tiers['strong'])
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert choose_tier(_features(2.0), 'Comprehensive') == ('fast', 'circuit_open')
+
+
+def test_both_circuits_open_keeps_tier(tiers):
+    for backend in tiers.values():
+        breaker = get_breaker(backend)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+    assert choose_tier(_features(2.0), 'Comprehensive') == ('strong', 'complex')
+
+
+def test_slow_tier_is_swapped_within_budget(tiers):
+    for _ in range(ROUTER_MIN_SAMPLES):
+        get_latency_tracker(tiers['strong']).record(20.0)
+        get_latency_tracker(tiers['fast']).record(1.0)
+    assert choose_tier(_features(2.0), 'Comprehensive', budget_seconds=10) == ('fast', 'latency')
+    assert choose_tier(_features(2.0), 'Comprehensive', budget_seconds=30) == ('strong', 'complex')
+    assert choose_tier(_features(2.0), 'Comprehensive') == ('strong', 'complex')
+
+
+def test_disabled_router_uses_default_tier(tiers, monkeypatch):
+    monkeypatch.setattr(model_router, 'ROUTER_ENABLED', False)
+    assert choose_tier(_features(0.1), 'Detailed') == (model_router.DEFAULT_TIER, 'disabled')
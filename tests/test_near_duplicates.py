@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from utils import history, near_duplicates
+from utils.near_duplicates import NearDuplicateIndex, minhash
+
+TEXTS = [
+    " ".join(f"{word}{i}" for i in range(200)) for word in ("alpha", "beta", "gamma", "delta")
+]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """A fresh process-wide index, treated as loaded"""
+    fresh = NearDuplicateIndex()
+    monkeypatch.setattr(near_duplicates, '_index', fresh)
+    monkeypatch.setattr(near_duplicates, '_loader', object())
+    return fresh
+
+
+def test_removed_signatures_are_not_returned():
+    index = NearDuplicateIndex()
+    for key, text in enumerate(TEXTS):
+        index.add(key, minhash(text))
+    index.remove([1])
+    assert len(index) == 3
+    assert index.query(minhash(TEXTS[1])) == []
+    assert [key for key, _ in index.query(minhash(TEXTS[2]))] == [2]
+
+
+def test_dropping_removed_positions_keeps_the_others(monkeypatch):
+    monkeypatch.setattr(near_duplicates, 'MERGE_THRESHOLD', 1)
+    index = NearDuplicateIndex()
+    index.load((key, minhash(text)) for key, text in enumerate(TEXTS))
+    index.remove([0, 2])
+    assert len(index._keys) == 2 and not index._removed
+    for key, text in enumerate(TEXTS):
+        assert [match for match, _ in index.query(minhash(text))] == ([] if key in (0, 2) else [key])
+
+
+def test_compaction_removes_deleted_analyses_from_the_index(tmp_path, monkeypatch, index):
+    monkeypatch.setattr(history, '_pool', history.ConnectionPool(str(tmp_path / "history.db"), 2))
+    now = time.time()
+    with history.get_pool().connection() as conn:
+        for created_at, text in ((now - 100 * 86400, TEXTS[0]), (now, TEXTS[1])):
+            signature = minhash(text)
+            analysis_id = conn.execute(
+                "INSERT INTO analyses (user_id, job_category, upload_hash, created_at, signature) "
+                "VALUES ('user', 'Data Scientist', 'hash', ?, ?)",
+                (created_at, signature.tobytes())
+            ).lastrowid
+            index.add(analysis_id, signature)
+
+    assert history.compact(retention_days=90) == 1
+    assert index.query(minhash(TEXTS[0])) == []
+    assert len(index.query(minhash(TEXTS[1]))) == 1
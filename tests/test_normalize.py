@@ -0,0 +1,75 @@
+from utils.ai_analysis import detect_resume_risks
+from utils.normalize import PAGE_SEPARATOR, normalize_pages
+
+
+def _positions(normalized):
+    return [normalized.position(offset) for offset in range(len(normalized.text))]
+
+
+def test_ligatures_expand_and_map_to_the_ligature():
+    pages = ["Oﬃce ﬁles"]
+    normalized = normalize_pages(pages)
+    assert normalized.text == "Office files"
+    assert normalized.position(0) == (0, 0)
+    # Characters after a ligature map back past it
+    assert normalized.position(4) == (0, 2)
+    assert normalized.position(7) == (0, 5)
+
+
+def test_hyphenated_wrap_is_joined():
+    page = "devel-\nopment"
+    normalized = normalize_pages([page])
+    assert normalized.text == "development"
+    assert page[normalized.position(5)[1]:] == "opment"
+
+
+def test_soft_hyphens_and_zero_width_characters_are_removed():
+    page = "re­sume​ text"
+    normalized = normalize_pages([page])
+    assert normalized.text == "resume text"
+    assert page[normalized.position(2)[1]:].startswith("sume")
+
+
+def test_tabs_are_kept_for_the_formatting_check():
+    normalized = normalize_pages(["Skills\tPython\t \nExperience"])
+    assert normalized.text == "Skills\tPython\nExperience"
+    skills = {'technical': [], 'tools': [], 'soft_skills': []}
+    structured = {'skills': skills, 'experience': [], 'raw_text': normalized.text}
+    assert 'Poor Formatting' not in [risk['type'] for risk in detect_resume_risks(structured)]
+
+
+def test_leading_whitespace_is_stripped_with_offsets_kept():
+    page = "\n\n  Jane Doe"
+    normalized = normalize_pages([page])
+    assert normalized.text == "Jane Doe"
+    assert normalized.position(0) == (0, page.index("Jane"))
+
+
+def test_pages_join_with_one_blank_line():
+    pages = ["First page\r\n", "", "\nSecond page  \n\n"]
+    normalized = normalize_pages(pages)
+    assert normalized.text == "First page" + PAGE_SEPARATOR + "Second page"
+    second = normalized.text.index("Second")
+    assert normalized.position(second) == (2, 1)
+    assert normalized.page_of(second - 1) == 0
+    assert normalized.page_of(0) == 0
+
+
+def test_every_literal_character_maps_to_itself():
+    pages = ["Jane  Doe Engineer", "Python, “Go”"]
+    normalized = normalize_pages(pages)
+    for offset, (page, source) in enumerate(_positions(normalized)):
+        if normalized.text[offset] not in " \n":
+            assert pages[page][source].translate({0x201c: '"', 0x201d: '"'}) == normalized.text[offset]
+
+
+def test_locate_finds_fragments_on_their_page():
+    pages = ["Summary of the candidate", "Built a payments platform serving ten million users"]
+    normalized = normalize_pages(pages)
+    assert normalized.locate("payments platform serving ten million") == (1, pages[1].index("payments"))
+    assert normalized.locate("too short") is None
+    assert normalized.locate("not anywhere in the resume text") is None
+
+
+def test_pages_without_text_give_none():
+    assert normalize_pages(["", " \n", None]) is None
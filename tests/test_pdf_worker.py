@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from utils import pdf_worker
+from utils.pdf_worker import InvalidPdfError, PdfTimeoutError, PdfTooLargeError, PdfTooManyPagesError
+from utils.pdf_writer import build_text_pdf, paginate
+
+PDF = build_text_pdf(paginate([f"Line {i}" for i in range(150)], lines_per_page=50))
+
+
+@pytest.fixture
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(pdf_worker, 'DEADLINE_POLL_SECONDS', 0.02)
+
+
+@pytest.fixture
+def fresh_pool():
+    yield
+    pool = pdf_worker._pool
+    if pool is not None:
+        pdf_worker._discard_pool(pool)
+
+
+def test_oversized_upload_is_rejected(monkeypatch):
+    monkeypatch.setattr(pdf_worker, 'MAX_UPLOAD_BYTES', len(PDF) - 1)
+    with pytest.raises(PdfTooLargeError):
+        pdf_worker.extract_pages(PDF)
+
+
+def test_missing_header_is_rejected():
+    with pytest.raises(InvalidPdfError, match="header"):
+        pdf_worker.check_pdf_bytes(b"x" * pdf_worker.HEADER_SEARCH_BYTES + PDF)
+
+
+def test_missing_trailer_is_rejected():
+    with pytest.raises(InvalidPdfError, match="trailer"):
+        pdf_worker.check_pdf_bytes(PDF[:PDF.rindex(b"%%EOF")])
+
+
+def test_pages_are_extracted(fresh_pool):
+    pages = pdf_worker.extract_pages(PDF)
+    assert len(pages) == 3
+    assert "Line 50" in pages[1]
+
+
+def test_page_limit_is_enforced(monkeypatch, fresh_pool):
+    monkeypatch.setattr(pdf_worker, 'MAX_PAGES', 2)
+    with pytest.raises(PdfTooManyPagesError):
+        pdf_worker.extract_pages(PDF)
+
+
+def test_running_parse_times_out(fast_polls):
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(time.sleep, 1)
+        with pytest.raises(FutureTimeoutError):
+            pdf_worker._await_parse(future, None, 0.1)
+
+
+def test_time_queued_does_not_count_towards_the_deadline(fast_polls):
+    release = threading.Event()
+    with ThreadPoolExecutor(1) as executor:
+        executor.submit(release.wait)
+        queued = executor.submit(lambda: 'parsed')
+        threading.Timer(0.3, release.set).start()
+        assert pdf_worker._await_parse(queued, None, 0.1) == 'parsed'
+
+
+def test_deadline_counts_from_the_worker_start_time(monkeypatch, fast_polls):
+    monkeypatch.setattr(pdf_worker, '_start_times_shared', [0.0])
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(time.sleep, 1)
+        pdf_worker._start_times_shared[0] = time.time() - 1
+        started = time.monotonic()
+        with pytest.raises(FutureTimeoutError):
+            pdf_worker._await_parse(future, 0, 0.1)
+        # Already running for longer than the deadline when first polled
+        assert time.monotonic() - started < 0.5
+
+
+def test_timeout_discards_the_pool(monkeypatch, fresh_pool):
+    def overrun(future, slot, timeout):
+        raise FutureTimeoutError()
+
+    discarded = []
+    discard_pool = pdf_worker._discard_pool
+    monkeypatch.setattr(pdf_worker, '_await_parse', overrun)
+    monkeypatch.setattr(pdf_worker, '_discard_pool', lambda pool: discarded.append(pool) or discard_pool(pool))
+    with pytest.raises(PdfTimeoutError):
+        pdf_worker.extract_pages(PDF)
+    assert len(discarded) == 1
+    assert pdf_worker._pool is None
@@ -0,0 +1,105 @@
+import copy
+import json
+import random
+
+import pytest
+
+from utils.fake_gemini import render_fake_report_json
+from utils.report_schema import (
+    AnalysisReport, ReportValidationError, parse_report_json, report_from_dict, report_to_dict,
+    report_to_markdown, split_markdown_sections,
+)
+
+VALID = {
+    "summary": ["One", "Two", "Three", "Four", "Five"],
+    "score": {"overall": 72, "role_alignment": 20, "impact_clarity": 15, "ats_friendliness": 22, "project_relevance": 15},
+    "role_fit": "Good fit for backend roles.",
+    "skill_gap": [{"category": "Technical Skills", "strong_match": "Python", "partial_match": "Go", "missing": "Rust"}],
+    "hiring_manager": {"first_impression": "Clear", "stands_out": "Impact", "raises_doubts": "Gaps", "decision": "Yes - strong"},
+    "risks": ["Short tenure"],
+    "improvements": ["Quantify", "Reorder", "Trim"],
+    "rewrites": [{"before": "Did stuff", "after": "Cut costs 20%", "why_better": "Quantified"}],
+}
+
+
+def _with(path, value):
+    data = copy.deepcopy(VALID)
+    target = data
+    for key in path[:-1]:
+        target = target[key]
+    if value is KeyError:
+        del target[path[-1]]
+    else:
+        target[path[-1]] = value
+    return data
+
+
+def test_valid_report():
+    report = report_from_dict(VALID)
+    assert isinstance(report, AnalysisReport)
+    assert report.score.overall == 72
+    assert report.skill_gap[0].missing == "Rust"
+    assert report_to_dict(report) == VALID
+
+
+def test_integral_floats_are_accepted():
+    assert report_from_dict(_with(('score', 'overall'), 72.0)).score.overall == 72
+
+
+@pytest.mark.parametrize('path', [('role_fit',), ('score',), ('score', 'impact_clarity'), ('hiring_manager', 'decision')])
+def test_missing_key_is_rejected(path):
+    with pytest.raises(ReportValidationError):
+        report_from_dict(_with(path, KeyError))
+
+
+@pytest.mark.parametrize('path, value', [
+    (('score', 'overall'), "72"),
+    (('score', 'overall'), 72.5),
+    (('score', 'overall'), True),
+    (('summary',), "One"),
+    (('risks',), [1]),
+    (('skill_gap',), [{"category": "Technical Skills"}]),
+    (('role_fit',), None),
+])
+def test_wrong_type_is_rejected(path, value):
+    with pytest.raises(ReportValidationError):
+        report_from_dict(_with(path, value))
+
+
+@pytest.mark.parametrize('path, value', [
+    (('score', 'overall'), 250),
+    (('score', 'overall'), -1),
+    (('score', 'role_alignment'), -3),
+    (('score', 'project_relevance'), 26),
+])
+def test_out_of_range_score_is_rejected(path, value):
+    with pytest.raises(ReportValidationError, match="must be 0-"):
+        report_from_dict(_with(path, value))
+
+
+def test_scores_at_the_bounds_are_accepted():
+    report_from_dict(_with(('score', 'overall'), 100))
+    report_from_dict(_with(('score', 'role_alignment'), 0))
+
+
+def test_parse_report_json_accepts_a_code_fence():
+    report = parse_report_json("```json\n" + json.dumps(VALID) + "\n```")
+    assert report.role_fit == VALID['role_fit']
+
+
+def test_parse_report_json_rejects_invalid_json():
+    with pytest.raises(ReportValidationError):
+        parse_report_json('{"summary": [')
+
+
+def test_markdown_has_every_section():
+    sections = split_markdown_sections(report_to_markdown(report_from_dict(VALID)))
+    assert set(sections) == {
+        'quick_summary', 'resume_score', 'role_fit', 'skill_gap', 'hiring_manager', 'risks', 'improvements', 'rewrites'
+    }
+
+
+def test_fake_model_report_is_valid():
+    text = render_fake_report_json('Return a JSON object: {"summary": ...}\n**TARGET ROLE:** Data Scientist', random.Random(1))
+    report = parse_report_json(text)
+    assert 0 <= report.score.overall <= 100
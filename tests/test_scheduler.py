@@ -0,0 +1,28 @@
+from utils import scheduler
+from utils.scheduler import FairScheduler
+
+
+def test_session_rate_limits_calls():
+    fair = FairScheduler(rpm=0, tpm=0, session_burst=2)
+    assert fair.acquire('a', 100) is not None
+    assert fair.acquire('a', 100) is not None
+    assert fair.acquire('a', 100) is None
+    assert fair.acquire('b', 100) is not None
+
+
+def test_idle_sessions_are_forgotten_on_a_timer(monkeypatch):
+    fair = FairScheduler(rpm=0, tpm=0)
+    fair.acquire('idle', 100)
+    fair.release()
+    monkeypatch.setattr(scheduler, 'LLM_SESSION_IDLE_SECONDS', 0)
+    fair.acquire('active', 100)
+    fair.release()
+    # Not swept again before the sweep interval has passed
+    assert 'idle' in fair._buckets
+
+    monkeypatch.setattr(scheduler, 'LLM_SESSION_SWEEP_SECONDS', 0)
+    fair.acquire('active', 100)
+    fair.release()
+    assert 'idle' not in fair._buckets
+    assert 'idle' not in fair._last_finish
+    assert 'active' in fair._buckets
@@ -0,0 +1,31 @@
+import pytest
+
+from utils.ai_analysis import SECTION_HEADINGS, analyze_resume_by_section
+from utils.scheduler import LLM_SESSION_BURST, session_scope
+
+RESUME = """Alex Example
+Experience
+Software Engineer at Acme Jan 2019 - Present
+- Cut deployment time by 40% for 12 teams
+Skills
+Python, SQL, Docker
+"""
+
+
+def test_sectioned_analysis_is_one_admission(backend, fair_scheduler):
+    with session_scope('sections') as usage:
+        sections = list(analyze_resume_by_section(RESUME, "Software Engineer", budget_seconds=30))
+
+    assert {section for section, _, _ in sections} == set(SECTION_HEADINGS)
+    assert all(from_model for _, _, from_model in sections)
+    assert backend.calls == len(SECTION_HEADINGS)
+    assert usage.throttled == 0
+    assert fair_scheduler._buckets['sections'].tokens == pytest.approx(LLM_SESSION_BURST - 1, abs=0.1)
+
+
+def test_second_sectioned_analysis_is_not_throttled(backend, fair_scheduler):
+    with session_scope('again') as usage:
+        for _ in range(2):
+            list(analyze_resume_by_section(RESUME, "Software Engineer", budget_seconds=30))
+    assert usage.throttled == 0
+    assert backend.calls == 2 * len(SECTION_HEADINGS)
@@ -0,0 +1,33 @@
+from utils import session_store
+from utils.session_store import SessionStore
+
+
+def _store(tmp_path, active):
+    return SessionStore(1 << 20, 1 << 30, str(tmp_path), 3600, is_active=lambda session_id: session_id in active)
+
+
+def test_drop_session_removes_its_data(tmp_path):
+    store = _store(tmp_path, set())
+    store.put('a', 'key', 'value')
+    store.put('b', 'key', 'value')
+    store.drop_session('a')
+    assert store.get('a', 'key') is None
+    assert store.get('b', 'key') == 'value'
+
+
+def test_closed_sessions_are_dropped_after_reconnect_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store, 'SESSION_SWEEP_SECONDS', 0)
+    active = {'open', 'closed'}
+    store = _store(tmp_path, active)
+    store.put('open', 'key', 'value')
+    store.put('closed', 'key', 'value')
+
+    active.discard('closed')
+    store.put('open', 'key', 'newer')
+    # Disconnected sessions may still reconnect
+    assert store.get('closed', 'key') == 'value'
+
+    monkeypatch.setattr(session_store, 'SESSION_RECONNECT_SECONDS', 0)
+    store.put('open', 'key', 'newest')
+    assert store.get('closed', 'key') is None
+    assert set(store.report()['sessions']) == {'open'}
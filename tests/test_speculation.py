@@ -0,0 +1,95 @@
+import threading
+import types
+from collections import OrderedDict
+
+import pytest
+
+from utils import speculation
+from utils.speculation import claim_speculation, speculate
+
+PAGES = ["""Alex Example
+Experience
+Software Engineer at Acme Jan 2019 - Present
+- Cut deployment time by 40% for 12 teams
+Skills
+Python, SQL, Docker
+"""]
+ROLES = ["Software Engineer", "Data Scientist"]
+
+
+def _upload(file_id, data=b"%PDF-1.4 resume %%EOF"):
+    return types.SimpleNamespace(file_id=file_id, getvalue=lambda: data)
+
+
+@pytest.fixture
+def extraction(monkeypatch):
+    """Extraction returns PAGES once released; released by default"""
+    released = threading.Event()
+    released.set()
+
+    def extract_pages(data):
+        released.wait(5)
+        return list(PAGES)
+
+    monkeypatch.setattr(speculation, 'extract_pages', extract_pages)
+    monkeypatch.setattr(speculation, 'load_snapshot', lambda key: None)
+    monkeypatch.setattr(speculation, '_speculations', OrderedDict())
+    return released
+
+
+def test_matching_speculation_is_used(extraction):
+    speculate('session', _upload('file'), "Software Engineer", 'Standard', ROLES, None)
+    claimed = claim_speculation('session', 'file')
+
+    pages, prepared = claimed.pages()
+    assert pages == PAGES
+    assert set(prepared['scores']) == set(ROLES)
+    snapshot, changes = claimed.analysis("Software Engineer", 'Standard', None)
+    assert snapshot['job_category'] == "Software Engineer"
+    assert snapshot['depth'] == 'Standard'
+    assert changes['llm_mode'] == 'local'
+
+
+def test_other_file_is_not_claimed_and_discards_the_speculation(extraction):
+    speculate('session', _upload('file'), "Software Engineer", 'Standard', ROLES, None)
+    first = claim_speculation('session', 'file')
+    assert claim_speculation('session', 'other') is None
+
+    speculate('session', _upload('other'), "Software Engineer", 'Standard', ROLES, None)
+    assert first.token.cancelled and first.token.reason == 'discarded'
+    assert claim_speculation('session', 'file') is None
+    assert claim_speculation('session', 'other') is not first
+
+    speculate('session', None, "Software Engineer", 'Standard', ROLES, None)
+    assert claim_speculation('session', 'other') is None
+
+
+@pytest.mark.parametrize('job_category, depth', [("Data Scientist", 'Standard'), ("Software Engineer", 'Detailed')])
+def test_analysis_for_other_options_is_not_used(extraction, job_category, depth):
+    speculate('session', _upload('file'), "Software Engineer", 'Standard', ROLES, None)
+    claimed = claim_speculation('session', 'file')
+    assert claimed.analysis(job_category, depth, None) is None
+    # The prepared pages are still used
+    assert claimed.pages()[0] == PAGES
+
+
+def test_analysis_against_another_previous_snapshot_is_not_used(extraction):
+    speculate('session', _upload('file'), "Software Engineer", 'Standard', ROLES, None)
+    claimed = claim_speculation('session', 'file')
+    previous = {'page_fingerprints': ['older'], 'job_category': "Software Engineer"}
+    assert claimed.analysis("Software Engineer", 'Standard', previous) is None
+
+
+def test_changing_options_cancels_the_speculative_analysis(extraction):
+    extraction.clear()
+    speculate('session', _upload('file'), "Software Engineer", 'Standard', ROLES, None)
+    claimed = claim_speculation('session', 'file')
+    first = claimed._analysis
+
+    speculate('session', _upload('file'), "Data Scientist", 'Standard', ROLES, None)
+    extraction.set()
+    assert first['token'].cancelled and first['token'].reason == 'discarded'
+    assert first['future'].result(timeout=5) is None
+    assert claim_speculation('session', 'file') is claimed
+    snapshot, _ = claimed.analysis("Data Scientist", 'Standard', None)
+    assert snapshot['job_category'] == "Data Scientist"
@@ -0,0 +1,64 @@
+import datetime
+
+from utils.timeline import analyze_timeline, parse_experience
+
+TODAY = datetime.date(2024, 6, 1)
+
+
+def _entries(*lines):
+    return parse_experience("Experience\n" + "\n".join(lines), today=TODAY)
+
+
+def test_bare_year_range_within_one_year_covers_the_year():
+    entries = _entries("Engineer at Acme 2020 - 2020")
+    assert entries[0]['start'] == '2020-01'
+    assert entries[0]['end'] == '2020-12'
+    assert entries[0]['months'] == 12
+    assert analyze_timeline(entries, today=TODAY)['inverted'] == []
+
+
+def test_bare_year_end_is_inclusive():
+    entries = _entries("Engineer at Acme 2019 - 2021")
+    assert entries[0]['end'] == '2021-12'
+    assert entries[0]['months'] == 36
+    assert analyze_timeline(entries, today=TODAY)['total_months'] == 36
+
+
+def test_month_end_is_inclusive():
+    entries = _entries("Engineer at Acme Mar 2020 - Jun 2021")
+    assert entries[0]['months'] == 16
+    assert not entries[0]['approximate']
+
+
+def test_bare_years_meeting_in_a_year_do_not_overlap():
+    entries = _entries(
+        "Engineer at Acme 2017 - 2019",
+        "Engineer at Initech 2019 - 2021",
+        "Engineer at Globex 2021 - Present",
+    )
+    timeline = analyze_timeline(entries, today=TODAY)
+    assert timeline['overlaps'] == []
+    assert timeline['gaps'] == []
+
+
+def test_dated_overlap_is_reported():
+    entries = _entries(
+        "Engineer at Acme Jan 2018 - Dec 2020",
+        "Engineer at Initech Jan 2020 - Present",
+    )
+    overlaps = analyze_timeline(entries, today=TODAY)['overlaps']
+    assert [months for _, _, months in overlaps] == [12]
+
+
+def test_bare_year_end_in_the_current_year_is_not_future():
+    today = datetime.date(2026, 10, 19)
+    entries = parse_experience("Experience\nEngineer at Acme 2022 - 2026", today=today)
+    assert entries[0]['end'] == '2026-10'
+    timeline = analyze_timeline(entries, today=today)
+    assert timeline['future'] == []
+    assert timeline['total_months'] == 58
+
+
+def test_bare_year_end_in_a_later_year_is_future():
+    entries = _entries("Engineer at Acme 2022 - 2027")
+    assert analyze_timeline(entries, today=TODAY)['future'] == entries
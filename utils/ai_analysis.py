@@ -1,33 +1,178 @@
-import google.generativeai as genai
 import streamlit as st
+import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import metrics
+from utils.llm_client import GeminiBackend, complete
+from utils.scheduler import admitted, single_admission, submit_in_context
+from utils.cancellation import check, current_token
+from utils.chunking import LLM_PROMPT_BUDGET_CHARS, split_chunks, get_chunk_cache
+from utils.model_router import MODEL_TIERS, current_tier, record_response
+from utils.replay import record_model_call
+from utils.timeline import analyze_timeline, EARLIEST_PLAUSIBLE_YEAR
+from utils.report_schema import (
+    AnalysisReport, ScoreBreakdown, SkillGapRow, HiringManagerView, Rewrite,
+    ReportValidationError, JSON_SCHEMA_PROMPT, NARRATIVE_SCHEMA_PROMPT, SECTION_HEADINGS,
+    parse_report_json, parse_narrative_json, report_to_markdown, split_markdown_sections
+)
+
+# "json" asks the model for a schema-constrained JSON report (see
+# utils.report_schema); "markdown" keeps the free-form markdown layout
+OUTPUT_MODE = os.environ.get("ANALYSIS_OUTPUT_MODE", "json")
+
+# "full" asks the model for the whole report; "hybrid" computes score, risks,
+# hiring-manager review and rewrites locally and asks only for the narrative;
+# "sections" sends one concurrent prompt per report section
+ANALYSIS_STRATEGY = os.environ.get("ANALYSIS_STRATEGY", "full")
+
+# The analysis depths offered in the upload form: the strategy each runs and
+# its end-to-end latency target, which is also the budget of its model calls.
+# Standard uses only the local engines, Detailed adds the compact narrative
+# prompt of the hybrid strategy, Comprehensive asks for the whole report
+# (one prompt, or one per section with ANALYSIS_STRATEGY=sections)
+DEPTH_TIERS = {
+    'Standard': {
+        'strategy': 'local',
+        'target_seconds': float(os.environ.get("DEPTH_STANDARD_TARGET_SECONDS", 1)),
+    },
+    'Detailed': {
+        'strategy': 'hybrid',
+        'target_seconds': float(os.environ.get("DEPTH_DETAILED_TARGET_SECONDS", 10)),
+    },
+    'Comprehensive': {
+        'strategy': 'sections' if ANALYSIS_STRATEGY == 'sections' else 'full',
+        'target_seconds': float(os.environ.get("DEPTH_COMPREHENSIVE_TARGET_SECONDS", 30)),
+    },
+}
+
+# Runs the local engines of the hybrid mode next to the model request
+_local_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="local-analysis")
+
+# Section prompts in flight at once across all sessions, and extra attempts
+# for a section whose response failed or came back empty
+SECTION_CONCURRENCY = int(os.environ.get("LLM_SECTION_CONCURRENCY", 4))
+SECTION_RETRIES = int(os.environ.get("LLM_SECTION_RETRIES", 1))
+_section_executor = ThreadPoolExecutor(max_workers=SECTION_CONCURRENCY, thread_name_prefix="llm-section")
+
+# Chunk summaries of a long resume in flight at once (see utils.chunking),
+# and the share of the analysis budget they may take; the final prompt
+# gets the rest
+CHUNK_CONCURRENCY = int(os.environ.get("LLM_CHUNK_CONCURRENCY", 8))
+CHUNK_BUDGET_SHARE = float(os.environ.get("LLM_CHUNK_BUDGET_SHARE", 0.5))
+CHUNK_SUMMARY_WORDS = 150
+RESUME_HEADING = "RESUME TO ANALYZE"
+DIGEST_HEADING = "RESUME DIGEST (a long resume, summarized part by part)"
+_chunk_executor = ThreadPoolExecutor(max_workers=CHUNK_CONCURRENCY, thread_name_prefix="llm-chunk")
+
+# What each section prompt asks for, in the layout of the full prompt
+SECTION_INSTRUCTIONS = {
+    'quick_summary': "- 5 bullet points highlighting the most critical findings",
+    'resume_score': """Overall Score: X/100
+    - Role Alignment: X/25
+    - Impact Clarity: X/25
+    - ATS Friendliness: X/25
+    - Project Relevance: X/25""",
+    'role_fit': "How well does this resume align with {job_category}?",
+    'skill_gap': """| Skill Category | Strong Match | Partial Match | Missing But Important |
+    |----------------|--------------|---------------|----------------------|
+    | Technical Skills | ... | ... | ... |
+    | Tools & Technologies | ... | ... | ... |
+    | Soft Skills | ... | ... | ... |""",
+    'hiring_manager': """Simulate how a real recruiter would read this resume in 30 seconds:
+    - First impression summary
+    - What stands out
+    - What raises doubts
+    - Likely shortlist decision (Yes / Maybe / No + reason)""",
+    'risks': """Identify potential red flags:
+    - Skill dumping
+    - Buzzwords without proof
+    - Too many technologies for experience level
+    - Inconsistent timelines""",
+    'improvements': """1. Most impactful change
+    2. Second most important
+    3. Third priority improvement""",
+    'rewrites': """Rewrite one weak experience bullet → strong, impact-driven version
+    Rewrite one weak project description → problem-solution-result format
+    Use "**Before:**", "**After:**" and "**Why better:**" lines.""",
+}
+
+# google.generativeai pulls in gRPC and protobuf, so it is imported on first
+# use rather than when the page loads
+_genai = None
+_genai_lock = threading.Lock()
+
+# One backend per model tier (see utils.model_router), unless replaced
+_backends = {}
+_backend_override = None
+_backend_lock = threading.Lock()
+
+
+def get_api_key():
+    """API key from Streamlit secrets, falling back to the environment."""
+    try:
+        api_key = st.secrets.get("GEMINI_API_KEY", "")
+    except Exception:
+        # No secrets file, e.g. when run outside `streamlit run`
+        api_key = ""
+    return api_key or os.environ.get("GEMINI_API_KEY", "")
+
+
+def get_genai():
+    """Import and configure the AI client library once per process."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            api_key = get_api_key()
+            endpoint = os.environ.get("GEMINI_API_ENDPOINT")
+            if endpoint:
+                # Local or proxied API (e.g. python -m utils.fake_gemini)
+                genai.configure(
+                    api_key=api_key or "local",
+                    transport="rest",
+                    client_options={"api_endpoint": endpoint}
+                )
+            elif api_key and api_key != "demo_mode":
+                genai.configure(api_key=api_key)
+            _genai = genai
+        return _genai
+
 
 def initialize_ai():
     """Initialize AI API with error handling."""
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY", "")
+        api_key = get_api_key()
         # Using a generic check for "demo_mode" or similar if needed
         if api_key and api_key != "demo_mode":
-            genai.configure(api_key=api_key)
+            get_genai()
             return True
         return False
     except Exception:
         return False
 
-def analyze_resume(resume_text, job_category):
+def analyze_resume(resume_text, job_category, backend=None, budget_seconds=None):
     """
     Analyze resume using AI model with a detailed prompt.
     Returns the analysis text or None if failed.
     """
-    # First, extract structured data from the resume
+    # First, extract structured data from the resume; a long resume is
+    # summarized part by part meanwhile, and the digest stands in for the
+    # extracted entries too
     from utils.pdf_processor import extract_structured_data
-    structured_data = extract_structured_data(resume_text)
+    structured_future = _local_executor.submit(extract_structured_data, resume_text)
+    heading, resume_body, budget_seconds = resume_for_prompt(resume_text, resume_text, backend, budget_seconds)
+    structured_data = structured_future.result()
+    if heading == DIGEST_HEADING:
+        structured_data = _digest_structured_data(structured_data)
     
     prompt = f"""
     ACT as a Senior Certified Professional Resume Writer (CPRW) with 15+ years of experience and a former hiring manager.
     
-    **RESUME TO ANALYZE:**
-    {resume_text}
+    **{heading}:**
+    {resume_body}
     
     **STRUCTURED DATA EXTRACTED:**
     Skills: {structured_data['skills']}
@@ -86,27 +231,420 @@ def analyze_resume(resume_text, job_category):
     Be extremely specific, direct, and provide exact phrasing suggestions where needed.
     """
     
+    response = generate_analysis(prompt, backend=backend, budget_seconds=budget_seconds)
+    if response:
+        # Usable when it follows the requested layout (see utils.model_router)
+        record_response('## ' in response)
+    return response
+
+def analyze_resume_structured(resume_text, job_category, backend=None, budget_seconds=None):
+    """
+    Analyze resume using AI model in JSON mode.
+    Returns an AnalysisReport or None if the model failed or returned JSON
+    that does not match the schema.
+    """
+    from utils.pdf_processor import extract_structured_data
+    structured_future = _local_executor.submit(extract_structured_data, resume_text)
+    heading, resume_body, budget_seconds = resume_for_prompt(resume_text, resume_text, backend, budget_seconds)
+    structured_data = structured_future.result()
+    if heading == DIGEST_HEADING:
+        structured_data = _digest_structured_data(structured_data)
+    
+    prompt = f"""
+    ACT as a Senior Certified Professional Resume Writer (CPRW) with 15+ years of experience and a former hiring manager.
+    
+    **{heading}:**
+    {resume_body}
+    
+    **STRUCTURED DATA EXTRACTED:**
+    Skills: {structured_data['skills']}
+    Experience: {structured_data['experience']}
+    Projects: {structured_data['projects']}
+    Education: {structured_data['education']}
+    
+    **TARGET ROLE:** {job_category}
+    
+    Respond with a single JSON object and nothing else, matching this schema:
+    {JSON_SCHEMA_PROMPT}
+    
+    Cover role fit for {job_category}, red flags (skill dumping, buzzwords without proof,
+    too many technologies for the experience level, inconsistent timelines), one weak
+    experience bullet and one weak project description rewritten. Be specific and direct.
+    """
+    
+    response = generate_analysis(prompt, backend=backend, budget_seconds=budget_seconds)
+    if not response:
+        return None
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY", "")
-        if not api_key or api_key == "demo_mode":
-            return None
+        report = parse_report_json(response)
+    except ReportValidationError as e:
+        print(f"AI Analysis returned an invalid report: {e}")
+        record_response(False)
+        return None
+    record_response(True)
+    return report
+
+def _local_skill_gap(skills, job_keywords):
+    found = {skill.lower() for group in skills.values() for skill in group}
+    matched = [keyword for keyword in job_keywords if keyword in found]
+    missing = [keyword for keyword in job_keywords if keyword not in found]
+    
+    def listed(items, fallback):
+        return ', '.join(items) if items else fallback
+    
+    return [
+        SkillGapRow('Technical Skills', listed(matched[:4], 'None'), listed(skills['technical'][:3], 'Few'), listed(missing[:3], 'None')),
+        SkillGapRow('Tools & Technologies', listed(skills['tools'][:2], 'None'), listed(skills['tools'][2:4], 'Few'), 'Various industry tools'),
+        SkillGapRow('Soft Skills', listed(skills['soft_skills'][:2], 'None'), listed(skills['soft_skills'][2:4], 'Few'), 'Leadership, communication skills'),
+    ]
+
+def _local_improvements(score_components, risks, job_category):
+    improvements = [f"Address {risk['type'].lower()}: {risk['description']}" for risk in risks if risk['severity'] == 'high']
+    if score_components['impact_clarity'] < 15:
+        improvements.append("Add 3-5 quantifiable achievements with specific metrics")
+    if score_components['role_alignment'] < 15:
+        improvements.append(f"Include more keywords relevant to {job_category}")
+    if score_components['project_relevance'] < 15:
+        improvements.append("Describe projects in problem-solution-result form")
+    improvements.append("Strengthen experience descriptions with impact-focused language")
+    return improvements[:3]
+
+def analyze_resume_hybrid(resume_text, job_category, structured_data=None, backend=None, budget_seconds=None,
+                          use_model=True):
+    """
+    Analyze resume with the local engines for score, risks, hiring-manager
+    review and rewrites, running concurrently with a much smaller model
+    request for role fit, the skill gap matrix and prioritized improvements.
+    Returns (report, used_model); without a usable model response, or with
+    use_model=False, the narrative sections fall back to local heuristics.
+    """
+    if structured_data is None:
+        from utils.pdf_processor import extract_structured_data
+        structured_data = extract_structured_data(resume_text)
+    
+    score_future = _local_executor.submit(calculate_resume_score, structured_data, job_category)
+    risks_future = _local_executor.submit(detect_resume_risks, structured_data)
+    review_future = _local_executor.submit(simulate_hiring_manager_review, structured_data, job_category)
+    rewrites_future = _local_executor.submit(suggest_rewrite_with_intent, structured_data['raw_text'], job_category)
+    
+    narrative_future = None
+    if use_model:
+        heading, resume_body, budget_seconds = resume_for_prompt(
+            resume_text, " ".join(resume_text.split()), backend, budget_seconds
+        )
+        prompt = f"""
+    ACT as a Senior Certified Professional Resume Writer (CPRW) and a former hiring manager.
+    
+    **{heading}:**
+    {resume_body}
+    
+    **SKILLS FOUND:** {structured_data['skills']}
+    
+    **TARGET ROLE:** {job_category}
+    
+    Respond with a single JSON object and nothing else, matching this schema:
+    {NARRATIVE_SCHEMA_PROMPT}
+    
+    Score, risks, hiring-manager review and rewrites are handled separately; cover only
+    role fit for {job_category}, the skill gap and the three most impactful improvements.
+    """
+        narrative_future = submit_in_context(_local_executor, generate_analysis, prompt, backend, budget_seconds)
+    
+    total_score, score_components = score_future.result()
+    risks = risks_future.result()
+    review = review_future.result()
+    rewrites = rewrites_future.result()
+    
+    narrative = None
+    response = narrative_future.result() if narrative_future else None
+    if response:
+        try:
+            narrative = parse_narrative_json(response)
+        except ReportValidationError as e:
+            print(f"AI Analysis returned an invalid narrative: {e}")
+        record_response(narrative is not None)
+    
+    if narrative is None:
+        narrative = {
+            'role_fit': (
+                f"Role alignment with {job_category} scores {score_components['role_alignment']}/25 "
+                f"based on the relevant keywords found in the resume."
+            ),
+            'skill_gap': _local_skill_gap(structured_data['skills'], get_job_keywords(job_category)),
+            'improvements': _local_improvements(score_components, risks, job_category),
+        }
+        used_model = False
+    else:
+        used_model = True
+    
+    strongest = max(score_components, key=score_components.get).replace('_', ' ')
+    weakest = min(score_components, key=score_components.get).replace('_', ' ')
+    summary = [
+        f"Overall score {total_score}/100 for {job_category}",
+        f"Strongest area: {strongest}; weakest area: {weakest}",
+        f"Likely shortlist decision: {review['decision']}",
+    ]
+    summary += [f"{risk['type']}: {risk['description']}" for risk in risks[:2]]
+    summary += review['stands_out'][:5 - len(summary)]
+    
+    report = AnalysisReport(
+        summary=summary,
+        score=ScoreBreakdown(
+            overall=total_score,
+            role_alignment=score_components['role_alignment'],
+            impact_clarity=score_components['impact_clarity'],
+            ats_friendliness=score_components['ats_friendly'],
+            project_relevance=score_components['project_relevance'],
+        ),
+        role_fit=narrative['role_fit'],
+        skill_gap=narrative['skill_gap'],
+        hiring_manager=HiringManagerView(
+            first_impression="; ".join(review['first_impression']),
+            stands_out="; ".join(review['stands_out']) or "Nothing in particular",
+            raises_doubts="; ".join(review['raises_doubts']) or "No major concerns",
+            decision=f"{review['decision']} ({'; '.join(review['reasoning'])})",
+        ),
+        risks=[f"{risk['type']}: {risk['description']}" for risk in risks] or ["No major red flags detected"],
+        improvements=narrative['improvements'],
+        rewrites=[
+            Rewrite(rewrite['original'], rewrite['improved'], rewrite['explanation'])
+            for rewrite in (rewrites['experience_bullet'], rewrites['project_description']) if rewrite
+        ],
+    )
+    return report, used_model
+
+def build_resume_context(resume_text, structured_data, job_category, heading=RESUME_HEADING, resume_body=None):
+    """
+    Compact resume context shared by all section prompts; resume_body
+    replaces the resume text, e.g. with the digest of a long resume
+    """
+    if resume_body is None:
+        resume_body = " ".join(resume_text.split())
+    return f"""
+    **{heading}:**
+    {resume_body}
+    
+    **STRUCTURED DATA EXTRACTED:**
+    Skills: {structured_data['skills']}
+    Experience: {structured_data['experience']}
+    Projects: {structured_data['projects']}
+    
+    **TARGET ROLE:** {job_category}
+    """
+
+def _generate_section(section, context, job_category, backend, budget_seconds):
+    prompt = f"""
+    ACT as a Senior Certified Professional Resume Writer (CPRW) with 15+ years of experience and a former hiring manager.
+    {context}
+    Write ONLY the "{SECTION_HEADINGS[section]}" section of a resume analysis, without the heading:
+    {SECTION_INSTRUCTIONS[section].format(job_category=job_category)}
+    
+    Be extremely specific, direct, and provide exact phrasing suggestions where needed.
+    """
+    # Retry only this section; the others are unaffected
+    for _ in range(1 + SECTION_RETRIES):
+        response = generate_analysis(prompt, backend=backend, budget_seconds=budget_seconds)
+        if response is not None:
+            record_response(bool(response.strip()))
+        if response and response.strip():
+            body = response.strip()
+            # Drop the heading if the model repeated it anyway
+            if body.startswith(SECTION_HEADINGS[section]):
+                body = body[len(SECTION_HEADINGS[section]):].strip()
+            return body
+    return None
+
+def analyze_resume_by_section(resume_text, job_category, structured_data=None, backend=None, budget_seconds=None):
+    """
+    Analyze resume with one prompt per report section, run concurrently.
+    Yields (section, body, from_model) as each section finishes; a section
+    the model could not produce falls back to the local mock analysis.
+    """
+    if structured_data is None:
+        from utils.pdf_processor import extract_structured_data
+        structured_data = extract_structured_data(resume_text)
+    
+    heading, resume_body, budget_seconds = resume_for_prompt(
+        resume_text, " ".join(resume_text.split()), backend, budget_seconds
+    )
+    if heading == DIGEST_HEADING:
+        structured_data = _digest_structured_data(structured_data)
+    context = build_resume_context(resume_text, structured_data, job_category, heading, resume_body)
+    # The section prompts (and their retries) are one admission of the session
+    with single_admission():
+        futures = {
+            submit_in_context(_section_executor, _generate_section, section, context, job_category, backend, budget_seconds): section
+            for section in SECTION_HEADINGS
+        }
+    fallback = None
+    try:
+        for future in as_completed(futures):
+            check('sections')
+            section = futures[future]
+            body = future.result()
+            if body:
+                yield section, body, True
+                continue
+            if fallback is None:
+                fallback = split_markdown_sections(mock_analysis(resume_text, job_category))
+            yield section, fallback.get(section, ""), False
+    finally:
+        # Sections still queued when the analysis is cancelled never start
+        for future in futures:
+            future.cancel()
+
+def _summarize_chunk(chunk, backend, budget_seconds):
+    cache = get_chunk_cache()
+    summary = cache.get(chunk)
+    if summary is not None:
+        return summary
+    prompt = f"""
+    You are preparing one part of a long resume for a full review by a hiring manager.
+    
+    **RESUME PART:**
+    {chunk}
+    
+    Summarize ONLY this part in at most {CHUNK_SUMMARY_WORDS} words of plain text: roles with
+    employers and dates, achievements with their exact numbers, skills and tools shown in use,
+    degrees, publications and certifications. Quote the weakest bullet verbatim and note
+    anything that looks like a red flag (gaps, inconsistent dates, buzzwords without proof).
+    """
+    response = generate_analysis(prompt, backend=backend, budget_seconds=budget_seconds)
+    if response is not None:
+        record_response(bool(response.strip()))
+    if not response or not response.strip():
+        return None
+    summary = response.strip()
+    cache.put(chunk, summary)
+    return summary
+
+def _digest_structured_data(structured_data):
+    # Entries of a long resume would repeat most of its text; the digest
+    # covers them
+    return dict(
+        structured_data, experience="(see digest)", projects="(see digest)", education="(see digest)"
+    )
+
+def resume_for_prompt(resume_text, prompt_text, backend=None, budget_seconds=None):
+    """
+    (heading, body, remaining budget) for the resume part of an analysis
+    prompt. Up to LLM_PROMPT_BUDGET_CHARS the body is prompt_text, the
+    resume as the caller formats it. A longer resume is split into chunks
+    along its sections which are summarized concurrently (the map step,
+    see utils.chunking), and the body is the summaries in order, for the
+    calling prompt to reduce; a chunk without a summary goes in as text,
+    cut to its share of the budget.
+    """
+    if len(prompt_text) <= LLM_PROMPT_BUDGET_CHARS:
+        return RESUME_HEADING, prompt_text, budget_seconds
+    
+    started = time.perf_counter()
+    chunks = split_chunks(resume_text)
+    map_budget = budget_seconds * CHUNK_BUDGET_SHARE if budget_seconds else None
+    # The map step is one admission of the session, however many chunks
+    with single_admission():
+        futures = [
+            submit_in_context(_chunk_executor, _summarize_chunk, chunk, backend, map_budget) for chunk in chunks
+        ]
+    share = LLM_PROMPT_BUDGET_CHARS // len(chunks)
+    parts = []
+    try:
+        for i, (chunk, future) in enumerate(zip(chunks, futures)):
+            summary = future.result()
+            check('chunks')
+            if summary is None:
+                metrics.increment('chunk_summaries_failed_total')
+            parts.append(f"[Part {i + 1} of {len(chunks)}]\n{(summary or ' '.join(chunk.split()))[:share]}")
+    finally:
+        # Chunks still queued when the analysis is cancelled never start
+        for future in futures:
+            future.cancel()
+    
+    elapsed = time.perf_counter() - started
+    metrics.observe('chunk_map_seconds', elapsed)
+    metrics.observe('chunks_per_resume', len(chunks))
+    if budget_seconds:
+        budget_seconds = max(budget_seconds - elapsed, budget_seconds * (1 - CHUNK_BUDGET_SHARE))
+    return DIGEST_HEADING, "\n\n".join(parts), budget_seconds
+
+def join_sections(sections):
+    """
+    Assemble {section: body} into the markdown report layout
+    """
+    return "\n\n".join(
+        f"{heading}\n{sections[section]}" for section, heading in SECTION_HEADINGS.items() if section in sections
+    ) + "\n"
+
+def get_model_backend(tier=None):
+    """
+    Return the model backend of a tier, by default the one the current
+    analysis was routed to (see utils.model_router), or None when no API
+    key is set. LLM_BACKEND=fake selects local fake backends (see
+    utils.fake_gemini). A backend set with set_model_backend() serves
+    every tier.
+    """
+    tier = tier or current_tier()
+    with _backend_lock:
+        if _backend_override is not None:
+            return _backend_override
+        if tier not in _backends:
+            if os.environ.get("LLM_BACKEND") == "fake":
+                from utils.fake_gemini import FakeGeminiBackend
+                _backends[tier] = FakeGeminiBackend.from_env(tier)
+            else:
+                api_key = get_api_key()
+                if (not api_key or api_key == "demo_mode") and not os.environ.get("GEMINI_API_ENDPOINT"):
+                    return None
+                _backends[tier] = GeminiBackend(MODEL_TIERS[tier])
+        return _backends[tier]
+
+def set_model_backend(backend):
+    """
+    Replace the configured model backends, e.g. with recorded responses
+    (see utils.replay); None restores them
+    """
+    global _backend_override
+    with _backend_lock:
+        _backend_override = backend
 
-        # Assuming we are using a specific model family
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
-        return response.text
+def generate_analysis(prompt, backend=None, budget_seconds=None):
+    """
+    Send a prompt to the AI model within a latency budget.
+    Returns the response text or None if the model is unavailable, failed,
+    timed out, its circuit breaker is open, the call is over its rate limit
+    or the current analysis was cancelled.
+    """
+    try:
+        backend = backend or get_model_backend()
+        if backend is None:
+            return None
+        # A cancelled analysis starts no new calls (see utils.cancellation)
+        cancel_token = current_token()
+        if cancel_token is not None and cancel_token.cancelled:
+            return None
+        # Fair share across sessions and the global quota (utils.scheduler);
+        # over budget, the caller falls back to the local analysis
+        with admitted(prompt) as ok:
+            if not ok:
+                return None
+            started = time.perf_counter()
+            response = complete(prompt, backend, budget_seconds=budget_seconds)
+            # Captured only while a session is being recorded
+            record_model_call(prompt, response, time.perf_counter() - started)
+            return response
     except Exception as e:
         # Fail silently to allow fallback to mock_analysis
         print(f"AI Analysis failed: {e}") 
         return None
 
-def calculate_resume_score(structured_data, job_category):
+def calculate_resume_score(structured_data, job_category, role=None):
     """
     Calculate a Resume Strength Score (0-100) based on:
     - Role alignment
     - Impact clarity (metrics, results)
     - ATS friendliness
     - Project relevance
+    role is the job category's load_role_profile(), loaded here if not given.
     """
     score_components = {
         'role_alignment': 0,
@@ -116,12 +654,13 @@ def calculate_resume_score(structured_data, job_category):
     }
     
     # Role alignment score (25 points max)
-    job_keywords = get_job_keywords(job_category)
+    role = role or load_role_profile(job_category)
+    job_keywords = role['keywords']
     skills = structured_data['skills']
     
     tech_match_count = 0
     for tech_skill in skills['technical']:
-        if tech_skill.lower() in job_keywords:
+        if tech_skill.lower() in role['keyword_set']:
             tech_match_count += 1
     
     # Calculate percentage match
@@ -129,6 +668,14 @@ def calculate_resume_score(structured_data, job_category):
         role_alignment_score = min(25, (tech_match_count / len(job_keywords)) * 25)
     else:
         role_alignment_score = 10  # Default score if we can't determine keywords
+    
+    # Dated experience in roles with the target title: one point per year, up to 5
+    title_words = role['title_words']
+    relevant_months = sum(
+        entry.get('months', 0) for entry in structured_data['experience']
+        if title_words & set(entry['role'].lower().split())
+    )
+    role_alignment_score = min(25, role_alignment_score + min(5, relevant_months / 12))
     score_components['role_alignment'] = round(role_alignment_score)
     
     # Impact clarity score (25 points max)
@@ -172,25 +719,41 @@ def calculate_resume_score(structured_data, job_category):
     return total_score, score_components
 
 
+# Keywords an applicant for each role is expected to list
+JOB_KEYWORDS = {
+    'Software Engineer': ['python', 'java', 'javascript', 'react', 'angular', 'node.js', 'sql', 'git', 'agile', 'oop', 'algorithms', 'data structures'],
+    'Data Scientist': ['python', 'r', 'sql', 'machine learning', 'pandas', 'numpy', 'scikit-learn', 'tensorflow', 'statistics', 'data analysis', 'matplotlib', 'jupyter'],
+    'Product Manager': ['product strategy', 'roadmap', 'agile', 'scrum', 'stakeholder', 'requirements', 'ux', 'analytics', 'market research', 'feature prioritization'],
+    'Full Stack Developer': ['javascript', 'react', 'node.js', 'express', 'html', 'css', 'sql', 'rest', 'api', 'database', 'frontend', 'backend'],
+    'DevOps Engineer': ['docker', 'kubernetes', 'aws', 'azure', 'ci/cd', 'jenkins', 'terraform', 'linux', 'bash', 'monitoring', 'infrastructure'],
+    'Machine Learning Engineer': ['python', 'tensorflow', 'pytorch', 'deep learning', 'neural networks', 'data preprocessing', 'model deployment', 'computer vision', 'nlp'],
+    'Frontend Developer': ['javascript', 'react', 'angular', 'vue', 'html', 'css', 'typescript', 'redux', 'webpack', 'responsive design', 'css frameworks'],
+    'Backend Developer': ['python', 'java', 'node.js', 'express', 'sql', 'nosql', 'api', 'microservices', 'database', 'authentication', 'security'],
+    'UX Designer': ['ui/ux', 'wireframing', 'prototyping', 'user research', 'usability', 'design systems', 'figma', 'sketch', 'user flows', 'interaction design'],
+    'Cybersecurity Specialist': ['security', 'network security', 'penetration testing', 'risk assessment', 'encryption', 'firewalls', 'siem', 'incident response', 'vulnerability'],
+    'Data Analyst': ['sql', 'excel', 'tableau', 'power bi', 'python', 'r', 'data visualization', 'statistical analysis', 'reporting', 'dashboards']
+}
+
+
 def get_job_keywords(job_category):
     """
     Return relevant keywords for a given job category
     """
-    keyword_mapping = {
-        'Software Engineer': ['python', 'java', 'javascript', 'react', 'angular', 'node.js', 'sql', 'git', 'agile', 'oop', 'algorithms', 'data structures'],
-        'Data Scientist': ['python', 'r', 'sql', 'machine learning', 'pandas', 'numpy', 'scikit-learn', 'tensorflow', 'statistics', 'data analysis', 'matplotlib', 'jupyter'],
-        'Product Manager': ['product strategy', 'roadmap', 'agile', 'scrum', 'stakeholder', 'requirements', 'ux', 'analytics', 'market research', 'feature prioritization'],
-        'Full Stack Developer': ['javascript', 'react', 'node.js', 'express', 'html', 'css', 'sql', 'rest', 'api', 'database', 'frontend', 'backend'],
-        'DevOps Engineer': ['docker', 'kubernetes', 'aws', 'azure', 'ci/cd', 'jenkins', 'terraform', 'linux', 'bash', 'monitoring', 'infrastructure'],
-        'Machine Learning Engineer': ['python', 'tensorflow', 'pytorch', 'deep learning', 'neural networks', 'data preprocessing', 'model deployment', 'computer vision', 'nlp'],
-        'Frontend Developer': ['javascript', 'react', 'angular', 'vue', 'html', 'css', 'typescript', 'redux', 'webpack', 'responsive design', 'css frameworks'],
-        'Backend Developer': ['python', 'java', 'node.js', 'express', 'sql', 'nosql', 'api', 'microservices', 'database', 'authentication', 'security'],
-        'UX Designer': ['ui/ux', 'wireframing', 'prototyping', 'user research', 'usability', 'design systems', 'figma', 'sketch', 'user flows', 'interaction design'],
-        'Cybersecurity Specialist': ['security', 'network security', 'penetration testing', 'risk assessment', 'encryption', 'firewalls', 'siem', 'incident response', 'vulnerability'],
-        'Data Analyst': ['sql', 'excel', 'tableau', 'power bi', 'python', 'r', 'data visualization', 'statistical analysis', 'reporting', 'dashboards']
+    return JOB_KEYWORDS.get(job_category, [])
+
+
+def load_role_profile(job_category):
+    """
+    Role data used to score resumes for a job category; load it once and
+    pass it to calculate_resume_score() when scoring many resumes
+    """
+    keywords = get_job_keywords(job_category)
+    return {
+        'job_category': job_category,
+        'keywords': keywords,
+        'keyword_set': frozenset(keywords),
+        'title_words': frozenset(job_category.lower().split()),
     }
-    
-    return keyword_mapping.get(job_category, [])
 
 
 def simulate_hiring_manager_review(structured_data, job_category):
@@ -461,40 +1024,33 @@ def detect_resume_risks(structured_data):
             'severity': 'high'
         })
     
-    # Risk 4: Inconsistent timelines (basic check)
-    # Look for date patterns in the text
-    import re
-    date_patterns = [r'\b\d{4}\b', r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{4}\b', r'\b\d{1,2}/\d{4}\b']
-    dates_found = []
-    
-    for pattern in date_patterns:
-        matches = re.findall(pattern, raw_text)
-        dates_found.extend(matches)
-    
-    # Convert to actual years for basic timeline validation
-    years = []
-    for date in dates_found:
-        year_match = re.search(r'\b(19|20)\d{2}\b', str(date))
-        if year_match:
-            years.append(int(year_match.group()))
-    
-    if years:
-        min_year = min(years)
-        max_year = max(years)
-        
-        # Check if there are gaps or impossible timelines
-        if max_year > 2026:  # Future dates
-            risks.append({
-                'type': 'Invalid Timeline',
-                'description': f'Found future dates ({max_year}) in resume.',
-                'severity': 'high'
-            })
-        elif min_year < 1980:  # Unlikely early dates
-            risks.append({
-                'type': 'Timeline Concern',
-                'description': f'Found very early dates ({min_year}), possibly indicating inaccurate timeline.',
-                'severity': 'medium'
-            })
+    # Risk 4: Inconsistent timelines, from the role intervals
+    timeline = analyze_timeline(experience)
+    if timeline['future'] or timeline['inverted']:
+        entries = timeline['future'] + timeline['inverted']
+        risks.append({
+            'type': 'Invalid Timeline',
+            'description': f'Dates in the future or ending before they start: {", ".join(entry["role"] for entry in entries[:3])}.',
+            'severity': 'high'
+        })
+    elif timeline['earliest_year'] and timeline['earliest_year'] < EARLIEST_PLAUSIBLE_YEAR:
+        risks.append({
+            'type': 'Timeline Concern',
+            'description': f'Found very early dates ({timeline["earliest_year"]}), possibly indicating inaccurate timeline.',
+            'severity': 'medium'
+        })
+    for before, after, months in timeline['gaps']:
+        risks.append({
+            'type': 'Employment Gap',
+            'description': f'{months} months without a listed role between {before["role"]} (until {before["end"]}) and {after["role"]} (from {after["start"]}) - explain it briefly.',
+            'severity': 'medium'
+        })
+    for first, second, months in timeline['overlaps']:
+        risks.append({
+            'type': 'Overlapping Roles',
+            'description': f'{first["role"]} and {second["role"]} overlap by {months} months - clarify if they were concurrent.',
+            'severity': 'low'
+        })
     
     # Risk 5: Grammatical errors or typos
     # Basic check for repeated characters (possible typos)
@@ -517,9 +1073,9 @@ def detect_resume_risks(structured_data):
     return risks
 
 
-def mock_analysis(resume_text, job_category):
+def mock_report(resume_text, job_category):
     """
-    Mock analysis for testing purposes or when API is unavailable.
+    Mock analysis as a typed report, for testing purposes or when API is unavailable.
     """
     # First, extract structured data from the resume
     from utils.pdf_processor import extract_structured_data
@@ -528,59 +1084,76 @@ def mock_analysis(resume_text, job_category):
     # Calculate resume score
     total_score, score_components = calculate_resume_score(structured_data, job_category)
     
-    return f"""
-## 📊 QUICK SUMMARY (TL;DR)
-- Resume shows basic technical skills relevant to {job_category}
-- Lacks quantifiable achievements and metrics
-- Good structure but could improve with more impact-focused descriptions
-- Needs more specific keywords for {job_category} role
-- Contact information should be more prominent
-
-## 💯 RESUME SCORE & BREAKDOWN
-Overall Score: {total_score}/100
-- Role Alignment: {score_components['role_alignment']}/25
-- Impact Clarity: {score_components['impact_clarity']}/25
-- ATS Friendliness: {score_components['ats_friendly']}/25
-- Project Relevance: {score_components['project_relevance']}/25
-
-## 🎯 ROLE FIT ANALYSIS
-The resume shows foundational skills for {job_category} but needs strengthening in key areas:
-- More specific examples of relevant work
-- Quantified achievements with metrics
-- Better alignment with {job_category} requirements
-
-## 🧩 SKILL GAP MATRIX
-| Skill Category | Strong Match | Partial Match | Missing But Important |
-|----------------|--------------|---------------|----------------------|
-| Technical Skills | {', '.join(structured_data['skills']['technical'][:2]) if structured_data['skills']['technical'] else 'None'} | {', '.join(structured_data['skills']['technical'][2:4]) if len(structured_data['skills']['technical']) > 2 else 'Few'} | {', '.join(get_job_keywords(job_category)[:3]) if get_job_keywords(job_category) else 'Various'} |
-| Tools & Technologies | {', '.join(structured_data['skills']['tools'][:2]) if structured_data['skills']['tools'] else 'None'} | {', '.join(structured_data['skills']['tools'][2:4]) if len(structured_data['skills']['tools']) > 2 else 'Few'} | Various industry tools |
-| Soft Skills | {', '.join(structured_data['skills']['soft_skills'][:2]) if structured_data['skills']['soft_skills'] else 'None'} | {', '.join(structured_data['skills']['soft_skills'][2:4]) if len(structured_data['skills']['soft_skills']) > 2 else 'Few'} | Leadership, communication skills |
-
-## 🔍 HIRING MANAGER SIMULATION
-Simulating a 30-second review by a hiring manager:
-- First impression: Resume has basic structure and relevant skills
-- What stands out: Some technical competencies shown
-- What raises doubts: Lack of specific achievements and metrics
-- Shortlist decision: MAYBE - needs improvement before serious consideration
-
-## ⚠️ RESUME RISK DETECTION
-Potential red flags identified:
-- Limited quantifiable achievements
-- Generic language without specific impact
-- Could have more relevant keywords for {job_category}
-- Experience descriptions lack specific metrics
-
-## 🛠️ IMPROVEMENT ACTIONS (PRIORITIZED)
-1. Add 3-5 quantifiable achievements with specific metrics
-2. Include more keywords relevant to {job_category}
-3. Strengthen experience descriptions with impact-focused language
-
-## ✏️ EXAMPLE REWRITES
-**Before:** Worked on software development projects using various technologies.
-**After:** Developed and deployed 3 web applications using React and Node.js, resulting in 25% increase in user engagement.
-**Why better:** Contains specific technologies, quantifiable result, and impact statement.
-
-**Before:** Part of team that built a mobile app.
-**After:** Collaborated with cross-functional team to architect and develop a mobile application serving 10K+ users, improving customer satisfaction by 40%.
-**Why better:** Specifies team collaboration, user impact, and measurable outcome.
-"""
+    skills = structured_data['skills']
+    job_keywords = get_job_keywords(job_category)
+    
+    def strong(items):
+        return ', '.join(items[:2]) if items else 'None'
+    
+    def partial(items):
+        return ', '.join(items[2:4]) if len(items) > 2 else 'Few'
+    
+    return AnalysisReport(
+        summary=[
+            f"Resume shows basic technical skills relevant to {job_category}",
+            "Lacks quantifiable achievements and metrics",
+            "Good structure but could improve with more impact-focused descriptions",
+            f"Needs more specific keywords for {job_category} role",
+            "Contact information should be more prominent",
+        ],
+        score=ScoreBreakdown(
+            overall=total_score,
+            role_alignment=score_components['role_alignment'],
+            impact_clarity=score_components['impact_clarity'],
+            ats_friendliness=score_components['ats_friendly'],
+            project_relevance=score_components['project_relevance'],
+        ),
+        role_fit=(
+            f"The resume shows foundational skills for {job_category} but needs strengthening in key areas:\n"
+            "- More specific examples of relevant work\n"
+            "- Quantified achievements with metrics\n"
+            f"- Better alignment with {job_category} requirements"
+        ),
+        skill_gap=[
+            SkillGapRow('Technical Skills', strong(skills['technical']), partial(skills['technical']),
+                        ', '.join(job_keywords[:3]) if job_keywords else 'Various'),
+            SkillGapRow('Tools & Technologies', strong(skills['tools']), partial(skills['tools']), 'Various industry tools'),
+            SkillGapRow('Soft Skills', strong(skills['soft_skills']), partial(skills['soft_skills']), 'Leadership, communication skills'),
+        ],
+        hiring_manager=HiringManagerView(
+            first_impression="Resume has basic structure and relevant skills",
+            stands_out="Some technical competencies shown",
+            raises_doubts="Lack of specific achievements and metrics",
+            decision="MAYBE - needs improvement before serious consideration",
+        ),
+        risks=[
+            "Limited quantifiable achievements",
+            "Generic language without specific impact",
+            f"Could have more relevant keywords for {job_category}",
+            "Experience descriptions lack specific metrics",
+        ],
+        improvements=[
+            "Add 3-5 quantifiable achievements with specific metrics",
+            f"Include more keywords relevant to {job_category}",
+            "Strengthen experience descriptions with impact-focused language",
+        ],
+        rewrites=[
+            Rewrite(
+                "Worked on software development projects using various technologies.",
+                "Developed and deployed 3 web applications using React and Node.js, resulting in 25% increase in user engagement.",
+                "Contains specific technologies, quantifiable result, and impact statement.",
+            ),
+            Rewrite(
+                "Part of team that built a mobile app.",
+                "Collaborated with cross-functional team to architect and develop a mobile application serving 10K+ users, improving customer satisfaction by 40%.",
+                "Specifies team collaboration, user impact, and measurable outcome.",
+            ),
+        ],
+    )
+
+
+def mock_analysis(resume_text, job_category):
+    """
+    Mock analysis for testing purposes or when API is unavailable.
+    """
+    return report_to_markdown(mock_report(resume_text, job_category))
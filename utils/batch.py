@@ -0,0 +1,130 @@
+"""
+Batch screening of many resumes for one role.
+
+Extraction and local scoring of each upload run concurrently on a worker
+pool (PDF parsing itself in the sandboxed worker processes), with the role
+data loaded once for the whole batch. Results are yielded as each resume
+finishes so the ranking can be redrawn as it fills in; model deep-dives run
+only on request, for one candidate at a time.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import metrics
+from utils.ai_analysis import calculate_resume_score, detect_resume_risks, load_role_profile
+from utils.history import upload_hash
+from utils.pdf_processor import extract_pages, join_pages, extract_structured_data, PdfProcessingError
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", 8))
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", 100))
+# Candidates offered for a model deep-dive
+BATCH_DEEP_DIVE_TOP = int(os.environ.get("BATCH_DEEP_DIVE_TOP", 5))
+
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+
+def _score_resume(name, resume_hash, data, role):
+    started = time.perf_counter()
+    candidate = {
+        'name': name,
+        'upload_hash': resume_hash,
+        'score': None,
+        'score_components': None,
+        'risks': 0,
+        'high_risks': 0,
+        'matched_skills': [],
+        'experience_years': 0.0,
+        'pages': None,
+        'error': None,
+    }
+    try:
+        pages = extract_pages(data)
+    except PdfProcessingError as e:
+        candidate['error'] = str(e)
+        return candidate
+
+    text = join_pages(pages)
+    if not text:
+        candidate['error'] = "No text found in PDF"
+        return candidate
+
+    structured_data = extract_structured_data(text)
+    total_score, score_components = calculate_resume_score(structured_data, role['job_category'], role)
+    risks = detect_resume_risks(structured_data)
+    candidate.update(
+        score=total_score,
+        score_components=score_components,
+        risks=len(risks),
+        high_risks=sum(1 for risk in risks if risk['severity'] == 'high'),
+        matched_skills=[skill for skill in structured_data['skills']['technical'] if skill.lower() in role['keyword_set']],
+        experience_years=round(sum(entry.get('months', 0) for entry in structured_data['experience']) / 12, 1),
+        pages=pages,
+    )
+    metrics.observe('batch_resume_seconds', time.perf_counter() - started)
+    return candidate
+
+
+def score_resumes(files, job_category):
+    """
+    Score [(name, pdf bytes)] concurrently for a job category.
+    Yields one candidate dict per file as it finishes (see _score_resume);
+    identical files are scored once. Only the best BATCH_DEEP_DIVE_TOP so
+    far keep their pages, which a deep dive needs; the others' pages are
+    set to None, also on candidates already yielded.
+    """
+    role = load_role_profile(job_category)
+    futures = {}
+    by_hash = {}
+    for name, data in files[:BATCH_MAX_FILES]:
+        resume_hash = upload_hash(data)
+        if resume_hash in by_hash:
+            by_hash[resume_hash].append(name)
+            continue
+        by_hash[resume_hash] = [name]
+        futures[_batch_executor.submit(_score_resume, name, resume_hash, data, role)] = resume_hash
+
+    top = []
+    for future in as_completed(futures):
+        candidate = future.result()
+        metrics.increment('batch_resumes_total', outcome='error' if candidate['error'] else 'scored')
+        for name in by_hash[futures[future]]:
+            result = dict(candidate, name=name)
+            if result['pages'] is not None:
+                top = rank_candidates(top + [result])
+                for dropped in top[BATCH_DEEP_DIVE_TOP:]:
+                    dropped['pages'] = None
+                del top[BATCH_DEEP_DIVE_TOP:]
+            yield result
+
+
+def rank_candidates(candidates):
+    """
+    Candidates best first: higher score, then fewer high-severity risks;
+    unreadable files last
+    """
+    return sorted(
+        candidates,
+        key=lambda c: (c['score'] is None, -(c['score'] or 0), c['high_risks'], c['name'])
+    )
+
+
+def ranking_rows(ranked):
+    """
+    Table rows for a ranked list of candidates
+    """
+    rows = []
+    for position, candidate in enumerate(ranked, 1):
+        components = candidate['score_components'] or {}
+        rows.append({
+            'Rank': position,
+            'Candidate': candidate['name'],
+            'Score': candidate['score'],
+            'Role Alignment': components.get('role_alignment'),
+            'Impact': components.get('impact_clarity'),
+            'Experience (y)': candidate['experience_years'],
+            'Matched Skills': ", ".join(candidate['matched_skills'][:6]),
+            'Risks (high)': f"{candidate['risks']} ({candidate['high_risks']})",
+            'Status': candidate['error'] or "Scored",
+        })
+    return rows
@@ -0,0 +1,217 @@
+"""
+Cancellation of analyses whose result nobody will see.
+
+An analysis runs inside cancellable(), which makes a CancellationToken the
+current one for the block and for worker threads given its context (see
+utils.scheduler.submit_in_context). The pipeline calls check(stage)
+between pages and stages; model calls stop waiting, leave the scheduler
+queue and stop reading streamed responses once the token is cancelled.
+
+A token is cancelled when a newer analysis of the same session starts,
+when its superseded() predicate turns true (checked by a watcher thread,
+e.g. Streamlit has a rerun pending because the user changed an input), or
+when the block is left by an exception.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils import metrics
+
+# How often the watcher evaluates superseded() predicates
+CANCELLATION_POLL_SECONDS = float(os.environ.get("CANCELLATION_POLL_SECONDS", 0.1))
+# Streamlit release whose private ScriptRequests._state rerun_requested()
+# reads (the version pinned in requirements.txt)
+STREAMLIT_TESTED_VERSION = (1, 37)
+
+
+class AnalysisCancelled(Exception):
+    """The analysis was cancelled; raised at the next check after cancel()."""
+
+    def __init__(self, stage, reason=None):
+        super().__init__(stage, reason)
+        self.stage = stage
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Set once, from any thread. `future` completes on cancellation, so it can
+    be waited on next to other futures.
+    """
+
+    def __init__(self, superseded=None):
+        self.reason = None
+        # Stage at which cancellable() saw the block end early, if it did
+        self.stopped_at = None
+        self.future = Future()
+        self._superseded = superseded
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.future.done()
+
+    def cancel(self, reason='cancelled'):
+        with self._lock:
+            if self.future.done():
+                return
+            self.reason = reason
+            self.future.set_result(reason)
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancellation callback failed: {e}")
+
+    def on_cancel(self, callback):
+        """
+        Call callback() on cancellation (now, if already cancelled).
+        Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self.future.done():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def check(self, stage):
+        if self.future.done():
+            raise AnalysisCancelled(stage, self.reason)
+
+
+_current = ContextVar('cancellation_token', default=None)
+_latest = {}
+_watched = set()
+_lock = threading.Lock()
+_watcher = None
+
+
+def current_token():
+    return _current.get()
+
+
+def check(stage):
+    """
+    Raise AnalysisCancelled if the current analysis was cancelled
+    """
+    token = _current.get()
+    if token is not None:
+        token.check(stage)
+
+
+def _watch_loop():
+    while True:
+        time.sleep(CANCELLATION_POLL_SECONDS)
+        with _lock:
+            tokens = list(_watched)
+        for token in tokens:
+            try:
+                superseded = token._superseded()
+            except Exception:
+                superseded = False
+            if superseded:
+                token.cancel('superseded')
+
+
+def _watch(token):
+    global _watcher
+    with _lock:
+        _watched.add(token)
+        if _watcher is None:
+            _watcher = threading.Thread(target=_watch_loop, name="cancellation-watcher", daemon=True)
+            _watcher.start()
+
+
+@contextmanager
+def cancellable(session_id=None, superseded=None, token=None):
+    """
+    Run the block as one cancellable analysis and yield its token (a new
+    one unless given). Starting another one for the same session cancels
+    this one. AnalysisCancelled raised in the block ends it quietly;
+    token.stopped_at tells afterwards.
+    """
+    if token is None:
+        token = CancellationToken(superseded)
+    with _lock:
+        previous = _latest.get(session_id) if session_id is not None else None
+        if session_id is not None:
+            _latest[session_id] = token
+    if previous is not None:
+        previous.cancel('superseded')
+    if token._superseded is not None:
+        _watch(token)
+
+    context_token = _current.set(token)
+    try:
+        yield token
+    except AnalysisCancelled as e:
+        token.stopped_at = e.stage
+        metrics.increment('analyses_cancelled_total', reason=token.reason, stage=e.stage)
+    except BaseException:
+        # e.g. Streamlit stopping the script: background work is abandoned too
+        token.cancel('interrupted')
+        metrics.increment('analyses_cancelled_total', reason='interrupted', stage='script')
+        raise
+    finally:
+        _current.reset(context_token)
+        with _lock:
+            _watched.discard(token)
+            if session_id is not None and _latest.get(session_id) is token:
+                del _latest[session_id]
+
+
+def rerun_requested():
+    """
+    A superseded() predicate for the current Streamlit script run: true once
+    Streamlit has a rerun or stop pending for the session, i.e. the user
+    changed an input or left. None outside a script run.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    requests = ctx.script_requests if ctx else None
+    if requests is None or not _pending_state_readable(requests):
+        return None
+    # Streamlit has no public accessor for a pending request; the state is
+    # CONTINUE until one arrives
+    return lambda: requests._state.name != 'CONTINUE'
+
+
+_pending_state_checked = None
+
+
+def _pending_state_readable(requests):
+    """
+    Whether this Streamlit keeps the pending request where rerun_requested()
+    reads it; without it, analyses are only cancelled by newer ones. Checked
+    and reported once.
+    """
+    global _pending_state_checked
+    if _pending_state_checked is None:
+        import streamlit
+
+        version = tuple(int(part) for part in streamlit.__version__.split('.')[:2] if part.isdigit())
+        _pending_state_checked = hasattr(getattr(requests, '_state', None), 'name')
+        if not _pending_state_checked:
+            print(
+                f"Streamlit {streamlit.__version__} has no ScriptRequests._state: analyses are not "
+                f"cancelled when inputs change (tested with {'.'.join(map(str, STREAMLIT_TESTED_VERSION))})"
+            )
+        elif version != STREAMLIT_TESTED_VERSION:
+            print(
+                f"Streamlit {streamlit.__version__}: rerun detection reads the private "
+                f"ScriptRequests._state, tested with {'.'.join(map(str, STREAMLIT_TESTED_VERSION))}"
+            )
+    return _pending_state_checked
@@ -0,0 +1,104 @@
+"""
+Prompt-sized chunks of long resumes, and the cache of their summaries.
+
+Resumes longer than LLM_PROMPT_BUDGET_CHARS are analyzed map-reduce (see
+utils.ai_analysis.resume_for_prompt): the text is cut at section
+boundaries (see utils.pdf_processor.split_sections) into chunks of up to
+CHUNK_CHARS, each chunk is summarized by its own model call, all of them
+concurrently, and the analysis prompt gets the summaries instead of the
+text. Summaries do not depend on the target role and are cached by chunk
+content, so a revised CV only costs calls for the chunks that changed.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from utils import metrics
+from utils.pdf_processor import split_sections
+
+# Resume text above this length is summarized chunk by chunk before it is
+# put into a prompt (about 6k tokens)
+LLM_PROMPT_BUDGET_CHARS = int(os.environ.get("LLM_PROMPT_BUDGET_CHARS", 24000))
+CHUNK_CHARS = int(os.environ.get("LLM_CHUNK_CHARS", 8000))
+# Chunk summaries kept in memory, least recently used dropped first
+CHUNK_CACHE_SIZE = int(os.environ.get("LLM_CHUNK_CACHE_SIZE", 4096))
+
+
+def _split_block(block, max_chars):
+    # A section longer than a chunk is cut between lines, or inside a line
+    # that is longer than a chunk by itself
+    pieces = []
+    current = ""
+    for line in block.split('\n'):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + 1 + len(line) > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_chunks(text, max_chars=CHUNK_CHARS):
+    """
+    Split resume text into chunks of at most max_chars, packing whole
+    sections together where they fit and cutting longer ones between lines
+    """
+    chunks = []
+    current = ""
+    for _, block in split_sections(text):
+        for piece in _split_block(block, max_chars):
+            if current and len(current) + 2 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_key(chunk):
+    return hashlib.blake2b(chunk.encode('utf-8'), digest_size=16).digest()
+
+
+class ChunkCache:
+    """
+    Bounded {chunk content hash: summary}
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chunk):
+        key = chunk_key(chunk)
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+        metrics.increment('chunk_cache_total', outcome='hit' if summary is not None else 'miss')
+        return summary
+
+    def put(self, chunk, summary):
+        with self._lock:
+            self._entries[chunk_key(chunk)] = summary
+            self._entries.move_to_end(chunk_key(chunk))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+_cache = ChunkCache(CHUNK_CACHE_SIZE)
+
+
+def get_chunk_cache():
+    return _cache
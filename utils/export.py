@@ -0,0 +1,167 @@
+"""
+Report export in HTML, Markdown, JSON and PDF.
+
+Formats are rendered only when requested and the bytes are cached by
+analysis hash and format, so exporting a past analysis is a cache lookup
+and never touches extraction or the model.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import textwrap
+import threading
+from collections import OrderedDict
+
+from utils.pdf_writer import build_text_pdf, paginate
+from utils.report_schema import SECTION_HEADINGS, report_to_dict, split_markdown_sections
+
+# Rendered exports kept in memory across sessions (least recently used first out)
+EXPORT_CACHE_ENTRIES = int(os.environ.get("EXPORT_CACHE_ENTRIES", 128))
+# Characters per PDF line at the writer's 10pt Helvetica
+PDF_LINE_WIDTH = 95
+
+# format: (label, mime type, file extension)
+EXPORT_FORMATS = {
+    'html': ("HTML", "text/html", "html"),
+    'md': ("Markdown", "text/markdown", "md"),
+    'json': ("JSON", "application/json", "json"),
+    'pdf': ("PDF", "application/pdf", "pdf"),
+}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+HTML_STYLE = """
+body { font-family: -apple-system, 'Segoe UI', Helvetica, Arial, sans-serif; max-width: 820px;
+       margin: 2rem auto; padding: 0 1rem; color: #1a1a1a; line-height: 1.5; }
+h1 { font-size: 1.6rem; } h2 { font-size: 1.2rem; border-bottom: 1px solid #ddd; padding-bottom: .3rem; margin-top: 2rem; }
+table { border-collapse: collapse; width: 100%; } th, td { border: 1px solid #ccc; padding: .4rem; text-align: left; }
+@media print { body { margin: 0; } h2 { page-break-after: avoid; } }
+"""
+
+INLINE_BOLD = re.compile(r'\*\*(.+?)\*\*')
+
+
+def analysis_hash(analysis_text):
+    return hashlib.blake2b(analysis_text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def _inline_html(text):
+    return INLINE_BOLD.sub(r'<strong>\1</strong>', html.escape(text))
+
+
+def markdown_to_html(analysis_text):
+    """
+    Convert the report's markdown (headings, bullets, numbered items, tables
+    and bold text) to HTML
+    """
+    out = []
+    open_tag = None
+
+    def close():
+        nonlocal open_tag
+        if open_tag:
+            out.append(f"</{open_tag}>")
+            open_tag = None
+
+    for line in analysis_text.splitlines():
+        line = line.strip()
+        if line.startswith("## "):
+            close()
+            out.append(f"<h2>{_inline_html(line[3:])}</h2>")
+        elif line.startswith("|"):
+            cells = [cell.strip() for cell in line.strip("|").split("|")]
+            if all(set(cell) <= set("-: ") for cell in cells):
+                continue
+            if open_tag != "table":
+                close()
+                out.append("<table>")
+                open_tag = "table"
+                out.append("<tr>" + "".join(f"<th>{_inline_html(cell)}</th>" for cell in cells) + "</tr>")
+            else:
+                out.append("<tr>" + "".join(f"<td>{_inline_html(cell)}</td>" for cell in cells) + "</tr>")
+        elif line.startswith(("- ", "* ")):
+            if open_tag != "ul":
+                close()
+                out.append("<ul>")
+                open_tag = "ul"
+            out.append(f"<li>{_inline_html(line[2:])}</li>")
+        elif re.match(r'\d+\. ', line):
+            if open_tag != "ol":
+                close()
+                out.append("<ol>")
+                open_tag = "ol"
+            out.append(f"<li>{_inline_html(line.split('. ', 1)[1])}</li>")
+        elif line:
+            close()
+            out.append(f"<p>{_inline_html(line)}</p>")
+        else:
+            close()
+    close()
+    return "\n".join(out)
+
+
+def render_html(analysis_text, title):
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title><style>{HTML_STYLE}</style></head>\n"
+        f"<body><h1>{html.escape(title)}</h1>\n{markdown_to_html(analysis_text)}\n</body></html>\n"
+    ).encode('utf-8')
+
+
+def render_json(analysis_text, report, title):
+    if report is not None:
+        data = report_to_dict(report)
+    else:
+        # Markdown-only analyses are exported section by section
+        data = {'sections': split_markdown_sections(analysis_text)}
+    return json.dumps({'title': title, **data}, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def render_pdf(analysis_text, title):
+    lines = []
+    headings = set(SECTION_HEADINGS.values())
+    for line in analysis_text.splitlines():
+        if line in headings:
+            # The PDF fonts have no emoji; keep the heading text only
+            line = line.split(" ", 2)[-1]
+            lines += ["", line.upper()]
+            continue
+        line = line.replace("**", "")
+        lines += textwrap.wrap(line, PDF_LINE_WIDTH, subsequent_indent="   ") or [""]
+    return build_text_pdf(paginate(lines), title=title)
+
+
+def render_export(fmt, analysis_text, report=None, title="Resume Analysis Report"):
+    """
+    Return the analysis rendered in one of EXPORT_FORMATS as bytes, from the
+    cache when this analysis was exported in this format before
+    """
+    # Only the JSON export is rendered from the report rather than the text
+    report_hash = None
+    if fmt == 'json' and report is not None:
+        report_hash = analysis_hash(json.dumps(report_to_dict(report), sort_keys=True))
+    key = (analysis_hash(analysis_text), fmt, title, report_hash)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    if fmt == 'md':
+        data = analysis_text.encode('utf-8')
+    elif fmt == 'html':
+        data = render_html(analysis_text, title)
+    elif fmt == 'json':
+        data = render_json(analysis_text, report, title)
+    elif fmt == 'pdf':
+        data = render_pdf(analysis_text, title)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > EXPORT_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return data
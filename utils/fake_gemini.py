@@ -0,0 +1,374 @@
+"""
+Local stand-in for the Gemini API, for capacity planning and tests.
+
+In-process use: ``FakeGeminiBackend`` implements the backend interface of
+utils.llm_client (LLM_BACKEND=fake selects it in the app).
+
+As a server: ``python -m utils.fake_gemini --port 8765`` answers the REST
+generateContent and streamGenerateContent endpoints; setting
+GEMINI_API_ENDPOINT=http://127.0.0.1:8765 points the real client at it.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeBackendError(Exception):
+    """Injected failure returned by the fake backend."""
+
+
+def parse_latency_spec(spec):
+    """
+    Parse a latency distribution, in seconds, into a sampler taking a
+    random.Random:
+      "0.5"                 constant
+      "uniform:0.2:1.5"     uniform between two bounds
+      "normal:0.8:0.2"      normal with mean and standard deviation
+      "lognormal:0.8:0.5"   log-normal with median and sigma
+      "exponential:0.8"     exponential with mean
+    """
+    parts = str(spec).split(":")
+    kind, args = parts[0], [float(value) for value in parts[1:]]
+    if len(parts) == 1:
+        constant = float(kind)
+        return lambda rng: constant
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal":
+        import math
+        mu = math.log(args[0])
+        return lambda rng: rng.lognormvariate(mu, args[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1.0 / args[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def render_fake_analysis(prompt, rng):
+    """
+    A plausible analysis in the exact markdown format analyze_resume asks for.
+    """
+    role_match = re.search(r'\*\*TARGET ROLE:\*\*\s*(.+)', prompt)
+    role = role_match.group(1).strip() if role_match else "the target role"
+    parts = [rng.randint(8, 24) for _ in range(4)]
+
+    return f"""## 📊 QUICK SUMMARY (TL;DR)
+- Relevant foundation for {role} with room to sharpen the focus
+- Several bullets describe duties instead of outcomes
+- Skills section is broad; tie the key ones to concrete work
+- Projects are present but lack measurable results
+- Formatting is ATS friendly overall
+
+## 💯 RESUME SCORE & BREAKDOWN
+Overall Score: {sum(parts)}/100
+- Role Alignment: {parts[0]}/25
+- Impact Clarity: {parts[1]}/25
+- ATS Friendliness: {parts[2]}/25
+- Project Relevance: {parts[3]}/25
+
+## 🎯 ROLE FIT ANALYSIS
+The resume aligns reasonably with {role}. Core skills are visible, but the
+experience section does not yet show ownership of results at the expected level.
+
+## 🧩 SKILL GAP MATRIX
+| Skill Category | Strong Match | Partial Match | Missing But Important |
+|----------------|--------------|---------------|----------------------|
+| Technical Skills | Python, SQL | Docker | System design |
+| Tools & Technologies | Git | Jira | CI/CD |
+| Soft Skills | Communication | Leadership | Stakeholder management |
+
+## 🔍 HIRING MANAGER SIMULATION
+- First impression: Organised and readable
+- What stands out: Relevant core skills
+- What raises doubts: Few quantified achievements
+- Likely shortlist decision: Maybe - strengthen impact statements
+
+## ⚠️ RESUME RISK DETECTION
+- Buzzwords without proof in the summary
+- Long skills list compared to demonstrated experience
+
+## 🛠️ IMPROVEMENT ACTIONS (PRIORITIZED)
+1. Quantify the results of the three most recent roles
+2. Reorder skills to lead with those required for {role}
+3. Rewrite project descriptions in problem-solution-result form
+
+## ✏️ EXAMPLE REWRITES
+**Before:** Worked on the data pipeline.
+**After:** Rebuilt the nightly data pipeline, cutting processing time by 40% for 12 downstream teams.
+**Why better:** Starts with a strong verb, quantifies the result and shows who benefited.
+"""
+
+
+def render_fake_chunk_summary(prompt, rng):
+    """
+    A short summary for the chunk prompts of long resumes (see utils.chunking)
+    """
+    part = prompt.split("**RESUME PART:**", 1)[1]
+    years = sorted(set(re.findall(r'\b(?:19|20)\d{2}\b', part)))
+    numbers = re.findall(r'\d+%', part)
+    span = f"{years[0]}-{years[-1]}" if years else "undated"
+    return (
+        f"Covers {span}. {len(part.split())} words, {len(numbers)} quantified results "
+        f"({', '.join(numbers[:3]) or 'none'}). Weakest bullet is duty-focused. "
+        f"{rng.choice(['No red flags.', 'Some buzzwords without proof.', 'A short gap between roles.'])}"
+    )
+
+
+def render_fake_report_json(prompt, rng):
+    """
+    A plausible analysis for JSON-mode prompts (see utils.report_schema);
+    delta prompts get only the score back and hybrid prompts only the
+    narrative keys.
+    """
+    role_match = re.search(r'\*\*TARGET ROLE:\*\*\s*(.+)', prompt)
+    role = role_match.group(1).strip() if role_match else "the target role"
+    parts = [rng.randint(8, 24) for _ in range(4)]
+    score = {
+        "overall": sum(parts), "role_alignment": parts[0], "impact_clarity": parts[1],
+        "ats_friendliness": parts[2], "project_relevance": parts[3]
+    }
+    if "only the top-level keys" in prompt:
+        return json.dumps({"score": score})
+
+    report = {
+        "summary": [
+            f"Relevant foundation for {role} with room to sharpen the focus",
+            "Several bullets describe duties instead of outcomes",
+            "Skills section is broad; tie the key ones to concrete work",
+            "Projects are present but lack measurable results",
+            "Formatting is ATS friendly overall",
+        ],
+        "score": score,
+        "role_fit": f"The resume aligns reasonably with {role}, but ownership of results is not yet visible.",
+        "skill_gap": [
+            {"category": "Technical Skills", "strong_match": "Python, SQL", "partial_match": "Docker", "missing": "System design"},
+            {"category": "Tools & Technologies", "strong_match": "Git", "partial_match": "Jira", "missing": "CI/CD"},
+            {"category": "Soft Skills", "strong_match": "Communication", "partial_match": "Leadership", "missing": "Stakeholder management"},
+        ],
+        "hiring_manager": {
+            "first_impression": "Organised and readable",
+            "stands_out": "Relevant core skills",
+            "raises_doubts": "Few quantified achievements",
+            "decision": "Maybe - strengthen impact statements",
+        },
+        "risks": ["Buzzwords without proof in the summary", "Long skills list compared to demonstrated experience"],
+        "improvements": [
+            "Quantify the results of the three most recent roles",
+            f"Reorder skills to lead with those required for {role}",
+            "Rewrite project descriptions in problem-solution-result form",
+        ],
+        "rewrites": [{
+            "before": "Worked on the data pipeline.",
+            "after": "Rebuilt the nightly data pipeline, cutting processing time by 40% for 12 downstream teams.",
+            "why_better": "Starts with a strong verb, quantifies the result and shows who benefited.",
+        }],
+    }
+    if '"summary"' not in prompt:
+        report = {key: report[key] for key in ("role_fit", "skill_gap", "improvements")}
+    return json.dumps(report, ensure_ascii=False)
+
+
+class FakeGeminiBackend:
+    """
+    Local stand-in for the Gemini model with configurable latency and error
+    rate, so timeouts, hedging and the circuit breaker can be exercised
+    without network access.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, error_rate=0.0, response_text=None, seed=None,
+                 name="fake", chunk_chars=200, chunk_delay=0.0):
+        self.name = name
+        if jitter:
+            latency = f"uniform:{max(0.0, float(latency) - jitter)}:{float(latency) + jitter}"
+        self.latency_spec = str(latency)
+        self._sample_latency = parse_latency_spec(latency)
+        self.error_rate = error_rate
+        self.response_text = response_text
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, tier=None):
+        """
+        Configured from FAKE_GEMINI_* variables; a model tier (see
+        utils.model_router) gets its own name, and its own latency from
+        FAKE_GEMINI_<TIER>_LATENCY if set
+        """
+        latency = os.environ.get("FAKE_GEMINI_LATENCY", "0.5")
+        if tier:
+            latency = os.environ.get(f"FAKE_GEMINI_{tier.upper()}_LATENCY", latency)
+        return cls(
+            latency=latency,
+            name=f"fake-{tier}" if tier else "fake",
+            jitter=float(os.environ.get("FAKE_GEMINI_JITTER", 0.0)),
+            error_rate=float(os.environ.get("FAKE_GEMINI_ERROR_RATE", 0.0)),
+            chunk_chars=int(os.environ.get("FAKE_GEMINI_CHUNK_CHARS", 200)),
+            chunk_delay=float(os.environ.get("FAKE_GEMINI_CHUNK_DELAY", 0.0)),
+        )
+
+    def _plan(self, prompt):
+        with self._lock:
+            self.calls += 1
+            delay = self._sample_latency(self._random)
+            fail = self._random.random() < self.error_rate
+        # Response content depends only on the prompt, so runs are comparable
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest(), "big")
+        if self.response_text is not None:
+            text = self.response_text
+        elif "**RESUME PART:**" in prompt:
+            text = render_fake_chunk_summary(prompt, random.Random(seed))
+        elif "JSON object" in prompt:
+            text = render_fake_report_json(prompt, random.Random(seed))
+        else:
+            text = render_fake_analysis(prompt, random.Random(seed))
+            section = re.search(r'Write ONLY the "(## [^"]+)" section', prompt)
+            if section:
+                # Per-section prompts get just that section's body
+                start = text.index(section.group(1)) + len(section.group(1))
+                end = text.find("\n## ", start)
+                text = text[start:end if end != -1 else len(text)].strip()
+        return delay, fail, text
+
+    def generate(self, prompt):
+        delay, fail, text = self._plan(prompt)
+        time.sleep(delay)
+        if fail:
+            raise FakeBackendError("injected failure")
+        return text
+
+    def stream(self, prompt):
+        """
+        Yield the response in chunks: the sampled latency is spent before the
+        first chunk, then chunk_delay between chunks.
+        """
+        delay, fail, text = self._plan(prompt)
+        time.sleep(delay)
+        if fail:
+            raise FakeBackendError("injected failure")
+        for start in range(0, len(text), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_chars]
+
+
+def _candidate(text, finished):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+
+def make_handler(backend):
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            prompt = "".join(
+                part.get("text", "")
+                for content in request.get("contents", [])
+                for part in content.get("parts", [])
+            )
+
+            if path.endswith(":generateContent"):
+                try:
+                    self._send_json(200, _candidate(backend.generate(prompt), True))
+                except FakeBackendError as e:
+                    self._send_json(503, {"error": {"code": 503, "message": str(e), "status": "UNAVAILABLE"}})
+            elif path.endswith(":streamGenerateContent"):
+                self._stream(prompt, sse="alt=sse" in self.path)
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+        def _stream(self, prompt, sse):
+            chunks = backend.stream(prompt)
+            try:
+                first = next(chunks)
+            except FakeBackendError as e:
+                self._send_json(503, {"error": {"code": 503, "message": str(e), "status": "UNAVAILABLE"}})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def emit(text, index, finished):
+                payload = json.dumps(_candidate(text, finished)).encode("utf-8")
+                if sse:
+                    write(b"data: " + payload + b"\n\n")
+                else:
+                    write((b"," if index else b"[") + payload)
+
+            # One chunk of lookahead, so the last one can carry finishReason
+            previous, index = first, 0
+            for chunk in chunks:
+                emit(previous, index, False)
+                previous, index = chunk, index + 1
+            emit(previous, index, True)
+            if not sse:
+                write(b"]")
+            write(b"")
+
+    return FakeGeminiHandler
+
+
+def serve(backend, host="127.0.0.1", port=8765):
+    """
+    Start the fake API server in a background thread; returns the server
+    (call shutdown() to stop it).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:0.8:0.4", help="latency distribution, see parse_latency_spec()")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chunk-chars", type=int, default=200)
+    parser.add_argument("--chunk-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    backend = FakeGeminiBackend(
+        latency=args.latency, error_rate=args.error_rate,
+        chunk_chars=args.chunk_chars, chunk_delay=args.chunk_delay
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(backend))
+    print(f"Fake Gemini API listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
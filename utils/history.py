@@ -0,0 +1,383 @@
+"""
+Analysis history in a local SQLite database.
+
+    python -m utils.history --compact     run the retention job once
+
+The database runs in WAL mode so the history panel can read while the
+background writer commits. Writes are queued and committed in batches off
+the request path; large text columns are zlib-compressed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from utils import metrics
+from utils.report_schema import ReportValidationError, report_from_dict, report_to_dict
+
+HISTORY_DB_PATH = os.environ.get(
+    "HISTORY_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "history.db")
+)
+HISTORY_POOL_SIZE = int(os.environ.get("HISTORY_POOL_SIZE", 4))
+# Pending writes are committed together once this many are queued or the
+# oldest has waited this long
+HISTORY_BATCH_SIZE = int(os.environ.get("HISTORY_BATCH_SIZE", 32))
+HISTORY_FLUSH_SECONDS = float(os.environ.get("HISTORY_FLUSH_SECONDS", 0.5))
+# Retention: analyses older than this, or beyond the newest N of a user, are deleted
+HISTORY_RETENTION_DAYS = float(os.environ.get("HISTORY_RETENTION_DAYS", 90))
+HISTORY_MAX_PER_USER = int(os.environ.get("HISTORY_MAX_PER_USER", 50))
+HISTORY_COMPACT_INTERVAL_SECONDS = float(os.environ.get("HISTORY_COMPACT_INTERVAL_SECONDS", 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    job_category TEXT NOT NULL,
+    upload_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    score INTEGER,
+    score_components TEXT,
+    llm_mode TEXT,
+    resume_text BLOB,
+    structured_data BLOB,
+    analysis_text BLOB,
+    report BLOB,
+    depth TEXT,
+    signature BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_user ON analyses (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_analyses_role ON analyses (job_category, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created_at);
+"""
+
+# Columns added after the first release, with their types
+MIGRATIONS = {'depth': 'TEXT', 'signature': 'BLOB'}
+
+INSERT = """
+INSERT INTO analyses (user_id, job_category, upload_hash, created_at, score, score_components,
+                      llm_mode, resume_text, structured_data, analysis_text, report, depth, signature)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def upload_hash(data):
+    """
+    Content hash of an uploaded file
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _pack(text):
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def _unpack(blob):
+    return zlib.decompress(blob).decode('utf-8') if blob is not None else None
+
+
+class ConnectionPool:
+    """
+    Fixed set of SQLite connections shared by all Streamlit threads; a
+    connection is used by one thread at a time.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self._connections = queue.Queue()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for _ in range(size):
+            self._connections.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(analyses)")}
+            for column, column_type in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE analyses ADD COLUMN {column} {column_type}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL makes NORMAL safe against corruption; only the last commits can
+        # be lost on power failure
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = queue.Queue()
+_writer = None
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(HISTORY_DB_PATH, HISTORY_POOL_SIZE)
+        return _pool
+
+
+def _row(user_id, upload_hash, snapshot, llm_mode, created_at):
+    structured_data = dict(snapshot['structured_data'])
+    # raw_text is stored once, in its own column
+    raw_text = structured_data.pop('raw_text')
+    report = snapshot['report']
+    signature = snapshot.get('signature')
+    return (
+        user_id,
+        snapshot['job_category'],
+        upload_hash,
+        created_at,
+        snapshot['score'],
+        json.dumps(snapshot['score_components']),
+        llm_mode,
+        _pack(raw_text),
+        _pack(json.dumps(structured_data)),
+        _pack(snapshot['analysis_text']),
+        _pack(json.dumps(report_to_dict(report))) if report is not None else None,
+        snapshot.get('depth'),
+        signature.tobytes() if signature is not None else None,
+    )
+
+
+def _write_batch(batch):
+    started = time.perf_counter()
+    # Serializing and compressing happens here, on the writer thread
+    rows = [_row(*item) for item in batch]
+    with get_pool().connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            # One statement per row, for the ids the near-duplicate index needs
+            ids = [conn.execute(INSERT, row).lastrowid for row in rows]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    metrics.observe('history_write_batch_seconds', time.perf_counter() - started)
+    metrics.increment('history_rows_written_total', len(rows))
+
+    from utils.near_duplicates import index_analysis
+    for analysis_id, (_, _, snapshot, _, _) in zip(ids, batch):
+        if snapshot.get('signature') is not None:
+            index_analysis(analysis_id, snapshot['signature'])
+
+
+def _writer_loop():
+    last_compaction = time.monotonic()
+    while True:
+        try:
+            first = _pending.get(timeout=HISTORY_COMPACT_INTERVAL_SECONDS)
+        except queue.Empty:
+            first = None
+
+        if first is not None:
+            batch = [first]
+            deadline = time.monotonic() + HISTORY_FLUSH_SECONDS
+            while len(batch) < HISTORY_BATCH_SIZE:
+                try:
+                    batch.append(_pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                _write_batch(batch)
+            except Exception as e:
+                metrics.increment('history_write_errors_total')
+                print(f"History write failed: {e}")
+            finally:
+                for _ in batch:
+                    _pending.task_done()
+
+        if time.monotonic() - last_compaction >= HISTORY_COMPACT_INTERVAL_SECONDS:
+            last_compaction = time.monotonic()
+            try:
+                compact()
+            except Exception as e:
+                print(f"History compaction failed: {e}")
+
+
+def _ensure_writer():
+    global _writer
+    with _pool_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name="history-writer", daemon=True)
+            _writer.start()
+
+
+def record_analysis(user_id, upload_hash, snapshot, llm_mode):
+    """
+    Queue an analysis for storage; returns immediately
+    """
+    _pending.put((user_id, upload_hash, snapshot, llm_mode, time.time()))
+    _ensure_writer()
+
+
+def flush():
+    """
+    Block until every queued analysis is committed
+    """
+    _ensure_writer()
+    _pending.join()
+
+
+def list_history(user_id, limit=20):
+    """
+    Newest analyses of a user, without the large columns:
+    [{'id', 'created_at', 'job_category', 'score', 'llm_mode'}]
+    """
+    with get_pool().connection() as conn:
+        rows = conn.execute(
+            "SELECT id, created_at, job_category, score, llm_mode FROM analyses "
+            "WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+    return [
+        {'id': row[0], 'created_at': row[1], 'job_category': row[2], 'score': row[3], 'llm_mode': row[4]}
+        for row in rows
+    ]
+
+
+SELECT_ANALYSIS = (
+    "SELECT job_category, upload_hash, created_at, score, score_components, llm_mode, "
+    "resume_text, structured_data, analysis_text, report FROM analyses "
+)
+
+
+def load_analysis(user_id, analysis_id):
+    """
+    A stored analysis in the snapshot layout of utils.incremental (without
+    fingerprints), or None if it does not exist or belongs to another user
+    """
+    with get_pool().connection() as conn:
+        row = conn.execute(SELECT_ANALYSIS + "WHERE id = ? AND user_id = ?", (analysis_id, user_id)).fetchone()
+    return _snapshot(row) if row is not None else None
+
+
+def load_reusable_analysis(analysis_id, job_category, depth, user_id=None):
+    """
+    A stored analysis as in load_analysis() if the model made it for this
+    role and depth (and, given user_id, for this user), or None
+    """
+    query = SELECT_ANALYSIS + "WHERE id = ? AND job_category = ? AND depth IS ? AND llm_mode != 'local'"
+    params = (analysis_id, job_category, depth)
+    if user_id is not None:
+        query += " AND user_id = ?"
+        params += (user_id,)
+    with get_pool().connection() as conn:
+        row = conn.execute(query, params).fetchone()
+    return _snapshot(row) if row is not None else None
+
+
+def iter_signatures(batch_size=10000):
+    """
+    (id, MinHash signature bytes) of every stored analysis that has one
+    """
+    with get_pool().connection() as conn:
+        cursor = conn.execute("SELECT id, signature FROM analyses WHERE signature IS NOT NULL")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+
+def _report(blob):
+    if blob is None:
+        return None
+    try:
+        return report_from_dict(json.loads(_unpack(blob)))
+    except ReportValidationError as e:
+        # Stored before the schema was tightened; shown from its markdown
+        print(f"Stored report no longer valid: {e}")
+        return None
+
+
+def _snapshot(row):
+    structured_data = json.loads(_unpack(row[7]))
+    structured_data['raw_text'] = _unpack(row[6])
+    return {
+        'job_category': row[0],
+        'upload_hash': row[1],
+        'created_at': row[2],
+        'score': row[3],
+        'score_components': json.loads(row[4]),
+        'llm_mode': row[5],
+        'structured_data': structured_data,
+        'analysis_text': _unpack(row[8]),
+        'report': _report(row[9]),
+    }
+
+
+def compact(retention_days=None, max_per_user=None):
+    """
+    Delete analyses past the retention period and beyond each user's newest
+    max_per_user, then checkpoint the WAL and return freed pages to the OS.
+    Returns the number of deleted rows.
+    """
+    retention_days = HISTORY_RETENTION_DAYS if retention_days is None else retention_days
+    max_per_user = HISTORY_MAX_PER_USER if max_per_user is None else max_per_user
+
+    with get_pool().connection() as conn:
+        ids = [row[0] for row in conn.execute(
+            "SELECT id FROM analyses WHERE created_at < ? UNION "
+            "SELECT id FROM (SELECT id, ROW_NUMBER() OVER "
+            "  (PARTITION BY user_id ORDER BY created_at DESC) AS position FROM analyses) "
+            "WHERE position > ?",
+            (time.time() - retention_days * 86400, max_per_user)
+        )]
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("DELETE FROM analyses WHERE id = ?", ((analysis_id,) for analysis_id in ids))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        deleted = len(ids)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if deleted:
+            conn.execute("VACUUM")
+
+    # Deleted analyses can no longer be reused, so they leave the index too
+    from utils.near_duplicates import unindex_analyses
+    unindex_analyses(ids)
+    metrics.increment('history_rows_deleted_total', deleted)
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compact", action="store_true", help="apply retention and compact the database")
+    parser.add_argument("--retention-days", type=float)
+    parser.add_argument("--max-per-user", type=int)
+    args = parser.parse_args()
+
+    if args.compact:
+        deleted = compact(args.retention_days, args.max_per_user)
+        print(f"Deleted {deleted} analyses from {HISTORY_DB_PATH}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
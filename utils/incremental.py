@@ -0,0 +1,416 @@
+import hashlib
+import json
+import re
+import time
+from functools import lru_cache
+
+from utils import metrics
+from utils.ai_analysis import (
+    OUTPUT_MODE, ANALYSIS_STRATEGY, DEPTH_TIERS, analyze_resume, analyze_resume_structured,
+    analyze_resume_hybrid, analyze_resume_by_section, join_sections, generate_analysis, mock_analysis, mock_report,
+    calculate_resume_score
+)
+from utils.report_schema import (
+    ReportValidationError, decode_json_response, report_from_dict, report_to_dict,
+    report_to_markdown
+)
+from utils.pdf_processor import (
+    split_sections, extract_section_slices, extract_contact_info,
+    extract_skills, extract_experience, extract_projects, extract_education
+)
+from utils.normalize import normalize_pages
+from utils.near_duplicates import minhash, find_near_duplicate
+from utils.cancellation import check
+from utils.model_router import route_analysis, use_route, record_response
+
+# Above this share of changed sections a delta prompt saves little, so the
+# full analysis is requested instead
+FULL_REANALYSIS_RATIO = 0.5
+
+REPORT_HEADING = re.compile(r'^## .*$', re.MULTILINE)
+REWRITE_BEFORE = re.compile(r'^\*\*Before:\*\*\s*(.+)$', re.MULTILINE)
+
+
+def fingerprint(text):
+    """
+    Return a short, stable content fingerprint for a piece of text
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def _section_features(section_text):
+    """
+    Local features of one resume section, cached by content so unchanged
+    sections are never re-scanned
+    """
+    return {
+        'skills': extract_skills(section_text),
+        'experience': extract_experience(section_text),
+        'projects': extract_projects(section_text),
+        'education': extract_education(section_text)
+    }
+
+
+def extract_structured_data_by_section(text, blocks=None):
+    """
+    Same shape as extract_structured_data(), but skills, experience, projects
+    and education are extracted per section and merged, so only sections
+    whose content changed are recomputed.
+    """
+    if blocks is None:
+        blocks = split_sections(text)
+
+    skills = {'technical': [], 'tools': [], 'soft_skills': []}
+    experience, projects, education = [], [], []
+
+    for _, block_text in blocks:
+        features = _section_features(block_text)
+        for category, found in features['skills'].items():
+            for skill in found:
+                if skill not in skills[category]:
+                    skills[category].append(skill)
+        experience.extend(dict(item) for item in features['experience'])
+        projects.extend(dict(item) for item in features['projects'])
+        education.extend(dict(item) for item in features['education'])
+
+    return {
+        'raw_text': text,
+        'contact_info': extract_contact_info(text),
+        'skills': skills,
+        'experience': experience,
+        'projects': projects,
+        'education': education,
+        'sections': extract_section_slices(text)
+    }
+
+
+def diff_snapshots(previous, page_fingerprints, section_fingerprints):
+    """
+    Compare fingerprints of a new upload with the previous snapshot
+    """
+    old_pages = previous['page_fingerprints'] if previous else []
+    old_sections = previous['section_fingerprints'] if previous else {}
+
+    changed_pages = [
+        i for i, fp in enumerate(page_fingerprints)
+        if i >= len(old_pages) or old_pages[i] != fp
+    ]
+    changed_pages.extend(range(len(page_fingerprints), len(old_pages)))
+
+    return {
+        'changed_pages': changed_pages,
+        'changed_sections': [
+            name for name, fp in section_fingerprints.items()
+            if name in old_sections and old_sections[name] != fp
+        ],
+        'added_sections': [name for name in section_fingerprints if name not in old_sections],
+        'removed_sections': [name for name in old_sections if name not in section_fingerprints]
+    }
+
+
+def split_report(analysis_text):
+    """
+    Split a markdown report into an ordered {heading: body} mapping
+    """
+    report = {}
+    headings = list(REPORT_HEADING.finditer(analysis_text))
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(analysis_text)
+        report[match.group().strip()] = analysis_text[match.end():end].strip()
+    return report
+
+
+def merge_reports(previous_text, update_text):
+    """
+    Replace the sections of a previous report with those present in an update,
+    keeping every section the update did not mention
+    """
+    merged = split_report(previous_text)
+    merged.update(split_report(update_text))
+    return "\n\n".join(f"{heading}\n{body}" for heading, body in merged.items())
+
+
+def build_delta_prompt(previous_analysis, sections, diff, job_category):
+    """
+    Ask the model to revise only what the edited sections affect
+    """
+    changed = diff['changed_sections'] + diff['added_sections']
+    changed_text = "\n\n".join(f"[{name}]\n{sections[name]}" for name in changed)
+    removed = ", ".join(diff['removed_sections']) or "none"
+
+    return f"""
+    ACT as a Senior Certified Professional Resume Writer (CPRW) reviewing a REVISED resume.
+
+    **TARGET ROLE:** {job_category}
+
+    **YOUR PREVIOUS ANALYSIS:**
+    {previous_analysis}
+
+    **SECTIONS THAT CHANGED SINCE THAT ANALYSIS:**
+    {changed_text or "none"}
+
+    **SECTIONS REMOVED:** {removed}
+
+    Every other part of the resume is unchanged. Return ONLY the report sections
+    whose content must change because of these edits, using exactly the same
+    "## " headings and format as the previous analysis. Always include the
+    "## 💯 RESUME SCORE & BREAKDOWN" section. Do not repeat unchanged sections.
+    """
+
+
+def build_delta_prompt_json(previous_report, sections, diff, job_category):
+    """
+    JSON-mode variant of build_delta_prompt(): the model returns only the
+    top-level report keys that change
+    """
+    changed = diff['changed_sections'] + diff['added_sections']
+    changed_text = "\n\n".join(f"[{name}]\n{sections[name]}" for name in changed)
+    removed = ", ".join(diff['removed_sections']) or "none"
+
+    return f"""
+    ACT as a Senior Certified Professional Resume Writer (CPRW) reviewing a REVISED resume.
+
+    **TARGET ROLE:** {job_category}
+
+    **YOUR PREVIOUS ANALYSIS (JSON):**
+    {json.dumps(report_to_dict(previous_report))}
+
+    **SECTIONS THAT CHANGED SINCE THAT ANALYSIS:**
+    {changed_text or "none"}
+
+    **SECTIONS REMOVED:** {removed}
+
+    Every other part of the resume is unchanged. Respond with a JSON object with
+    only the top-level keys whose values must change because of these edits, each
+    with its complete new value in the same schema. Always include "score".
+    """
+
+
+def _delta_report(previous_report, sections, changes, job_category, budget_seconds=None):
+    update = generate_analysis(
+        build_delta_prompt_json(previous_report, sections, changes, job_category), budget_seconds=budget_seconds
+    )
+    if not update:
+        return None
+    try:
+        changed = decode_json_response(update)
+        if not isinstance(changed, dict):
+            raise ReportValidationError("update must be a JSON object")
+        merged = report_to_dict(previous_report)
+        merged.update(changed)
+        report = report_from_dict(merged)
+    except ReportValidationError as e:
+        print(f"AI Analysis returned an invalid report update: {e}")
+        record_response(False)
+        return None
+    record_response(True)
+    return report
+
+
+def _analyze_by_section(text, job_category, structured_data, on_section, budget_seconds=None):
+    sections = {}
+    from_model = False
+    for section, body, model_section in analyze_resume_by_section(
+            text, job_category, structured_data, budget_seconds=budget_seconds):
+        sections[section] = body
+        from_model = from_model or model_section
+        if on_section:
+            on_section(section, body)
+    return join_sections(sections), from_model
+
+
+def locate_rewrites(normalized, analysis_text):
+    """
+    Where the resume lines quoted as "Before" in the report's rewrites are:
+    [{'text', 'page'}] with 1-based page numbers, for lines found in the text
+    """
+    highlights = []
+    for match in REWRITE_BEFORE.finditer(analysis_text):
+        quoted = match.group(1).strip().strip('"')
+        location = normalized.locate(quoted)
+        if location:
+            highlights.append({'text': quoted, 'page': location[0] + 1})
+    return highlights
+
+
+def prepare_pages(pages, normalized=None):
+    """
+    The role-independent local work on extracted pages: normalized text,
+    sections, structured data and fingerprints. 'scores' ({job category:
+    (total, components)}) and 'signature' may be filled in ahead too.
+    Returns None if the pages hold no text.
+    """
+    if normalized is None:
+        normalized = normalize_pages(pages)
+    if normalized is None:
+        return None
+    blocks = split_sections(normalized.text)
+    return {
+        'normalized': normalized,
+        'page_fingerprints': [fingerprint(page) for page in pages],
+        'blocks': blocks,
+        'section_fingerprints': {name: fingerprint(block) for name, block in blocks},
+        'structured_data': extract_structured_data_by_section(normalized.text, blocks),
+        'scores': {},
+        'signature': None,
+    }
+
+
+def analyze_revision(pages, job_category, previous=None, on_section=None, depth=None, user_id=None,
+                     prepared=None):
+    """
+    Analyze an uploaded resume, reusing the previous snapshot of the same user
+    where possible.
+    depth is one of DEPTH_TIERS and selects the strategy and latency budget;
+    without it ANALYSIS_STRATEGY and the default budget apply. A previous
+    snapshot is reused only for the same role and depth.
+    Given user_id and no previous snapshot, the model analysis of a near
+    duplicate analyzed earlier is reused (see utils.near_duplicates).
+    Raises AnalysisCancelled between stages once the current analysis is
+    cancelled (see utils.cancellation).
+    With the sections strategy, on_section(section, body) is called as
+    each report section finishes so it can be rendered right away.
+    prepared is prepare_pages(pages) if it was done ahead (see
+    utils.speculation); its scores and signature are used when present.
+    Returns (snapshot, changes); snapshot is None if the pages hold no text.
+    """
+    started = time.perf_counter()
+    normalized = prepared['normalized'] if prepared else normalize_pages(pages)
+    if normalized is None:
+        return None, None
+    text = normalized.text
+    check('normalize')
+
+    tier = DEPTH_TIERS.get(depth)
+    strategy = tier['strategy'] if tier else ANALYSIS_STRATEGY
+    budget_seconds = tier['target_seconds'] if tier else None
+
+    page_fingerprints = prepared['page_fingerprints'] if prepared else [fingerprint(page) for page in pages]
+    if previous and (previous['job_category'] != job_category or previous.get('depth') != depth):
+        previous = None
+
+    # Identical upload: nothing to extract, score or ask
+    if previous and previous['page_fingerprints'] == page_fingerprints:
+        changes = diff_snapshots(previous, page_fingerprints, previous['section_fingerprints'])
+        changes.update(llm_mode='reused', previous_score=previous['score'], score=previous['score'])
+        return previous, changes
+
+    if prepared is None:
+        prepared = prepare_pages(pages, normalized)
+    sections = dict(prepared['blocks'])
+    section_fingerprints = prepared['section_fingerprints']
+    structured_data = prepared['structured_data']
+    check('parse')
+    total_score, score_components = (
+        prepared['scores'].get(job_category) or calculate_resume_score(structured_data, job_category)
+    )
+    check('score')
+
+    changes = diff_snapshots(previous, page_fingerprints, section_fingerprints)
+    changed_count = len(changes['changed_sections']) + len(changes['added_sections']) + len(changes['removed_sections'])
+
+    use_delta = previous and changed_count <= FULL_REANALYSIS_RATIO * max(len(sections), 1)
+    report = None
+    analysis_text = None
+
+    # A revision of the previous upload is better served by the delta prompt,
+    # and local analyses are cheaper to redo than to look up
+    signature = prepared['signature'] or minhash(text)
+    check('lookup')
+    near_duplicate = None
+    if user_id is not None and previous is None and strategy != 'local':
+        near_duplicate = find_near_duplicate(signature, job_category, depth, user_id)
+    changes['near_duplicate'] = {
+        'similarity': near_duplicate['similarity'],
+        'reused': near_duplicate['snapshot'] is not None,
+    } if near_duplicate else None
+
+    # Model calls go to the tier picked for this resume's complexity and
+    # depth (see utils.model_router)
+    route = None
+    if strategy != 'local' and not (near_duplicate and near_duplicate['snapshot']):
+        route = route_analysis(text, len(sections), structured_data, depth, budget_seconds)
+    changes['model_tier'] = route['tier'] if route else None
+
+    with use_route(route):
+        if near_duplicate and near_duplicate['snapshot']:
+            report = near_duplicate['snapshot']['report']
+            analysis_text = near_duplicate['snapshot']['analysis_text']
+            # The reused report states its own score; show that one throughout
+            total_score = near_duplicate['snapshot']['score']
+            score_components = near_duplicate['snapshot']['score_components']
+            changes['llm_mode'] = 'near_duplicate'
+        elif strategy == 'local':
+            # Score, risks, hiring-manager review and rewrites from the local
+            # engines, with the narrative sections filled in heuristically
+            report, _ = analyze_resume_hybrid(text, job_category, structured_data, use_model=False)
+            changes['llm_mode'] = 'local'
+            analysis_text = report_to_markdown(report)
+        # The hybrid strategy always produces a typed report, so it shares the JSON
+        # path; the section fan-out produces markdown and takes the markdown path
+        elif (OUTPUT_MODE == 'json' and strategy != 'sections') or strategy == 'hybrid':
+            if use_delta and previous.get('report'):
+                report = _delta_report(previous['report'], sections, changes, job_category, budget_seconds)
+                changes['llm_mode'] = 'delta'
+            if report is None and strategy == 'hybrid':
+                report, used_model = analyze_resume_hybrid(
+                    text, job_category, structured_data, budget_seconds=budget_seconds
+                )
+                changes['llm_mode'] = 'hybrid' if used_model else 'local'
+            if report is None:
+                report = analyze_resume_structured(text, job_category, budget_seconds=budget_seconds)
+                changes['llm_mode'] = 'full'
+            if report is None:
+                report = mock_report(text, job_category)
+                changes['llm_mode'] = 'local'
+            analysis_text = report_to_markdown(report)
+        else:
+            if use_delta:
+                update = generate_analysis(
+                    build_delta_prompt(previous['analysis_text'], sections, changes, job_category),
+                    budget_seconds=budget_seconds
+                )
+                if update:
+                    analysis_text = merge_reports(previous['analysis_text'], update)
+                    changes['llm_mode'] = 'delta'
+            if not analysis_text and strategy == 'sections':
+                analysis_text, from_model = _analyze_by_section(
+                    text, job_category, structured_data, on_section, budget_seconds
+                )
+                changes['llm_mode'] = 'sections' if from_model else 'local'
+            if not analysis_text:
+                analysis_text = analyze_resume(text, job_category, budget_seconds=budget_seconds)
+                changes['llm_mode'] = 'full'
+            if not analysis_text:
+                analysis_text = mock_analysis(text, job_category)
+                changes['llm_mode'] = 'local'
+
+    # Model calls of a cancelled analysis return None at once, so it gets here
+    # quickly with a local fallback that is not used
+    check('analyze')
+    changes['previous_score'] = previous['score'] if previous else None
+    changes['score'] = total_score
+    changes['previous_components'] = previous['score_components'] if previous else None
+    changes['score_components'] = score_components
+
+    snapshot = {
+        'job_category': job_category,
+        'depth': depth,
+        'page_fingerprints': page_fingerprints,
+        'section_fingerprints': section_fingerprints,
+        'structured_data': structured_data,
+        'score': total_score,
+        'score_components': score_components,
+        'analysis_text': analysis_text,
+        'report': report,
+        'highlights': locate_rewrites(normalized, analysis_text),
+        'signature': signature
+    }
+
+    if tier:
+        elapsed = time.perf_counter() - started
+        metrics.observe('analysis_seconds', elapsed, depth=depth)
+        if elapsed > tier['target_seconds']:
+            metrics.increment('analysis_over_target_total', depth=depth)
+    return snapshot, changes
@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from utils import metrics
+from utils.cancellation import current_token
+
+# Latency budget for one model call, including any hedged request
+LATENCY_BUDGET_SECONDS = float(os.environ.get("LLM_LATENCY_BUDGET_SECONDS", 30))
+# Send a second, hedged request once the first is slower than this
+# percentile of recent successful calls
+HEDGE_ENABLED = os.environ.get("LLM_HEDGE", "1") != "0"
+HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 0.95))
+# Hedging only starts once enough latencies have been observed
+HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+# Circuit breaker: consecutive failures before opening, and how long to stay
+# open before a half-open probe is let through
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", 30))
+MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", 16))
+
+CIRCUIT_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
+class GeminiBackend:
+    """Gemini model accessed through google.generativeai."""
+
+    def __init__(self, model_name="gemini-pro"):
+        self.name = model_name
+        self.model_name = model_name
+
+    def generate(self, prompt):
+        from utils.ai_analysis import get_genai
+        model = get_genai().GenerativeModel(self.model_name)
+        return model.generate_content(prompt).text
+
+    def stream(self, prompt):
+        """
+        Yield the response text as it arrives; closing the generator drops
+        the streaming request
+        """
+        from utils.ai_analysis import get_genai
+        model = get_genai().GenerativeModel(self.model_name)
+        for chunk in model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class CircuitBreaker:
+    """
+    Opens after repeated failures so callers fail fast, then lets a single
+    probe through after the reset timeout; the probe's outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        metrics.set_gauge('llm_circuit_state', 0, backend=name)
+
+    def _transition(self, state):
+        if state != self.state:
+            self.state = state
+            metrics.increment('llm_circuit_transitions_total', backend=self.name, to=state)
+            metrics.set_gauge('llm_circuit_state', CIRCUIT_STATE_VALUES[state], backend=self.name)
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._transition('half_open')
+                self._probe_in_flight = False
+            if self.state == 'half_open':
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+                return True
+            return self.state == 'closed'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._transition('closed')
+
+    def release_probe(self):
+        """
+        End a call without a verdict, e.g. when it was cancelled
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition('open')
+
+
+class LatencyTracker:
+    """Recent successful call latencies, used to decide when to hedge."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def threshold(self, fraction=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            samples = list(self._samples)
+        return metrics.percentile(samples, fraction)
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix="llm")
+_breakers = {}
+_trackers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(backend):
+    with _registry_lock:
+        if backend.name not in _breakers:
+            _breakers[backend.name] = CircuitBreaker(backend.name)
+        return _breakers[backend.name]
+
+
+def get_latency_tracker(backend):
+    with _registry_lock:
+        if backend.name not in _trackers:
+            _trackers[backend.name] = LatencyTracker()
+        return _trackers[backend.name]
+
+
+def _timed_generate(backend, prompt, token=None):
+    started = time.monotonic()
+    if token is None or not hasattr(backend, 'stream'):
+        text = backend.generate(prompt)
+    else:
+        # Streamed so a cancelled request stops between chunks
+        chunks = []
+        stream = backend.stream(prompt)
+        try:
+            for chunk in stream:
+                token.check('llm')
+                chunks.append(chunk)
+        finally:
+            stream.close()
+        text = "".join(chunks)
+    return text, time.monotonic() - started
+
+
+def complete(prompt, backend, budget_seconds=None, hedge=None):
+    """
+    Call a model backend within a latency budget.
+    Returns the response text, or None if the circuit is open, the budget ran
+    out, every request failed or the current analysis was cancelled (see
+    utils.cancellation), so callers can fall back to local analysis
+    immediately.
+    """
+    budget_seconds = LATENCY_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    breaker = get_breaker(backend)
+    tracker = get_latency_tracker(backend)
+    token = current_token()
+
+    if not breaker.allow_request():
+        metrics.increment('llm_requests_total', backend=backend.name, outcome='short_circuited')
+        return None
+
+    started = time.monotonic()
+    deadline = started + budget_seconds
+    hedge_at = tracker.threshold() if hedge else None
+    pending = {_executor.submit(_timed_generate, backend, prompt, token)}
+    hedge_future = None
+
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        timeout = deadline - now
+        if hedge_at is not None and hedge_future is None:
+            timeout = min(timeout, max(0.0, started + hedge_at - now))
+
+        # The token's future completes on cancellation and ends the wait
+        waiting = pending | {token.future} if token is not None else pending
+        done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+        if token is not None and token.cancelled:
+            # Requests not yet started are dropped; streaming ones stop at
+            # their next chunk
+            for future in pending:
+                future.cancel()
+            # A cancelled call says nothing about the backend's health
+            breaker.release_probe()
+            metrics.increment('llm_requests_total', backend=backend.name, outcome='cancelled')
+            return None
+        pending -= done
+        for future in done:
+            if future.exception() is not None:
+                print(f"AI Analysis failed: {future.exception()}")
+                continue
+            text, latency = future.result()
+            tracker.record(latency)
+            breaker.record_success()
+            metrics.observe('llm_latency_seconds', time.monotonic() - started, backend=backend.name)
+            metrics.increment('llm_requests_total', backend=backend.name, outcome='success')
+            if future is hedge_future:
+                metrics.increment('llm_hedge_wins_total', backend=backend.name)
+            return text
+
+        if (pending and hedge_future is None and hedge_at is not None
+                and time.monotonic() >= started + hedge_at):
+            hedge_future = _executor.submit(_timed_generate, backend, prompt, token)
+            pending.add(hedge_future)
+            metrics.increment('llm_hedges_total', backend=backend.name)
+
+    # Requests still running are left to finish in the background; their
+    # results are discarded
+    breaker.record_failure()
+    outcome = 'timeout' if pending else 'error'
+    metrics.increment('llm_requests_total', backend=backend.name, outcome=outcome)
+    return None
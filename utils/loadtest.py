@@ -0,0 +1,192 @@
+"""
+Concurrent load test of one server process against a fake model backend.
+
+    python -m utils.loadtest --sessions 200 --concurrency 1,4,8,16,32
+    python -m utils.loadtest --depths Standard:2,Detailed:5,Comprehensive:1
+
+Each simulated session renders a synthetic resume to PDF, then runs
+extraction, the app's analysis pipeline (analyze_revision, in its own
+session scope, at a depth drawn from the mix) and result parsing.
+Throughput, end-to-end and per-stage latency percentiles and memory are
+reported for every concurrency level, which shows where the process
+saturates.
+"""
+import argparse
+import os
+import random
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+from utils.ai_analysis import DEPTH_TIERS, set_model_backend
+from utils.fake_gemini import FakeGeminiBackend
+from utils.pdf_writer import build_text_pdf, paginate
+from utils.scheduler import FairScheduler, session_scope, set_scheduler
+
+JOB_CATEGORIES = ["Software Engineer", "Data Scientist", "DevOps Engineer", "Product Manager", "Data Analyst"]
+SKILLS = ["Python", "Java", "SQL", "React", "Docker", "Kubernetes", "AWS", "Terraform", "Git",
+          "TensorFlow", "Excel", "Tableau", "Jira", "Leadership", "Communication"]
+ROLES = ["Software Engineer", "Data Scientist", "Backend Developer", "Data Analyst", "DevOps Engineer"]
+
+
+def synthetic_resume(rng, roles=3, bullets=4):
+    """Lines of a plausible resume, deterministic for a given random.Random."""
+    lines = ["Alex Example", "alex@example.com | (555) 123-4567", "", "Summary",
+             "Engineer focused on reliable, data-driven products.", "", "Experience"]
+    year = 2024
+    for _ in range(roles):
+        start = year - rng.randint(1, 4)
+        lines.append(f"{rng.choice(ROLES)} at Company{rng.randint(1, 99)} {start} - {year}")
+        for _ in range(bullets):
+            lines.append(f"- Worked on {rng.choice(SKILLS)} services, improving latency by {rng.randint(5, 60)}%")
+        year = start
+    lines += ["", "Skills", ", ".join(rng.sample(SKILLS, 8)), "", "Projects",
+              "- Built a recommendation engine serving 10,000 users", "", "Education",
+              "Bachelor of Science, State University 2016"]
+    return lines
+
+
+class _Upload:
+    """Minimal stand-in for Streamlit's UploadedFile."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def getvalue(self):
+        return self._data
+
+
+def parse_depth_mix(spec):
+    """
+    {depth: weight} from "Standard:2,Detailed:5,Comprehensive" (weight 1
+    when omitted)
+    """
+    mix = {}
+    for item in spec.split(","):
+        depth, _, weight = item.strip().partition(":")
+        if depth not in DEPTH_TIERS:
+            raise ValueError(f"Unknown analysis depth: {depth}")
+        mix[depth] = float(weight or 1)
+    return mix
+
+
+def run_session(index, seed, depth_mix):
+    from utils.pdf_processor import extract_pages_from_pdf
+    from utils.incremental import analyze_revision
+    from components.results import parse_analysis_into_sections
+
+    rng = random.Random(seed + index)
+    job_category = rng.choice(JOB_CATEGORIES)
+    depth = rng.choices(list(depth_mix), weights=list(depth_mix.values()))[0]
+    data = build_text_pdf(paginate(synthetic_resume(rng, roles=rng.randint(2, 5))))
+    timings = {}
+
+    started = time.perf_counter()
+    pages = extract_pages_from_pdf(_Upload(data))
+    timings['extract'] = time.perf_counter() - started
+
+    stage = time.perf_counter()
+    with session_scope(f"loadtest-{index}"):
+        snapshot, changes = analyze_revision(pages, job_category, depth=depth)
+    # Depths that ask the model fell back if they ended up local
+    fallback = DEPTH_TIERS[depth]['strategy'] != 'local' and changes['llm_mode'] == 'local'
+    timings['analyze'] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    parse_analysis_into_sections(snapshot['analysis_text'])
+    timings['parse'] = time.perf_counter() - stage
+
+    timings['total'] = time.perf_counter() - started
+    return timings, fallback, depth
+
+
+def run_level(concurrency, sessions, seed, depth_mix, trace_memory):
+    metrics.reset()
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: run_session(i, seed, depth_mix), range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'concurrency': concurrency,
+        'throughput': sessions / elapsed,
+        'fallbacks': sum(1 for _, fallback, _ in results if fallback),
+    }
+    for stage in ('total', 'extract', 'analyze', 'parse'):
+        samples = [timings[stage] for timings, _, _ in results]
+        for fraction in (0.50, 0.95, 0.99):
+            report[f'{stage}_p{int(fraction * 100)}'] = metrics.percentile(samples, fraction)
+    report['analyze_p95_by_depth'] = {
+        depth: metrics.percentile([timings['analyze'] for timings, _, ran in results if ran == depth], 0.95)
+        for depth in depth_mix
+    }
+
+    # ru_maxrss is in kilobytes on Linux
+    report['rss_growth_mb'] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report['peak_mb_per_session'] = peak / 1024 / 1024 / concurrency
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100, help="sessions per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,8,16", help="comma separated concurrency levels")
+    parser.add_argument("--latency", default="lognormal:0.8:0.4", help="fake model latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--endpoint", help="use the real client against a fake server at this URL instead")
+    parser.add_argument("--trace-memory", action="store_true", help="measure Python allocations (slower)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--rpm", type=int, default=0, help="global model requests per minute (0: unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="global model tokens per minute (0: unlimited)")
+    parser.add_argument("--depths", default="Comprehensive",
+                        help="analysis depths with optional weights, e.g. Standard:2,Detailed:5,Comprehensive:1")
+    args = parser.parse_args()
+    depth_mix = parse_depth_mix(args.depths)
+
+    if args.endpoint:
+        os.environ["GEMINI_API_ENDPOINT"] = args.endpoint
+        from utils.llm_client import GeminiBackend
+        backend = GeminiBackend("gemini-pro")
+    else:
+        backend = FakeGeminiBackend(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+
+    # Load tests measure the process, not the model quota, unless asked to
+    set_scheduler(FairScheduler(rpm=args.rpm, tpm=args.tpm))
+
+    # Start PDF workers and import every stage once before measuring
+    set_model_backend(FakeGeminiBackend(latency=0, name="warm-up"))
+    for depth in depth_mix:
+        run_session(-1, args.seed, {depth: 1})
+    # Every model tier gets the backend under test
+    set_model_backend(backend)
+
+    header = f"{'conc':>5}{'sess/s':>9}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'extract p95':>13}{'analyze p95':>13}{'parse p95':>11}{'fallback':>10}{'rss +MB':>9}"
+    if args.trace_memory:
+        header += f"{'MB/sess':>9}"
+    print(header)
+    for level in (int(value) for value in args.concurrency.split(",")):
+        r = run_level(level, args.sessions, args.seed, depth_mix, args.trace_memory)
+        line = (
+            f"{level:>5}{r['throughput']:>9.2f}{r['total_p50']:>8.2f}{r['total_p95']:>8.2f}{r['total_p99']:>8.2f}"
+            f"{r['extract_p95']:>13.3f}{r['analyze_p95']:>13.3f}{r['parse_p95']:>11.4f}{r['fallbacks']:>10}{r['rss_growth_mb']:>9.1f}"
+        )
+        if args.trace_memory:
+            line += f"{r['peak_mb_per_session']:>9.2f}"
+        print(line)
+        if len(depth_mix) > 1:
+            print("      analyze p95 by depth: " + ", ".join(
+                f"{depth} {p95:.3f}s" for depth, p95 in r['analyze_p95_by_depth'].items() if p95 is not None
+            ))
+
+
+if __name__ == "__main__":
+    main()
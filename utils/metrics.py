@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Recent observations kept per histogram for percentile estimates
+HISTOGRAM_WINDOW = 1000
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+
+
+def increment(name, value=1, **labels):
+    """Add to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to its current value."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    """Record one observation (e.g. a latency in seconds) in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        samples = _histograms.get(key)
+        if samples is None:
+            samples = _histograms[key] = deque(maxlen=HISTOGRAM_WINDOW)
+        samples.append(value)
+
+
+@contextmanager
+def thread_cpu(name, **labels):
+    """Record the CPU time the current thread spends in the block in a histogram."""
+    started = time.thread_time()
+    try:
+        yield
+    finally:
+        observe(name, time.thread_time() - started, **labels)
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sequence, or None if it is empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def get_counter(name, **labels):
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def get_gauge(name, default=None, **labels):
+    with _lock:
+        return _gauges.get(_key(name, labels), default)
+
+
+def snapshot(prefixes=None):
+    """
+    Current value of every metric, or of those whose names start with one
+    of prefixes; histograms are summarised as count, p50, p95 and p99 over
+    the recent window.
+    """
+    def wanted(key):
+        return prefixes is None or key.startswith(tuple(prefixes))
+
+    with _lock:
+        histograms = {key: list(samples) for key, samples in _histograms.items() if wanted(key)}
+        result = {
+            'counters': {key: value for key, value in _counters.items() if wanted(key)},
+            'gauges': {key: value for key, value in _gauges.items() if wanted(key)},
+        }
+    result['histograms'] = {
+        key: {
+            'count': len(samples),
+            'p50': percentile(samples, 0.50),
+            'p95': percentile(samples, 0.95),
+            'p99': percentile(samples, 0.99),
+        }
+        for key, samples in histograms.items()
+    }
+    return result
+
+
+def _exposition_key(key, extra=None):
+    # name{a=b} -> name{a="b"}
+    name, _, labels = key.partition('{')
+    pairs = [pair.split('=', 1) for pair in labels.rstrip('}').split(',') if pair]
+    pairs += extra or []
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in pairs) + "}"
+
+
+def export_text(prefixes=None):
+    """
+    snapshot() in the Prometheus text format, one sample per line;
+    histograms become a _count and their quantiles
+    """
+    current = snapshot(prefixes)
+    lines = []
+    for key, value in sorted({**current['counters'], **current['gauges']}.items()):
+        if value is not None:
+            lines.append(f"{_exposition_key(key)} {value}")
+    for key, summary in sorted(current['histograms'].items()):
+        name, brace, labels = key.partition('{')
+        lines.append(f"{_exposition_key(name + '_count' + brace + labels)} {summary['count']}")
+        for quantile, fraction in (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99')):
+            if summary[quantile] is not None:
+                lines.append(f"{_exposition_key(key, [('quantile', fraction)])} {summary[quantile]}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Clear every metric (used by benchmarks between runs)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
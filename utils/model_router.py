@@ -0,0 +1,193 @@
+"""
+Routing of model calls to model tiers by resume complexity and depth.
+
+Two tiers are configured: "fast" (LLM_FAST_MODEL) for most resumes and
+"strong" (LLM_STRONG_MODEL) for long or dense ones. Each analysis is
+routed once, from local features it already has: estimated tokens,
+section count, skill count and the requested depth. The complexity of a
+resume is the largest of its features relative to ROUTER_REFERENCE; it
+goes to the strong tier at or above the threshold of its depth. The full
+report of Comprehensive gets a lower threshold than the short narrative
+of Detailed.
+
+Routing then follows what is observed per tier:
+- The fast tier is skipped while the share of its responses that could
+  be used (valid JSON, non-empty sections) is below ROUTER_MIN_QUALITY
+  over the last ROUTER_WINDOW_SECONDS.
+- A tier whose circuit is open is swapped for the other one.
+- So is a tier whose p95 latency exceeds the analysis budget while the
+  other's does not.
+
+The route is current for the analysis and the worker threads given its
+context; get_model_backend() in utils.ai_analysis returns the backend of
+its tier. LLM_BACKEND=fake gives each tier its own fake backend (see
+utils.fake_gemini).
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils import metrics
+
+ROUTER_ENABLED = os.environ.get("LLM_ROUTER", "1") != "0"
+MODEL_TIERS = {
+    'fast': os.environ.get("LLM_FAST_MODEL", "gemini-1.5-flash"),
+    'strong': os.environ.get("LLM_STRONG_MODEL", "gemini-pro"),
+}
+# Tier of calls made outside a routed analysis, or with routing disabled
+DEFAULT_TIER = 'strong'
+
+# Feature values at which a resume counts as complex (complexity 1.0)
+ROUTER_REFERENCE = {
+    'tokens': int(os.environ.get("ROUTER_REFERENCE_TOKENS", 4000)),
+    'sections': int(os.environ.get("ROUTER_REFERENCE_SECTIONS", 12)),
+    'skills': int(os.environ.get("ROUTER_REFERENCE_SKILLS", 40)),
+}
+# Complexity from which each depth goes to the strong tier; analyses
+# without a depth ask for the full report like Comprehensive
+DEPTH_THRESHOLDS = {
+    'Detailed': float(os.environ.get("ROUTER_DETAILED_THRESHOLD", 1.0)),
+    'Comprehensive': float(os.environ.get("ROUTER_COMPREHENSIVE_THRESHOLD", 0.6)),
+    None: float(os.environ.get("ROUTER_COMPREHENSIVE_THRESHOLD", 0.6)),
+}
+ROUTER_MIN_QUALITY = float(os.environ.get("ROUTER_MIN_QUALITY", 0.8))
+ROUTER_WINDOW_SECONDS = float(os.environ.get("ROUTER_WINDOW_SECONDS", 600))
+# Observations needed before quality or latency change a route
+ROUTER_MIN_SAMPLES = int(os.environ.get("ROUTER_MIN_SAMPLES", 20))
+
+
+class QualityTracker:
+    """Usable share of one tier's recent responses."""
+
+    def __init__(self, window_seconds=ROUTER_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._outcomes = deque()
+        self._lock = threading.Lock()
+
+    def record(self, usable):
+        now = time.monotonic()
+        with self._lock:
+            self._outcomes.append((now, usable))
+            self._prune(now)
+
+    def _prune(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def quality(self, min_samples=ROUTER_MIN_SAMPLES):
+        """
+        Share of usable responses, or None with too few of them to tell
+        """
+        with self._lock:
+            self._prune(time.monotonic())
+            if len(self._outcomes) < min_samples:
+                return None
+            return sum(1 for _, usable in self._outcomes if usable) / len(self._outcomes)
+
+
+_quality = {tier: QualityTracker() for tier in MODEL_TIERS}
+_route = ContextVar('model_route', default=None)
+
+
+def resume_features(text, section_count, structured_data):
+    return {
+        # Roughly four characters per token for English text
+        'tokens': len(text) // 4,
+        'sections': section_count,
+        'skills': sum(len(found) for found in structured_data['skills'].values()),
+    }
+
+
+def complexity(features):
+    return max(features[name] / reference for name, reference in ROUTER_REFERENCE.items())
+
+
+def _other(tier):
+    return 'fast' if tier == 'strong' else 'strong'
+
+
+def _unavailable(tier):
+    from utils.ai_analysis import get_model_backend
+    from utils.llm_client import get_breaker
+
+    backend = get_model_backend(tier)
+    return backend is None or get_breaker(backend).state == 'open'
+
+
+def _too_slow(tier, budget_seconds):
+    from utils.ai_analysis import get_model_backend
+    from utils.llm_client import get_latency_tracker
+
+    backend = get_model_backend(tier)
+    if backend is None:
+        return False
+    p95 = get_latency_tracker(backend).threshold(0.95, ROUTER_MIN_SAMPLES)
+    return p95 is not None and p95 > budget_seconds
+
+
+def choose_tier(features, depth=None, budget_seconds=None):
+    """
+    (tier, reason) for an analysis with these features and depth
+    """
+    if not ROUTER_ENABLED:
+        return DEFAULT_TIER, 'disabled'
+    if complexity(features) >= DEPTH_THRESHOLDS.get(depth, DEPTH_THRESHOLDS[None]):
+        tier, reason = 'strong', 'complex'
+    else:
+        tier, reason = 'fast', 'simple'
+
+    quality = _quality['fast'].quality()
+    if tier == 'fast' and quality is not None and quality < ROUTER_MIN_QUALITY:
+        tier, reason = 'strong', 'fast_quality'
+    if _unavailable(tier) and not _unavailable(_other(tier)):
+        tier, reason = _other(tier), 'circuit_open'
+    elif budget_seconds and _too_slow(tier, budget_seconds) and not _too_slow(_other(tier), budget_seconds):
+        tier, reason = _other(tier), 'latency'
+    return tier, reason
+
+
+def route_analysis(text, section_count, structured_data, depth=None, budget_seconds=None):
+    """
+    Pick the tier for an analysis and count the decision.
+    Returns {'tier', 'reason', 'complexity'}.
+    """
+    features = resume_features(text, section_count, structured_data)
+    tier, reason = choose_tier(features, depth, budget_seconds)
+    metrics.increment('llm_routes_total', tier=tier, reason=reason, depth=depth)
+    metrics.observe('resume_complexity', complexity(features))
+    return {'tier': tier, 'reason': reason, 'complexity': round(complexity(features), 2)}
+
+
+@contextmanager
+def use_route(route):
+    """
+    Send the model calls made in this block (including those submitted to
+    thread pools with the context copied) to the route's tier
+    """
+    token = _route.set(route)
+    try:
+        yield route
+    finally:
+        _route.reset(token)
+
+
+def current_tier():
+    route = _route.get()
+    return route['tier'] if route else DEFAULT_TIER
+
+
+def record_response(usable):
+    """
+    Record whether a model response of the current route could be used
+    """
+    route = _route.get()
+    if route is None:
+        return
+    tracker = _quality[route['tier']]
+    tracker.record(usable)
+    quality = tracker.quality(min_samples=1)
+    metrics.increment('llm_responses_total', tier=route['tier'], usable=usable)
+    metrics.set_gauge('llm_tier_quality', quality, tier=route['tier'])
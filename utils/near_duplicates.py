@@ -0,0 +1,350 @@
+"""
+Near-duplicate detection across every analyzed resume.
+
+    python -m utils.near_duplicates --bench 1000000    lookup latency and memory at 1M resumes
+
+Each resume gets a MinHash signature over its word shingles: NUM_PERM
+minimum hash values, of which only the low 16 bits are kept (b-bit
+MinHash), so a signature takes 128 bytes. Signatures live in one flat
+array. The locality-sensitive hashing index splits each signature into
+BANDS bands of ROWS values; resumes sharing any band are candidates, and
+candidates are ranked by the share of equal signature values, which
+estimates their Jaccard similarity. Each band table is a sorted array of
+(band hash << 32 | position) searched with bisect, plus a dict of recent
+additions that is merged in once it grows, so the index needs about 8
+bytes per resume and band instead of a dict entry. Removed resumes are
+skipped by queries until enough of them have piled up for the arrays to be
+rewritten without them.
+
+Signatures are stored with the analyses in the history database (see
+utils.history) and the index is rebuilt from there in the background when
+the process starts.
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from utils import metrics
+
+# Estimated Jaccard similarity above which an upload counts as a near duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.8))
+# Whose analyses may be reused: "user" (the uploader's own) or "all". With
+# "all", reports of other users' resumes (including their rewritten lines)
+# are shown to whoever uploads a near copy
+NEAR_DUPLICATE_SCOPE = os.environ.get("NEAR_DUPLICATE_SCOPE", "user")
+
+SHINGLE_WORDS = 5
+# 16 bands of 4 rows: pairs at 0.8 similarity become candidates 99.9% of the
+# time, pairs at 0.3 about 12% of the time (and are then rejected)
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+# Band additions kept in a dict before they are merged into the sorted
+# arrays: this many, or an eighth of the index if that is more
+MERGE_THRESHOLD = 4096
+
+MERSENNE_PRIME = (1 << 61) - 1
+# Fixed, so signatures stay comparable across processes and releases
+_rng = random.Random(20240611)
+PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)
+]
+
+WORD = re.compile(r'\w+')
+
+
+def shingles(text):
+    """
+    Hashes of the overlapping SHINGLE_WORDS-word sequences of a text,
+    compared case-insensitively
+    """
+    words = WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        words += [''] * (SHINGLE_WORDS - len(words))
+    hashes = set()
+    for i in range(len(words) - SHINGLE_WORDS + 1):
+        digest = hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode('utf-8'), digest_size=8).digest()
+        hashes.add(int.from_bytes(digest, 'little') % MERSENNE_PRIME)
+    return hashes
+
+
+def minhash(text):
+    """
+    MinHash signature of a text: NUM_PERM 16-bit values as an array('H')
+    """
+    hashes = shingles(text)
+    return array('H', (
+        min([(a * x + b) % MERSENNE_PRIME for x in hashes]) & 0xFFFF
+        for a, b in PERMUTATIONS
+    ))
+
+
+def similarity(first, second):
+    """
+    Estimated Jaccard similarity of two signatures
+    """
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def _band_keys(signature):
+    keys = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        keys.append(int.from_bytes(hashlib.blake2b(values, digest_size=4).digest(), 'little'))
+    return keys
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index from signatures to the keys they were added with
+    (history analysis ids)
+    """
+
+    def __init__(self):
+        self._signatures = array('H')
+        self._keys = array('q')
+        self._bands = [array('Q') for _ in range(BANDS)]
+        self._recent = [{} for _ in range(BANDS)]
+        self._recent_count = 0
+        # Positions of removed signatures, still in the arrays
+        self._removed = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys) - len(self._removed)
+
+    def memory_bytes(self):
+        arrays = [self._signatures, self._keys] + self._bands
+        return sum(values.itemsize * len(values) for values in arrays)
+
+    def add(self, key, signature):
+        with self._lock:
+            position = len(self._keys)
+            self._keys.append(key)
+            self._signatures.extend(signature)
+            for band, band_key in enumerate(_band_keys(signature)):
+                self._recent[band].setdefault(band_key, []).append(position)
+            self._recent_count += 1
+            if self._recent_count >= max(MERGE_THRESHOLD, len(self._keys) // 8):
+                self._merge()
+        metrics.set_gauge('near_duplicate_index_size', len(self))
+
+    def remove(self, keys):
+        """
+        Stop returning the signatures added with these keys
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        with self._lock:
+            self._removed.update(position for position, key in enumerate(self._keys) if key in keys)
+            if len(self._removed) >= max(MERGE_THRESHOLD, len(self._keys) // 8):
+                self._drop_removed()
+        metrics.set_gauge('near_duplicate_index_size', len(self))
+
+    def _drop_removed(self):
+        # Renumber the positions that are kept; their order, and so the
+        # order of the band tables, stays the same
+        self._merge()
+        renumbered = array('q')
+        keys = array('q')
+        signatures = array('H')
+        for position, key in enumerate(self._keys):
+            if position in self._removed:
+                renumbered.append(-1)
+                continue
+            renumbered.append(len(keys))
+            keys.append(key)
+            signatures.extend(self._signatures[position * NUM_PERM:(position + 1) * NUM_PERM])
+        for band, table in enumerate(self._bands):
+            self._bands[band] = array('Q', (
+                entry >> 32 << 32 | renumbered[entry & 0xFFFFFFFF]
+                for entry in table if renumbered[entry & 0xFFFFFFFF] >= 0
+            ))
+        self._keys = keys
+        self._signatures = signatures
+        self._removed = set()
+
+    def load(self, items):
+        """
+        Add many (key, signature) pairs at once, sorting each band table once
+        """
+        with self._lock:
+            added = [[] for _ in range(BANDS)]
+            for key, signature in items:
+                position = len(self._keys)
+                self._keys.append(key)
+                self._signatures.extend(signature)
+                for band, band_key in enumerate(_band_keys(signature)):
+                    added[band].append(band_key << 32 | position)
+            for band, entries in enumerate(added):
+                entries.extend(self._bands[band])
+                entries.sort()
+                self._bands[band] = array('Q', entries)
+        metrics.set_gauge('near_duplicate_index_size', len(self))
+
+    def _merge(self):
+        for band, recent in enumerate(self._recent):
+            merged = [band_key << 32 | position for band_key, positions in recent.items() for position in positions]
+            merged.extend(self._bands[band])
+            merged.sort()
+            self._bands[band] = array('Q', merged)
+            recent.clear()
+        self._recent_count = 0
+
+    def _candidates(self, signature):
+        found = set()
+        for band, band_key in enumerate(_band_keys(signature)):
+            table = self._bands[band]
+            i = bisect_left(table, band_key << 32)
+            while i < len(table) and table[i] >> 32 == band_key:
+                found.add(table[i] & 0xFFFFFFFF)
+                i += 1
+            found.update(self._recent[band].get(band_key, ()))
+        return found
+
+    def query(self, signature, threshold=None):
+        """
+        [(key, similarity)] of indexed signatures at or above the threshold,
+        most similar first
+        """
+        threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        with self._lock:
+            matches = []
+            for position in self._candidates(signature) - self._removed:
+                start = position * NUM_PERM
+                score = similarity(signature, self._signatures[start:start + NUM_PERM])
+                if score >= threshold:
+                    matches.append((self._keys[position], score))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+
+_index = NearDuplicateIndex()
+_loaded = threading.Event()
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def _load():
+    from utils.history import iter_signatures
+
+    started = time.perf_counter()
+    try:
+        _index.load((analysis_id, array('H', signature)) for analysis_id, signature in iter_signatures())
+    except Exception as e:
+        print(f"Loading near-duplicate index failed: {e}")
+    finally:
+        _loaded.set()
+    metrics.observe('near_duplicate_index_load_seconds', time.perf_counter() - started)
+
+
+def get_index():
+    """
+    The process-wide index; it is filled from the history database in the
+    background on first use and answers only once that is done
+    """
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = threading.Thread(target=_load, name="near-duplicate-index", daemon=True)
+            _loader.start()
+    return _index
+
+
+def index_analysis(analysis_id, signature):
+    """
+    Add a stored analysis to the index (called by the history writer)
+    """
+    get_index().add(analysis_id, signature)
+
+
+def unindex_analyses(analysis_ids):
+    """
+    Remove deleted analyses from the index (called by history compaction)
+    """
+    get_index().remove(analysis_ids)
+
+
+def find_near_duplicate(signature, job_category, depth, user_id):
+    """
+    The most similar earlier analysis for the same role and depth that may be
+    reused for this user: {'analysis_id', 'similarity', 'snapshot'}, or None.
+    Near duplicates that cannot be reused are only counted.
+    """
+    from utils.history import load_reusable_analysis
+
+    index = get_index()
+    if not _loaded.is_set():
+        metrics.increment('near_duplicate_lookups_total', outcome='loading')
+        return None
+
+    started = time.perf_counter()
+    matches = index.query(signature)
+    metrics.observe('near_duplicate_lookup_seconds', time.perf_counter() - started)
+    if not matches:
+        metrics.increment('near_duplicate_lookups_total', outcome='unique')
+        return None
+
+    owner = user_id if NEAR_DUPLICATE_SCOPE == 'user' else None
+    for analysis_id, score in matches:
+        snapshot = load_reusable_analysis(analysis_id, job_category, depth, owner)
+        if snapshot:
+            metrics.increment('near_duplicate_lookups_total', outcome='reused')
+            return {'analysis_id': analysis_id, 'similarity': score, 'snapshot': snapshot}
+    metrics.increment('near_duplicate_lookups_total', outcome='flagged')
+    return {'analysis_id': matches[0][0], 'similarity': matches[0][1], 'snapshot': None}
+
+
+def bench(size, queries=1000):
+    """
+    Fill an index with `size` random signatures plus near copies of a few
+    resumes and time lookups; returns (median ms, p99 ms, MB used)
+    """
+    rng = random.Random(1)
+    base = [" ".join(rng.choice(WORDS) for _ in range(400)) for _ in range(queries)]
+    index = NearDuplicateIndex()
+    index.load((key, array('H', rng.randbytes(NUM_PERM * 2))) for key in range(size - queries))
+    for key, text in enumerate(base):
+        index.add(size - queries + key, minhash(text))
+    memory = index.memory_bytes() / (1024 * 1024)
+
+    timings = []
+    for text in base:
+        words = text.split()
+        words[rng.randrange(len(words))] = "edited"
+        signature = minhash(" ".join(words))
+        started = time.perf_counter()
+        assert index.query(signature)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], memory
+
+
+WORDS = (
+    "developed designed led built managed improved reduced increased python java sql aws kubernetes "
+    "react team customers pipeline platform service latency revenue data analysis project stakeholders "
+    "migration testing deployment automation reporting dashboards api mobile cloud security"
+).split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bench", type=int, metavar="SIZE", help="benchmark an index of SIZE resumes")
+    args = parser.parse_args()
+
+    if args.bench:
+        median, p99, memory = bench(args.bench)
+        print(f"{args.bench} resumes: lookup p50 {median:.3f} ms, p99 {p99:.3f} ms, index {memory:.0f} MB")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
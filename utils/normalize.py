@@ -0,0 +1,158 @@
+"""
+Normalization of extracted PDF text, with a map back to page positions.
+
+Characters replaced one for one (unusual spaces, curly quotes, bullet and
+hyphen variants) go through a single str.translate() per page, which keeps
+offsets unchanged. Everything that changes the length (ligatures, soft
+hyphens and zero-width characters, hyphenated line wraps, runs of spaces,
+trailing spaces, carriage returns and extra blank lines) is found by one
+regex scan per page. The scan records a breakpoint wherever the
+normalized text and the page text stop advancing together, so the offset
+map holds a few parallel arrays instead of one entry per character.
+"""
+import re
+from array import array
+from bisect import bisect_right
+
+# Same-length replacements: offsets are unaffected. Tabs are kept: they are
+# layout that detect_resume_risks() looks for
+ONE_TO_ONE = str.maketrans({
+    '\u00a0': ' ', '\u2000': ' ', '\u2001': ' ', '\u2002': ' ', '\u2003': ' ', '\u2004': ' ',
+    '\u2005': ' ', '\u2006': ' ', '\u2007': ' ', '\u2008': ' ', '\u2009': ' ', '\u200a': ' ',
+    '\u202f': ' ', '\u205f': ' ', '\u3000': ' ', '\x0c': '\n', '\x0b': '\n',
+    '‘': "'", '’': "'", '‚': "'", '‛': "'", '′': "'",
+    '“': '"', '”': '"', '„': '"', '″': '"',
+    '\u2010': '-', '\u2011': '-', '\u2212': '-',
+    '●': '•', '■': '•', '‣': '•', '∙': '•', '⁃': '•',
+})
+
+# Replacements that change the length, applied to single matched characters
+EXPANSIONS = {
+    'ﬀ': 'ff', 'ﬁ': 'fi', 'ﬂ': 'fl', 'ﬃ': 'ffi', 'ﬄ': 'ffl', 'ﬅ': 'st', 'ﬆ': 'st', '…': '...',
+    # Soft hyphen, zero-width spaces and joiners, word joiner, byte order mark
+    '\u00ad': '', '\u200b': '', '\u200c': '', '\u200d': '', '\u2060': '', '\ufeff': '',
+}
+EXPANSION_TABLE = str.maketrans(EXPANSIONS)
+
+EDITS = re.compile(
+    r'(?P<cr>\r\n?)'
+    r'|(?P<wrap>(?<=[a-z])-\n(?=[a-z]))'
+    r'|(?P<blank>\n(?:[ ]*\n){2,})'
+    r'|(?P<trail>[ \t]+(?=\n|$))'
+    r'|(?P<space>[ ]{2,})'
+    r'|(?P<char>[' + re.escape(''.join(EXPANSIONS)) + r'])'
+)
+
+REPLACEMENTS = {'cr': '\n', 'wrap': '', 'blank': '\n\n', 'trail': '', 'space': ' '}
+
+PAGE_SEPARATOR = "\n\n"
+
+
+class NormalizedText:
+    """
+    Normalized resume text and the map from its offsets to (page, offset in
+    the page text as extracted)
+    """
+    __slots__ = ('text', '_starts', '_pages', '_sources', '_literal', '_lead')
+
+    def __init__(self, text, starts, pages, sources, literal, lead):
+        self.text = text
+        # Breakpoint i: from normalized offset _starts[i], text comes from page
+        # _pages[i] at _sources[i]; literal runs advance with it, replacements
+        # all map to where the replaced text began
+        self._starts = starts
+        self._pages = pages
+        self._sources = sources
+        self._literal = literal
+        # Characters stripped from the front of the joined text
+        self._lead = lead
+
+    def position(self, offset):
+        """
+        (page index, offset in that page's extracted text) of a normalized offset
+        """
+        offset += self._lead
+        index = bisect_right(self._starts, offset) - 1
+        source = self._sources[index]
+        if self._literal[index]:
+            source += offset - self._starts[index]
+        return self._pages[index], source
+
+    def page_of(self, offset):
+        return self.position(offset)[0]
+
+    def locate(self, fragment, min_chars=20):
+        """
+        (page index, offset) where a fragment of the normalized text starts,
+        or None; long fragments are matched on their first 60 characters
+        """
+        fragment = fragment.strip()
+        if len(fragment) < min_chars:
+            return None
+        start = self.text.find(fragment[:60])
+        return self.position(start) if start != -1 else None
+
+
+def _normalize_page(page_text, page_index, parts, starts, pages, sources, literal, length, base=0):
+    # base: where page_text begins in the page text as extracted
+    page_text = page_text.translate(ONE_TO_ONE)
+    position = 0
+    for match in EDITS.finditer(page_text):
+        if match.start() > position:
+            parts.append(page_text[position:match.start()])
+            starts.append(length)
+            pages.append(page_index)
+            sources.append(base + position)
+            literal.append(1)
+            length += match.start() - position
+        kind = match.lastgroup
+        replacement = match.group().translate(EXPANSION_TABLE) if kind == 'char' else REPLACEMENTS[kind]
+        if replacement:
+            parts.append(replacement)
+            starts.append(length)
+            pages.append(page_index)
+            sources.append(base + match.start())
+            literal.append(0)
+            length += len(replacement)
+        position = match.end()
+    if position < len(page_text):
+        parts.append(page_text[position:])
+        starts.append(length)
+        pages.append(page_index)
+        sources.append(base + position)
+        literal.append(1)
+        length += len(page_text) - position
+    return length
+
+
+def normalize_pages(pages):
+    """
+    Normalize page texts and join them like join_pages(): non-empty pages
+    separated by blank lines, surrounding whitespace stripped.
+    Returns a NormalizedText, or None if no page has text.
+    """
+    parts = []
+    starts, pages_index, sources = array('l'), array('H'), array('l')
+    literal = bytearray()
+    length = 0
+    for page_index, page_text in enumerate(pages):
+        # Whitespace around a page would add to the separator's blank line
+        body = (page_text or '').strip()
+        if not body:
+            continue
+        base = page_text.index(body)
+        length = _normalize_page(body, page_index, parts, starts, pages_index, sources, literal, length, base)
+        # The separator maps to the end of its page's text
+        parts.append(PAGE_SEPARATOR)
+        starts.append(length)
+        pages_index.append(page_index)
+        sources.append(base + len(body))
+        literal.append(0)
+        length += len(PAGE_SEPARATOR)
+
+    joined = "".join(parts)
+    text = joined.strip()
+    if not text:
+        return None
+    lead = len(joined) - len(joined.lstrip())
+    return NormalizedText(text, starts, pages_index, sources, literal, lead)
@@ -1,30 +1,37 @@
-import io
 import re
-from pypdf import PdfReader
-import streamlit as st
+from utils.pdf_worker import (
+    extract_pages, PdfProcessingError, PdfTooLargeError, PdfTooManyPagesError,
+    InvalidPdfError, PdfTimeoutError, PdfWorkerError
+)
+from utils.timeline import parse_experience
+from utils.normalize import normalize_pages
+
+
+def extract_pages_from_pdf(uploaded_file):
+    """
+    Extract the text of every page of an uploaded PDF file.
+    Parsing runs in a sandboxed worker process; returns a list with one string
+    per page (empty for pages without text) and raises a PdfProcessingError
+    subclass if the file is rejected or cannot be read.
+    """
+    return extract_pages(uploaded_file.getvalue())
+
+
+def join_pages(pages):
+    """
+    Join page texts into the normalized resume text (see utils.normalize),
+    or None if no page has text.
+    """
+    normalized = normalize_pages(pages)
+    return normalized.text if normalized else None
 
 
 def extract_text_from_pdf(uploaded_file):
     """
-    Extract text from an uploaded PDF file with error handling.
+    Extract text from an uploaded PDF file.
+    Raises a PdfProcessingError subclass if the file cannot be read.
     """
-    try:
-        pdf_reader = PdfReader(io.BytesIO(uploaded_file.read()))
-        text = ""
-        
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n\n"
-        
-        if not text.strip():
-            return None
-            
-        return text.strip()
-        
-    except Exception as e:
-        st.error(f"❌ Error reading PDF: {str(e)}")
-        return None
+    return join_pages(extract_pages_from_pdf(uploaded_file))
 
 
 def extract_structured_data(text):
@@ -35,7 +42,49 @@ def extract_structured_data(text):
     - Projects (problem -> action -> result)
     - Education & certifications
     """
-    # Extract sections based on common headings
+    sections = extract_section_slices(text)
+    contact_info = extract_contact_info(text)
+    
+    # Extract skills specifically
+    skills = extract_skills(text)
+    
+    # Extract experience details
+    experience_details = extract_experience(text)
+    
+    # Extract projects
+    projects = extract_projects(text)
+    
+    # Extract education
+    education = extract_education(text)
+    
+    structured_data = {
+        'raw_text': text,
+        'contact_info': contact_info,
+        'skills': skills,
+        'experience': experience_details,
+        'projects': projects,
+        'education': education,
+        'sections': sections
+    }
+    
+    return structured_data
+
+
+# Heading lines recognised by split_sections(), keyed by canonical block name
+SECTION_HEADINGS = {
+    'summary': ('summary', 'professional summary', 'profile', 'objective', 'about me'),
+    'experience': ('experience', 'work experience', 'professional experience', 'employment', 'work history'),
+    'skills': ('skills', 'technical skills', 'technologies', 'competencies', 'core competencies'),
+    'projects': ('projects', 'personal projects', 'portfolio'),
+    'education': ('education', 'academic background', 'qualifications'),
+    'certifications': ('certifications', 'certificates', 'credentials', 'licenses'),
+}
+
+
+def extract_section_slices(text):
+    """
+    Extract the text slices that follow each common section heading
+    """
     sections = {}
     
     # Define section patterns
@@ -84,12 +133,18 @@ def extract_structured_data(text):
         
         sections[section] = extracted
     
-    # Extract contact info
+    return sections
+
+
+def extract_contact_info(text):
+    """
+    Extract contact details: email, phone, LinkedIn and GitHub
+    """
     contact_patterns = {
         'email': r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',
-        'phone': r'(\\+\\d{1,3}[\\s-]?)?\\(?\\d{3}\\)?[\\s.-]?\\d{3}[\\s.-]?\\d{4}',
-        'linkedin': r'linkedin\\.com\\/in\\/[a-zA-Z0-9-]+',
-        'github': r'github\\.com\\/[a-zA-Z0-9-]+'
+        'phone': r'(\+\d{1,3}[\s-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}',
+        'linkedin': r'linkedin\.com\/in\/[a-zA-Z0-9-]+',
+        'github': r'github\.com\/[a-zA-Z0-9-]+'
     }
     
     contact_info = {}
@@ -97,29 +152,41 @@ def extract_structured_data(text):
         matches = re.findall(pattern, text, re.IGNORECASE)
         contact_info[key] = matches if matches else None
     
-    # Extract skills specifically
-    skills = extract_skills(text)
+    return contact_info
+
+
+def split_sections(text):
+    """
+    Split resume text into consecutive (name, text) blocks at heading lines.
+    The text before the first heading is returned as the 'header' block, and
+    repeated headings get a numeric suffix so every block name is unique.
+    """
+    heading_lookup = {}
+    for name, headings in SECTION_HEADINGS.items():
+        for heading in headings:
+            heading_lookup[heading] = name
     
-    # Extract experience details
-    experience_details = extract_experience(text)
+    blocks = []
+    current_name = 'header'
+    current_lines = []
+    seen = {}
     
-    # Extract projects
-    projects = extract_projects(text)
+    for line in text.split('\n'):
+        key = line.strip().rstrip(':').lower()
+        name = heading_lookup.get(key) if len(key) <= 40 else None
+        if name:
+            if current_lines:
+                blocks.append((current_name, '\n'.join(current_lines).strip()))
+            seen[name] = seen.get(name, 0) + 1
+            current_name = name if seen[name] == 1 else f"{name}#{seen[name]}"
+            current_lines = [line]
+        else:
+            current_lines.append(line)
     
-    # Extract education
-    education = extract_education(text)
-    
-    structured_data = {
-        'raw_text': text,
-        'contact_info': contact_info,
-        'skills': skills,
-        'experience': experience_details,
-        'projects': projects,
-        'education': education,
-        'sections': sections
-    }
+    if current_lines:
+        blocks.append((current_name, '\n'.join(current_lines).strip()))
     
-    return structured_data
+    return [(name, block) for name, block in blocks if block]
 
 
 def extract_skills(text):
@@ -154,7 +221,7 @@ def extract_skills(text):
     
     for category, keywords in skill_keywords.items():
         for keyword in keywords:
-            if re.search(r'\\b' + re.escape(keyword) + r'\\b', text_lower, re.IGNORECASE):
+            if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower, re.IGNORECASE):
                 if category == 'programming_languages' or category == 'technologies_frameworks':
                     if keyword not in found_skills['technical']:
                         found_skills['technical'].append(keyword)
@@ -170,51 +237,10 @@ def extract_skills(text):
 
 def extract_experience(text):
     """
-    Extract experience details: role, duration, impact
+    Extract experience details: role, company, dates, duration, impact
+    (see utils.timeline)
     """
-    # Pattern to match job positions with company and duration
-    experience_pattern = r'([A-Z][a-z]+(?:\\s+[A-Z][a-z]+)*\\s*(?:Engineer|Developer|Manager|Analyst|Designer|Scientist|Architect|Lead|Director|Specialist|Consultant|Administrator|Coordinator|Officer|Executive|Technician|Associate|Intern))\\s*at\\s*([A-Z][a-zA-Z\\s&\\-0-9]*)'
-    
-    # Alternative patterns for different formats
-    alt_patterns = [
-        r'([A-Z][a-z]+(?:\\s+[A-Z][a-z]+)*\\s*(?:Engineer|Developer|Manager|Analyst|Designer|Scientist|Architect|Lead|Director|Specialist|Consultant|Administrator|Coordinator|Officer|Executive|Technician|Associate|Intern)).*?([A-Z][a-zA-Z\\s&\\-0-9]+)(?:,|\\n)',
-        r'([A-Z][a-zA-Z\\s&\\-0-9]+).*?([A-Z][a-z]+(?:\\s+[A-Z][a-z]+)*\\s*(?:Engineer|Developer|Manager|Analyst|Designer|Scientist|Architect|Lead|Director|Specialist|Consultant|Administrator|Coordinator|Officer|Executive|Technician|Associate|Intern))'
-    ]
-    
-    experiences = []
-    
-    matches = re.findall(experience_pattern, text)
-    for match in matches:
-        role, company = match
-        experiences.append({
-            'role': role.strip(),
-            'company': company.strip(),
-            'duration': 'Duration not specified',
-            'impact': 'Impact not detailed'
-        })
-    
-    # Try alternative patterns if primary didn't yield results
-    if not experiences:
-        for pattern in alt_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                if len(match) >= 2:
-                    # Heuristic to determine which is role and which is company
-                    role, company = match[0], match[1]
-                    # Check if first element looks more like a role
-                    if any(title in role.lower() for title in ['engineer', 'developer', 'manager', 'analyst', 'designer', 'scientist']):
-                        pass  # role, company are in correct order
-                    else:
-                        role, company = company, role
-                    
-                    experiences.append({
-                        'role': role.strip(),
-                        'company': company.strip(),
-                        'duration': 'Duration not specified',
-                        'impact': 'Impact not detailed'
-                    })
-    
-    return experiences
+    return parse_experience(text)
 
 
 def extract_projects(text):
@@ -236,7 +262,7 @@ def extract_projects(text):
         project_text = ' '.join(project_matches)
         
         # Look for project-like entries
-        project_entries = re.split(r'\\n\\s*\\n|\\n\\d+\\.|•', project_text)
+        project_entries = re.split(r'\n\s*\n|\n\d+\.|•', project_text)
         
         for entry in project_entries:
             entry = entry.strip()
@@ -256,10 +282,10 @@ def extract_education(text):
     Extract education details
     """
     education_patterns = [
-        r'(Bachelor|Master|PhD|Doctorate|Degree|Diploma|Certificate).*?([A-Z][a-zA-Z\\s]+University|[A-Z][a-zA-Z\\s]+College|[A-Z][a-zA-Z\\s]+Institute)',
-        r'([A-Z][a-zA-Z\\s]+University|[A-Z][a-zA-Z\\s]+College|[A-Z][a-zA-Z\\s]+Institute).*?(Bachelor|Master|PhD|Doctorate|Degree|Diploma|Certificate)',
-        r'(BS|MS|MBA|PhD|BA|MA).*?([A-Z][a-zA-Z\\s]+University|[A-Z][a-zA-Z\\s]+College|[A-Z][a-zA-Z\\s]+Institute)',
-        r'([A-Z][a-zA-Z\\s]+University|[A-Z][a-zA-Z\\s]+College|[A-Z][a-zA-Z\\s]+Institute).*?(BS|MS|MBA|PhD|BA|MA)'
+        r'(Bachelor|Master|PhD|Doctorate|Degree|Diploma|Certificate).*?([A-Z][a-zA-Z\s]+University|[A-Z][a-zA-Z\s]+College|[A-Z][a-zA-Z\s]+Institute)',
+        r'([A-Z][a-zA-Z\s]+University|[A-Z][a-zA-Z\s]+College|[A-Z][a-zA-Z\s]+Institute).*?(Bachelor|Master|PhD|Doctorate|Degree|Diploma|Certificate)',
+        r'(BS|MS|MBA|PhD|BA|MA).*?([A-Z][a-zA-Z\s]+University|[A-Z][a-zA-Z\s]+College|[A-Z][a-zA-Z\s]+Institute)',
+        r'([A-Z][a-zA-Z\s]+University|[A-Z][a-zA-Z\s]+College|[A-Z][a-zA-Z\s]+Institute).*?(BS|MS|MBA|PhD|BA|MA)'
     ]
     
     educations = []
@@ -0,0 +1,324 @@
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.cancellation import AnalysisCancelled, current_token
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits are skipped there
+    resource = None
+
+
+# Limits, overridable through environment variables
+MAX_UPLOAD_BYTES = int(os.environ.get("PDF_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 50))
+PAGE_TIMEOUT_SECONDS = float(os.environ.get("PDF_PAGE_TIMEOUT_SECONDS", 5))
+WORKER_MEMORY_MB = int(os.environ.get("PDF_WORKER_MEMORY_MB", 512))
+WORKER_CPU_SECONDS = int(os.environ.get("PDF_WORKER_CPU_SECONDS", 30))
+WORKER_COUNT = int(os.environ.get("PDF_WORKERS", 2))
+# Workers are recycled after this many documents to bound leaked memory
+WORKER_MAX_TASKS = int(os.environ.get("PDF_WORKER_MAX_TASKS", 100))
+# Shared flags through which a queued or running document can be cancelled
+# between pages, and the times documents started; documents beyond this
+# many at once are not cancellable
+CANCEL_SLOTS = int(os.environ.get("PDF_CANCEL_SLOTS", 64))
+# How often a waiting upload checks whether its document overran
+DEADLINE_POLL_SECONDS = 0.5
+
+# How far from each end of the file the header and trailer markers may be
+HEADER_SEARCH_BYTES = 1024
+TRAILER_SEARCH_BYTES = 2048
+
+
+class PdfProcessingError(Exception):
+    """Base class for PDFs that cannot be parsed safely."""
+
+
+class PdfTooLargeError(PdfProcessingError):
+    """The upload exceeds the configured size limit."""
+
+
+class PdfTooManyPagesError(PdfProcessingError):
+    """The document has more pages than the configured limit."""
+
+
+class InvalidPdfError(PdfProcessingError):
+    """The file is not a well-formed PDF."""
+
+
+class PdfTimeoutError(PdfProcessingError):
+    """Parsing took longer than the allowed wall-clock time."""
+
+
+class PdfWorkerError(PdfProcessingError):
+    """The parsing worker crashed or hit a resource limit."""
+
+
+def check_pdf_bytes(data):
+    """
+    Cheap checks run before any parsing: size, header and trailer.
+    """
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise PdfTooLargeError(
+            f"File is {len(data) / 1024 / 1024:.1f} MB; the limit is {MAX_UPLOAD_BYTES / 1024 / 1024:.0f} MB."
+        )
+    if b"%PDF-" not in data[:HEADER_SEARCH_BYTES]:
+        raise InvalidPdfError("File does not start with a PDF header.")
+    if b"%%EOF" not in data[-TRAILER_SEARCH_BYTES:]:
+        raise InvalidPdfError("File has no PDF trailer; it may be truncated or corrupted.")
+
+
+_cancel_flags = None
+_start_times = None
+
+
+def _init_worker(memory_mb, cancel_flags, start_times):
+    """
+    Pool initializer: cap the address space of the worker process and keep
+    the shared cancellation flags and start times.
+    """
+    global _cancel_flags, _start_times
+    _cancel_flags = cancel_flags
+    _start_times = start_times
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _on_page_timeout(signum, frame):
+    raise PdfTimeoutError("A page took too long to parse.")
+
+
+def _parse_pages(data, max_pages, page_timeout, cpu_seconds, cancel_slot=None):
+    """
+    Runs inside the worker process; returns the text of each page.
+    Stops between pages with AnalysisCancelled once its cancellation flag is set.
+    """
+    if cancel_slot is not None:
+        _start_times[cancel_slot] = time.time()
+    from pypdf import PdfReader
+
+    # RLIMIT_CPU counts the whole life of the process, so the soft limit is
+    # moved forward for every document a reused worker handles
+    if resource is not None and cpu_seconds > 0:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = used + cpu_seconds
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+    previous_handler = signal.signal(signal.SIGALRM, _on_page_timeout)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, page_timeout)
+        try:
+            reader = PdfReader(io.BytesIO(data))
+            page_count = len(reader.pages)
+        except PdfProcessingError:
+            raise
+        except Exception as e:
+            raise InvalidPdfError(f"Could not read PDF structure: {e}")
+
+        if page_count > max_pages:
+            raise PdfTooManyPagesError(f"Document has {page_count} pages; the limit is {max_pages}.")
+
+        pages = []
+        for page in reader.pages:
+            if cancel_slot is not None and _cancel_flags[cancel_slot]:
+                raise AnalysisCancelled('extract', 'cancelled')
+            signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            try:
+                pages.append(page.extract_text() or "")
+            except PdfProcessingError:
+                raise
+            except RecursionError:
+                raise InvalidPdfError("PDF objects are nested too deeply.")
+            except MemoryError:
+                raise PdfWorkerError("PDF needs more memory than allowed.")
+            except Exception as e:
+                raise InvalidPdfError(f"Could not extract page text: {e}")
+        return pages
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_cancel_flags_shared = None
+_start_times_shared = None
+_free_slots = list(range(CANCEL_SLOTS))
+
+
+def _get_pool():
+    global _pool, _cancel_flags_shared, _start_times_shared
+    with _pool_lock:
+        if _pool is None:
+            # Forking a threaded server process is unsafe, so workers come
+            # from a forkserver (or are spawned where that is unavailable)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(method)
+            if _cancel_flags_shared is None:
+                _cancel_flags_shared = context.RawArray('b', CANCEL_SLOTS)
+                _start_times_shared = context.RawArray('d', CANCEL_SLOTS)
+            kwargs = {}
+            if sys.version_info >= (3, 11):
+                kwargs["max_tasks_per_child"] = WORKER_MAX_TASKS
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKER_COUNT,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(WORKER_MEMORY_MB, _cancel_flags_shared, _start_times_shared),
+                **kwargs
+            )
+        return _pool
+
+
+def _take_cancel_slot():
+    with _pool_lock:
+        if not _free_slots:
+            return None
+        slot = _free_slots.pop()
+        _cancel_flags_shared[slot] = 0
+        _start_times_shared[slot] = 0.0
+        return slot
+
+
+def _return_cancel_slot(slot):
+    with _pool_lock:
+        _free_slots.append(slot)
+
+
+def _await_parse(future, slot, timeout):
+    """
+    future.result(), raising FutureTimeoutError once the document has been
+    parsed for longer than timeout; time spent queued behind other
+    documents does not count
+    """
+    running_since = None
+    while True:
+        try:
+            return future.result(timeout=DEADLINE_POLL_SECONDS)
+        except FutureTimeoutError:
+            pass
+        if slot is not None:
+            # Wall-clock time at which the worker started the document
+            started = _start_times_shared[slot]
+            running = time.time() - started if started else 0.0
+        else:
+            # Without a slot: since the pool handed it to a worker's queue
+            if running_since is None and future.running():
+                running_since = time.monotonic()
+            running = time.monotonic() - running_since if running_since is not None else 0.0
+        if running > timeout:
+            raise FutureTimeoutError()
+
+
+class _PoolDiscarded(Exception):
+    """Another document's failure took down the pool this one ran in."""
+
+
+# Pools thrown away after a document hung or crashed them
+_discarded = weakref.WeakSet()
+
+
+def _discard_pool(pool):
+    """
+    Throw away a pool whose workers crashed or hang; the next call starts a
+    fresh one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+        _discarded.add(pool)
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_pages(data):
+    """
+    Parse PDF bytes in a resource-limited worker process.
+    Returns a list with the text of each page; raises a PdfProcessingError
+    subclass when the file is rejected or parsing fails, and AnalysisCancelled
+    when the current analysis is cancelled (see utils.cancellation).
+    A document whose workers were killed over another document is parsed
+    once more in a fresh pool.
+    """
+    check_pdf_bytes(data)
+    try:
+        return _extract_pages(data)
+    except _PoolDiscarded:
+        pass
+    try:
+        return _extract_pages(data)
+    except _PoolDiscarded:
+        raise PdfWorkerError("PDF parser stopped unexpectedly; the file may exceed the memory or CPU limits.")
+
+
+def _extract_pages(data):
+    token = current_token()
+    if token is not None:
+        token.check('extract')
+
+    pool = _get_pool()
+    slot = _take_cancel_slot()
+    future = None
+
+    def cancel():
+        # A queued document never starts; a running one stops at the next page
+        if slot is not None:
+            _cancel_flags_shared[slot] = 1
+        if future is not None:
+            future.cancel()
+
+    # Per-page timeouts are enforced in the worker; this outer deadline,
+    # counted from when the document started, also covers a worker that
+    # stops responding altogether
+    deadline = PAGE_TIMEOUT_SECONDS * (MAX_PAGES + 1) + 5
+    try:
+        future = pool.submit(_parse_pages, data, MAX_PAGES, PAGE_TIMEOUT_SECONDS, WORKER_CPU_SECONDS, slot)
+        unregister = token.on_cancel(cancel) if token is not None else None
+        try:
+            return _await_parse(future, slot, deadline)
+        finally:
+            if unregister:
+                unregister()
+    except CancelledError:
+        raise AnalysisCancelled('extract', token.reason if token else None)
+    except FutureTimeoutError:
+        _discard_pool(pool)
+        raise PdfTimeoutError("PDF parsing did not finish in time.")
+    except BrokenProcessPool:
+        if pool in _discarded:
+            raise _PoolDiscarded()
+        _discard_pool(pool)
+        raise PdfWorkerError("PDF parser stopped unexpectedly; the file may exceed the memory or CPU limits.")
+    finally:
+        if slot is not None:
+            _return_cancel_slot(slot)
+
+
+def _import_parser():
+    import pypdf  # noqa: F401
+
+
+def warm_pool():
+    """
+    Start the worker processes and import pypdf in them ahead of the first
+    upload.
+    """
+    pool = _get_pool()
+    for _ in range(WORKER_COUNT):
+        pool.submit(_import_parser)
@@ -0,0 +1,275 @@
+"""
+Opt-in deep profiling of a single analysis.
+
+Enabled with PROFILE_ANALYSIS=1 or the `?profile=1` query parameter; when
+off, profile_analysis() is a no-op context: nothing is traced, sampled or
+patched. A profiled run writes to PROFILE_DIR/<time>-<label>/:
+
+    profile.pstats          cProfile stats of the request thread
+                            (python -m pstats, snakeviz)
+    stacks.collapsed        wall-clock stacks of all threads sampled every
+                            PROFILE_SAMPLE_INTERVAL seconds, for flamegraph.pl
+                            or speedscope
+    allocations.tracemalloc tracemalloc snapshot (tracemalloc.Snapshot.load)
+    summary.json            wall time, top functions, top allocation sites
+                            and the time spent in each regex
+
+Regex timing wraps the `re` module and compiled patterns of the analysis
+modules for the duration of the run, so regexes of other sessions running
+at the same time are counted too. Profiled runs are serialized.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+PROFILE_ANALYSIS = os.environ.get("PROFILE_ANALYSIS", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "profiles")
+)
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
+# Frames kept per allocation traceback
+PROFILE_TRACEMALLOC_FRAMES = int(os.environ.get("PROFILE_TRACEMALLOC_FRAMES", 10))
+
+# Modules whose regexes are timed during a profiled run
+REGEX_MODULES = (
+    'utils.pdf_processor', 'utils.timeline', 'utils.ai_analysis', 'utils.incremental',
+    'utils.report_schema', 'components.results',
+)
+# Leaf frames of threads that are idle rather than working or waiting on work
+IDLE_FRAMES = {('thread.py', '_worker'), ('threading.py', 'wait'), ('queue.py', 'get'), ('selectors.py', 'select')}
+
+_run_lock = threading.Lock()
+
+
+def profiling_requested(query_params=None):
+    """
+    Whether this run should be profiled: PROFILE_ANALYSIS, or ?profile=1
+    """
+    if PROFILE_ANALYSIS:
+        return True
+    value = (query_params or {}).get('profile', [''])
+    value = value[0] if isinstance(value, list) else value
+    return value.lower() in ("1", "true", "yes")
+
+
+class RegexTimer:
+    """
+    Wall time and call count per regex pattern, collected from all threads
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, pattern, elapsed):
+        with self._lock:
+            entry = self.stats.setdefault(pattern, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def top(self, limit=30):
+        ordered = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [{'pattern': pattern, 'calls': calls, 'seconds': round(seconds, 6)}
+                for pattern, (calls, seconds) in ordered]
+
+
+class _TimedPattern:
+    def __init__(self, pattern, timer):
+        self._pattern = pattern
+        self._timer = timer
+
+    def __getattr__(self, name):
+        attribute = getattr(self._pattern, name)
+        if name not in ('search', 'match', 'fullmatch', 'findall', 'finditer', 'sub', 'subn', 'split'):
+            return attribute
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+                # Iterators do their matching when consumed
+                return list(result) if name == 'finditer' else result
+            finally:
+                self._timer.record(self._pattern.pattern, time.perf_counter() - started)
+        return timed
+
+
+class _TimedRe:
+    """
+    Stand-in for the `re` module that times the module-level functions
+    """
+
+    def __init__(self, timer):
+        self._timer = timer
+
+    def __getattr__(self, name):
+        attribute = getattr(re, name)
+        if name == 'compile':
+            return lambda pattern, flags=0: _TimedPattern(re.compile(pattern, flags), self._timer)
+        if name not in ('search', 'match', 'fullmatch', 'findall', 'finditer', 'sub', 'subn', 'split'):
+            return attribute
+
+        def timed(pattern, *args, **kwargs):
+            if isinstance(pattern, _TimedPattern):
+                pattern = pattern._pattern
+            started = time.perf_counter()
+            try:
+                result = attribute(pattern, *args, **kwargs)
+                return list(result) if name == 'finditer' else result
+            finally:
+                key = pattern.pattern if isinstance(pattern, re.Pattern) else pattern
+                self._timer.record(key, time.perf_counter() - started)
+        return timed
+
+
+@contextmanager
+def _timed_regexes(timer):
+    patched = []
+    for module_name in REGEX_MODULES:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        for name, value in list(vars(module).items()):
+            if value is re:
+                replacement = _TimedRe(timer)
+            elif isinstance(value, re.Pattern):
+                replacement = _TimedPattern(value, timer)
+            else:
+                continue
+            patched.append((module, name, value))
+            setattr(module, name, replacement)
+    try:
+        yield
+    finally:
+        for module, name, value in patched:
+            setattr(module, name, value)
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stacks of all threads into collapsed-stack counts
+    """
+
+    def __init__(self, interval, target_thread_id):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.target_thread_id = target_thread_id
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names.setdefault(thread.ident, thread.name)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if thread_id != self.target_thread_id and leaf in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class ProfileRun:
+    """
+    Artifacts of one profiled run; `path` is set once they are written
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.path = None
+        self.regexes = RegexTimer()
+
+
+def _write_artifacts(run, profiler, sampler, allocations, wall_seconds):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    label = re.sub(r'[^A-Za-z0-9_.-]+', '-', run.label).strip('-') or 'analysis'
+    path = os.path.join(PROFILE_DIR, f"{stamp}-{label}")
+    os.makedirs(path, exist_ok=True)
+
+    profiler.dump_stats(os.path.join(path, "profile.pstats"))
+    with open(os.path.join(path, "stacks.collapsed"), "w") as f:
+        f.write(sampler.collapsed())
+    allocations.dump(os.path.join(path, "allocations.tracemalloc"))
+
+    stats_text = io.StringIO()
+    pstats.Stats(profiler, stream=stats_text).sort_stats("cumulative").print_stats(30)
+    summary = {
+        'label': run.label,
+        'wall_seconds': round(wall_seconds, 4),
+        'samples': sum(sampler.counts.values()),
+        'regexes': run.regexes.top(),
+        'allocations': [
+            {'site': str(stat.traceback[0]), 'kib': round(stat.size / 1024, 1), 'blocks': stat.count}
+            for stat in allocations.statistics('lineno')[:25]
+        ],
+        'top_functions': stats_text.getvalue().splitlines(),
+    }
+    with open(os.path.join(path, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    run.path = path
+
+
+@contextmanager
+def _profile(label):
+    run = ProfileRun(label)
+    with _run_lock:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        sampler = StackSampler(PROFILE_SAMPLE_INTERVAL, threading.get_ident())
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with _timed_regexes(run.regexes):
+                profiler.enable()
+                try:
+                    yield run
+                finally:
+                    profiler.disable()
+        finally:
+            wall_seconds = time.perf_counter() - started
+            sampler.stop()
+            allocations = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                _write_artifacts(run, profiler, sampler, allocations, wall_seconds)
+            except OSError as e:
+                print(f"Writing profile failed: {e}")
+
+
+def profile_analysis(enabled, label="analysis"):
+    """
+    Context manager that profiles the enclosed block when enabled and yields
+    a ProfileRun (its `path` is set on exit); otherwise yields None at no cost
+    """
+    return _profile(label) if enabled else nullcontext()
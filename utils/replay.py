@@ -0,0 +1,394 @@
+"""
+Record real analysis sessions and replay them offline.
+
+    RECORD_SESSIONS=1 streamlit run app.py
+    python -m utils.replay run data/recordings --out before.json
+    python -m utils.replay run data/recordings --out after.json
+    python -m utils.replay diff before.json after.json
+
+A recording holds the upload hash, the page texts, the job category, every
+prompt sent to the model with its response and latency, and the stage
+timings of the live run. Names, emails, phone numbers and profile URLs are
+scrubbed from all of it before it is written.
+
+The runner drives the pipeline from the recordings with the model replaced
+by a backend that returns the recorded response for each prompt, and
+writes per-recording outputs (score, components, section hashes) and stage
+timings. `diff` compares two runner outputs.
+"""
+import argparse
+import contextvars
+import gzip
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+RECORD_SESSIONS = os.environ.get("RECORD_SESSIONS", "").lower() in ("1", "true", "yes")
+RECORDINGS_DIR = os.environ.get(
+    "RECORDINGS_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "recordings")
+)
+RECORDING_VERSION = 1
+
+EMAIL = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE = re.compile(r'(\+\d{1,3}[\s-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}')
+PROFILE_URL = re.compile(r'(?:https?://)?(?:www\.)?(linkedin\.com/in|github\.com)/[A-Za-z0-9_-]+', re.IGNORECASE)
+NAME_LINE = re.compile(r"^[A-Z][A-Za-z'.-]+(?: [A-Z][A-Za-z'.-]+){1,3}$")
+
+_recording = contextvars.ContextVar('replay_recording', default=None)
+
+
+def prompt_hash(prompt):
+    return hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class Scrubber:
+    """
+    Replaces the personal details found in one resume, the same way in the
+    resume text, the prompts built from it and the model's responses
+    """
+
+    def __init__(self, text):
+        first_line = next((line.strip() for line in text.splitlines() if line.strip()), '')
+        self.name = first_line if NAME_LINE.match(first_line) else None
+
+    def __call__(self, value):
+        if self.name:
+            value = value.replace(self.name, "Candidate Name")
+            for part in self.name.split():
+                if len(part) > 2:
+                    value = re.sub(r'\b' + re.escape(part) + r'\b', "Candidate", value)
+        value = EMAIL.sub("candidate@example.com", value)
+        value = PROFILE_URL.sub(lambda match: f"{match.group(1).lower()}/candidate", value)
+        return PHONE.sub("555-010-0000", value)
+
+
+class Recording:
+    """
+    One live analysis being recorded; written on exit of record_session()
+    """
+
+    def __init__(self, job_category, depth=None):
+        self.job_category = job_category
+        self.depth = depth
+        self.upload_hash = None
+        self.pages = []
+        self.calls = []
+        self.timings = {}
+        self.result = None
+        self.path = None
+        self._last_mark = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def mark(self, stage):
+        """
+        End a stage: the time since the previous mark is recorded under `stage`
+        """
+        now = time.perf_counter()
+        self.timings[stage] = round(now - self._last_mark, 6)
+        self._last_mark = now
+
+    def set_upload(self, upload_hash, pages):
+        self.upload_hash = upload_hash
+        self.pages = list(pages or [])
+
+    def set_result(self, snapshot, changes):
+        self.result = {'llm_mode': changes['llm_mode'], 'score': snapshot['score']}
+
+    def add_call(self, prompt, response, seconds):
+        with self._lock:
+            self.calls.append({'prompt': prompt, 'response': response, 'seconds': round(seconds, 6)})
+
+    def to_dict(self):
+        from utils.ai_analysis import OUTPUT_MODE, ANALYSIS_STRATEGY
+
+        scrub = Scrubber("\n".join(self.pages))
+        calls = []
+        for call in self.calls:
+            prompt = scrub(call['prompt'])
+            calls.append({
+                'prompt_hash': prompt_hash(prompt),
+                'prompt': prompt,
+                'response': scrub(call['response']) if call['response'] is not None else None,
+                'seconds': call['seconds'],
+            })
+        return {
+            'version': RECORDING_VERSION,
+            'recorded_at': time.time(),
+            'upload_hash': self.upload_hash,
+            'job_category': self.job_category,
+            'settings': {'output_mode': OUTPUT_MODE, 'strategy': ANALYSIS_STRATEGY, 'depth': self.depth},
+            'pages': [scrub(page) for page in self.pages],
+            'calls': calls,
+            'timings': self.timings,
+            'result': self.result,
+        }
+
+    def write(self, directory=RECORDINGS_DIR):
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{(self.upload_hash or 'none')[:12]}-{uuid.uuid4().hex[:6]}.json.gz"
+        path = os.path.join(directory, name)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        self.path = path
+        return path
+
+
+@contextmanager
+def _record(job_category, depth):
+    recording = Recording(job_category, depth)
+    token = _recording.set(recording)
+    try:
+        yield recording
+    finally:
+        _recording.reset(token)
+        if recording.pages:
+            try:
+                recording.write()
+            except OSError as e:
+                print(f"Writing recording failed: {e}")
+
+
+def record_session(enabled, job_category, depth=None):
+    """
+    Context manager that records the model calls made in the enclosed block
+    (and in worker threads given its context) when enabled; yields the
+    Recording, or None when recording is off
+    """
+    return _record(job_category, depth) if enabled else nullcontext()
+
+
+def record_model_call(prompt, response, seconds):
+    """
+    Add a model call to the active recording, if any
+    """
+    recording = _recording.get()
+    if recording is not None:
+        recording.add_call(prompt, response, seconds)
+
+
+def load_recordings(path):
+    """
+    Recordings from a file or directory, sorted by file name
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.json.gz'))
+    else:
+        files = [path]
+    recordings = []
+    for file_path in files:
+        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+            recording = json.load(f)
+        recording['id'] = os.path.basename(file_path)[:-len('.json.gz')]
+        recordings.append(recording)
+    return recordings
+
+
+class ReplayMissError(Exception):
+    """No recorded response resembles the prompt."""
+
+
+class ReplayBackend:
+    """
+    Model backend that answers with the recorded responses of one recording.
+    Prompts are matched exactly by hash, or else to the unused recorded
+    prompt sharing the most lines, so small template edits still replay.
+    """
+
+    def __init__(self, recording, latency=False):
+        self.name = "replay"
+        self.latency = latency
+        self.exact = {}
+        for call in recording['calls']:
+            self.exact.setdefault(call['prompt_hash'], call)
+        self.calls = recording['calls']
+        self.hits = self.fuzzy = self.misses = 0
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def _match(self, prompt):
+        call = self.exact.get(prompt_hash(prompt))
+        if call is not None:
+            self.hits += 1
+            return call
+        lines = set(prompt.splitlines())
+        best, best_score = None, 0.0
+        for index, candidate in enumerate(self.calls):
+            if index in self._used:
+                continue
+            candidate_lines = set(candidate['prompt'].splitlines())
+            score = len(lines & candidate_lines) / max(1, len(lines | candidate_lines))
+            if score > best_score:
+                best, best_score = index, score
+        if best is None or best_score < 0.5:
+            self.misses += 1
+            return None
+        self._used.add(best)
+        self.fuzzy += 1
+        return self.calls[best]
+
+    def generate(self, prompt):
+        with self._lock:
+            call = self._match(prompt)
+        if call is None or call['response'] is None:
+            raise ReplayMissError("no recorded response for prompt")
+        if self.latency:
+            time.sleep(call['seconds'])
+        return call['response']
+
+
+def _timed(timings, stage, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    timings.setdefault(stage, []).append(time.perf_counter() - started)
+    return result
+
+
+def replay_recording(recording, repeat=1, latency=False):
+    """
+    Run one recording through the pipeline `repeat` times.
+    Returns {'timings': {stage: median seconds}, 'score', 'components',
+    'llm_mode', 'analysis_hash', 'sections': {name: hash}, 'hits', 'fuzzy',
+    'misses'}
+    """
+    from utils.ai_analysis import set_model_backend, calculate_resume_score, detect_resume_risks
+    from utils.pdf_processor import join_pages, extract_structured_data
+    from utils.incremental import analyze_revision
+    from utils.report_schema import split_markdown_sections
+    from utils.export import markdown_to_html
+    from components.results import parse_analysis_into_sections
+
+    pages = recording['pages']
+    job_category = recording['job_category']
+    depth = recording['settings'].get('depth')
+    text = join_pages(pages)
+    timings = {}
+    for _ in range(repeat):
+        backend = ReplayBackend(recording, latency)
+        set_model_backend(backend)
+        structured_data = _timed(timings, 'parse', extract_structured_data, text)
+        _timed(timings, 'score', lambda: (calculate_resume_score(structured_data, job_category),
+                                          detect_resume_risks(structured_data)))
+        snapshot, changes = _timed(timings, 'analyze', lambda: analyze_revision(pages, job_category, depth=depth))
+        _timed(timings, 'render', lambda: (parse_analysis_into_sections(snapshot['analysis_text']),
+                                           markdown_to_html(snapshot['analysis_text'])))
+
+    def digest(value):
+        return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
+    return {
+        'timings': {stage: statistics.median(samples) for stage, samples in timings.items()},
+        'score': snapshot['score'],
+        'components': snapshot['score_components'],
+        'llm_mode': changes['llm_mode'],
+        'analysis_hash': digest(snapshot['analysis_text']),
+        'sections': {name: digest(body) for name, body in split_markdown_sections(snapshot['analysis_text']).items()},
+        'hits': backend.hits,
+        'fuzzy': backend.fuzzy,
+        'misses': backend.misses,
+    }
+
+
+def run(path, repeat=1, latency=False):
+    from utils.scheduler import FairScheduler, set_scheduler
+
+    # Replays are not subject to the live model quota
+    set_scheduler(FairScheduler(rpm=0, tpm=0))
+    results = {}
+    for recording in load_recordings(path):
+        results[recording['id']] = replay_recording(recording, repeat, latency)
+    return {'created_at': time.time(), 'repeat': repeat, 'runs': results}
+
+
+def _change(old, new):
+    return (new - old) / old if old else 0.0
+
+
+def diff(old, new, threshold=0.2):
+    """
+    Compare two runner outputs. Returns (lines, output_changes, regressions)
+    """
+    lines = []
+    output_changes = regressions = 0
+    shared = [run_id for run_id in old['runs'] if run_id in new['runs']]
+    for run_id in sorted(set(old['runs']) ^ set(new['runs'])):
+        lines.append(f"{run_id}: only in {'old' if run_id in old['runs'] else 'new'}")
+
+    for run_id in shared:
+        a, b = old['runs'][run_id], new['runs'][run_id]
+        notes = []
+        if a['score'] != b['score']:
+            notes.append(f"score {a['score']} -> {b['score']}")
+        for key, value in a['components'].items():
+            if b['components'].get(key) != value:
+                notes.append(f"{key} {value} -> {b['components'].get(key)}")
+        if a['llm_mode'] != b['llm_mode']:
+            notes.append(f"llm_mode {a['llm_mode']} -> {b['llm_mode']}")
+        changed = sorted(name for name in set(a['sections']) | set(b['sections'])
+                         if a['sections'].get(name) != b['sections'].get(name))
+        if changed:
+            notes.append(f"sections changed: {', '.join(changed)}")
+        if b['misses'] > a['misses']:
+            notes.append(f"replay misses {a['misses']} -> {b['misses']}")
+        if notes:
+            output_changes += 1
+            lines.append(f"{run_id}: " + "; ".join(notes))
+
+    lines.append("")
+    lines.append(f"{'stage':<10}{'old median s':>14}{'new median s':>14}{'change':>9}")
+    stages = sorted({stage for run_id in shared for stage in old['runs'][run_id]['timings']})
+    for stage in stages:
+        before = statistics.median(old['runs'][run_id]['timings'][stage] for run_id in shared)
+        after = statistics.median(new['runs'][run_id]['timings'].get(stage, 0.0) for run_id in shared)
+        change = _change(before, after)
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        lines.append(f"{stage:<10}{before:>14.5f}{after:>14.5f}{change:>+9.1%}{flag}")
+    lines.append("")
+    lines.append(f"{len(shared)} recordings compared, {output_changes} with output changes, "
+                 f"{regressions} stage regressions over {threshold:.0%}")
+    return lines, output_changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="replay recordings and write outputs and timings")
+    run_parser.add_argument("path", nargs="?", default=RECORDINGS_DIR, help="recording file or directory")
+    run_parser.add_argument("--out", required=True)
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per recording; medians are reported")
+    run_parser.add_argument("--model-latency", action="store_true", help="sleep for the recorded model latency")
+    diff_parser = commands.add_parser("diff", help="compare two runner outputs")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("--threshold", type=float, default=0.2, help="stage slowdown reported as a regression")
+    diff_parser.add_argument("--strict", action="store_true", help="exit 1 on output changes or regressions")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.path, args.repeat, args.model_latency)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Replayed {len(results['runs'])} recordings into {args.out}")
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        lines, output_changes, regressions = diff(old, new, args.threshold)
+        print("\n".join(lines))
+        if args.strict and (output_changes or regressions):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import json
+from dataclasses import dataclass, asdict
+
+
+class ReportValidationError(ValueError):
+    """The model's JSON does not match the report schema."""
+
+
+@dataclass
+class ScoreBreakdown:
+    __slots__ = ('overall', 'role_alignment', 'impact_clarity', 'ats_friendliness', 'project_relevance')
+    overall: int
+    role_alignment: int
+    impact_clarity: int
+    ats_friendliness: int
+    project_relevance: int
+
+
+@dataclass
+class SkillGapRow:
+    __slots__ = ('category', 'strong_match', 'partial_match', 'missing')
+    category: str
+    strong_match: str
+    partial_match: str
+    missing: str
+
+
+@dataclass
+class HiringManagerView:
+    __slots__ = ('first_impression', 'stands_out', 'raises_doubts', 'decision')
+    first_impression: str
+    stands_out: str
+    raises_doubts: str
+    decision: str
+
+
+@dataclass
+class Rewrite:
+    __slots__ = ('before', 'after', 'why_better')
+    before: str
+    after: str
+    why_better: str
+
+
+@dataclass
+class AnalysisReport:
+    __slots__ = ('summary', 'score', 'role_fit', 'skill_gap', 'hiring_manager', 'risks', 'improvements', 'rewrites')
+    summary: list
+    score: ScoreBreakdown
+    role_fit: str
+    skill_gap: list
+    hiring_manager: HiringManagerView
+    risks: list
+    improvements: list
+    rewrites: list
+
+
+# Markdown headings of the report sections, in display order
+SECTION_HEADINGS = {
+    'quick_summary': "## 📊 QUICK SUMMARY (TL;DR)",
+    'resume_score': "## 💯 RESUME SCORE & BREAKDOWN",
+    'role_fit': "## 🎯 ROLE FIT ANALYSIS",
+    'skill_gap': "## 🧩 SKILL GAP MATRIX",
+    'hiring_manager': "## 🔍 HIRING MANAGER SIMULATION",
+    'risks': "## ⚠️ RESUME RISK DETECTION",
+    'improvements': "## 🛠️ IMPROVEMENT ACTIONS (PRIORITIZED)",
+    'rewrites': "## ✏️ EXAMPLE REWRITES",
+}
+
+
+# Compact description of the JSON the model must return; keys match the
+# dataclass fields so validation is a direct mapping
+JSON_SCHEMA_PROMPT = """{
+  "summary": [5 strings, the most critical findings],
+  "score": {"overall": int 0-100, "role_alignment": int 0-25, "impact_clarity": int 0-25,
+            "ats_friendliness": int 0-25, "project_relevance": int 0-25},
+  "role_fit": string,
+  "skill_gap": [{"category": "Technical Skills"|"Tools & Technologies"|"Soft Skills",
+                 "strong_match": string, "partial_match": string, "missing": string}],
+  "hiring_manager": {"first_impression": string, "stands_out": string,
+                     "raises_doubts": string, "decision": "Yes|Maybe|No - reason"},
+  "risks": [strings],
+  "improvements": [3 strings, most impactful first],
+  "rewrites": [{"before": string, "after": string, "why_better": string}]
+}"""
+
+# Hybrid mode: the model writes only the sections that need judgement, the
+# rest of the report is computed locally
+NARRATIVE_SCHEMA_PROMPT = """{
+  "role_fit": string,
+  "skill_gap": [{"category": "Technical Skills"|"Tools & Technologies"|"Soft Skills",
+                 "strong_match": string, "partial_match": string, "missing": string}],
+  "improvements": [3 strings, most impactful first]
+}"""
+
+
+# Highest value of each score, as JSON_SCHEMA_PROMPT asks for
+SCORE_MAXIMUMS = {
+    'overall': 100, 'role_alignment': 25, 'impact_clarity': 25, 'ats_friendliness': 25, 'project_relevance': 25
+}
+
+
+def _expect(value, kind, path):
+    if kind is int and isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ReportValidationError(f"'{path}' must be {kind.__name__}, got {type(value).__name__}")
+    return value
+
+
+def _strings(data, key):
+    return [_expect(item, str, f"{key}[]") for item in _expect(data.get(key, []), list, key)]
+
+
+def _record(cls, data, path, kind=str):
+    data = _expect(data, dict, path)
+    try:
+        return cls(*(_expect(data[field], kind, f"{path}.{field}") for field in cls.__slots__))
+    except KeyError as e:
+        raise ReportValidationError(f"'{path}' is missing {e}")
+
+
+def _score(data):
+    score = _record(ScoreBreakdown, data, 'score', int)
+    for field, maximum in SCORE_MAXIMUMS.items():
+        if not 0 <= getattr(score, field) <= maximum:
+            raise ReportValidationError(f"'score.{field}' must be 0-{maximum}, got {getattr(score, field)}")
+    return score
+
+
+def report_from_dict(data):
+    """
+    Validate a decoded JSON object and build an AnalysisReport.
+    Raises ReportValidationError on any schema mismatch.
+    """
+    data = _expect(data, dict, "report")
+    try:
+        return AnalysisReport(
+            summary=_strings(data, 'summary'),
+            score=_score(data['score']),
+            role_fit=_expect(data['role_fit'], str, 'role_fit'),
+            skill_gap=[_record(SkillGapRow, row, 'skill_gap[]') for row in _expect(data.get('skill_gap', []), list, 'skill_gap')],
+            hiring_manager=_record(HiringManagerView, data['hiring_manager'], 'hiring_manager'),
+            risks=_strings(data, 'risks'),
+            improvements=_strings(data, 'improvements'),
+            rewrites=[_record(Rewrite, row, 'rewrites[]') for row in _expect(data.get('rewrites', []), list, 'rewrites')],
+        )
+    except KeyError as e:
+        raise ReportValidationError(f"report is missing {e}")
+
+
+def decode_json_response(text):
+    """
+    Decode a JSON model response.
+    Raises ReportValidationError if it is not valid JSON.
+    """
+    text = text.strip()
+    # Models sometimes wrap JSON in a code fence despite instructions
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ReportValidationError(f"response is not valid JSON: {e}")
+
+
+def parse_report_json(text):
+    """
+    Decode and validate a model response in JSON mode.
+    Raises ReportValidationError if it is not valid report JSON.
+    """
+    return report_from_dict(decode_json_response(text))
+
+
+def parse_narrative_json(text):
+    """
+    Decode and validate a hybrid-mode response.
+    Returns a dict with role_fit, skill_gap and improvements; raises
+    ReportValidationError if it does not match NARRATIVE_SCHEMA_PROMPT.
+    """
+    data = _expect(decode_json_response(text), dict, "narrative")
+    try:
+        return {
+            'role_fit': _expect(data['role_fit'], str, 'role_fit'),
+            'skill_gap': [_record(SkillGapRow, row, 'skill_gap[]') for row in _expect(data['skill_gap'], list, 'skill_gap')],
+            'improvements': _strings(data, 'improvements'),
+        }
+    except KeyError as e:
+        raise ReportValidationError(f"narrative is missing {e}")
+
+
+def report_to_dict(report):
+    return asdict(report)
+
+
+def split_markdown_sections(analysis_text):
+    """
+    {section: body} of a markdown report in the layout of SECTION_HEADINGS
+    """
+    sections = {}
+    for section, heading in SECTION_HEADINGS.items():
+        start = analysis_text.find(heading)
+        if start == -1:
+            continue
+        start += len(heading)
+        end = analysis_text.find("\n## ", start)
+        sections[section] = analysis_text[start:end if end != -1 else len(analysis_text)].strip()
+    return sections
+
+
+def report_to_markdown(report):
+    """
+    Render a report in the markdown layout used for downloads and for the
+    markdown response mode.
+    """
+    score = report.score
+    lines = ["## 📊 QUICK SUMMARY (TL;DR)"]
+    lines += [f"- {item}" for item in report.summary]
+    lines += [
+        "",
+        "## 💯 RESUME SCORE & BREAKDOWN",
+        f"Overall Score: {score.overall}/100",
+        f"- Role Alignment: {score.role_alignment}/25",
+        f"- Impact Clarity: {score.impact_clarity}/25",
+        f"- ATS Friendliness: {score.ats_friendliness}/25",
+        f"- Project Relevance: {score.project_relevance}/25",
+        "",
+        "## 🎯 ROLE FIT ANALYSIS",
+        report.role_fit,
+        "",
+        "## 🧩 SKILL GAP MATRIX",
+        "| Skill Category | Strong Match | Partial Match | Missing But Important |",
+        "|----------------|--------------|---------------|----------------------|",
+    ]
+    lines += [f"| {row.category} | {row.strong_match} | {row.partial_match} | {row.missing} |" for row in report.skill_gap]
+    view = report.hiring_manager
+    lines += [
+        "",
+        "## 🔍 HIRING MANAGER SIMULATION",
+        f"- First impression: {view.first_impression}",
+        f"- What stands out: {view.stands_out}",
+        f"- What raises doubts: {view.raises_doubts}",
+        f"- Shortlist decision: {view.decision}",
+        "",
+        "## ⚠️ RESUME RISK DETECTION",
+    ]
+    lines += [f"- {risk}" for risk in report.risks]
+    lines += ["", "## 🛠️ IMPROVEMENT ACTIONS (PRIORITIZED)"]
+    lines += [f"{i}. {item}" for i, item in enumerate(report.improvements, start=1)]
+    lines += ["", "## ✏️ EXAMPLE REWRITES"]
+    for rewrite in report.rewrites:
+        lines += [
+            f"**Before:** {rewrite.before}",
+            f"**After:** {rewrite.after}",
+            f"**Why better:** {rewrite.why_better}",
+            "",
+        ]
+    return "\n".join(lines).strip() + "\n"
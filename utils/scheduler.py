@@ -0,0 +1,334 @@
+"""
+Fair, quota-aware admission of model calls across sessions.
+
+Every call takes a token from its session's bucket, then waits in a
+weighted fair queue (start-time fair queuing on estimated tokens) until a
+concurrency slot and the global requests- and tokens-per-minute budgets
+allow it. A call that is over its session's rate, or that would wait
+longer than LLM_MAX_QUEUE_SECONDS, is rejected so the caller falls back to
+the local analysis instead of queueing indefinitely. The calls of one
+fan-out (see single_admission) take a single token between them.
+"""
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from utils import metrics
+from utils.cancellation import current_token
+
+# Global budgets per rolling minute (0 disables a limit) and calls in flight
+LLM_RPM = int(os.environ.get("LLM_RPM", 60))
+LLM_TPM = int(os.environ.get("LLM_TPM", 120000))
+LLM_SCHEDULER_CONCURRENCY = int(os.environ.get("LLM_SCHEDULER_CONCURRENCY", 8))
+# Per session: burst size and sustained calls per minute
+LLM_SESSION_BURST = float(os.environ.get("LLM_SESSION_BURST", 12))
+LLM_SESSION_RATE_PER_MINUTE = float(os.environ.get("LLM_SESSION_RATE_PER_MINUTE", 6))
+LLM_MAX_QUEUE_SECONDS = float(os.environ.get("LLM_MAX_QUEUE_SECONDS", 10))
+# Rate state of sessions without calls for this long is dropped, checked
+# every LLM_SESSION_SWEEP_SECONDS
+LLM_SESSION_IDLE_SECONDS = float(os.environ.get("LLM_SESSION_IDLE_SECONDS", 3600))
+LLM_SESSION_SWEEP_SECONDS = float(os.environ.get("LLM_SESSION_SWEEP_SECONDS", 300))
+# Output tokens assumed per call when estimating its cost
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.environ.get("LLM_EXPECTED_OUTPUT_TOKENS", 800))
+
+WINDOW_SECONDS = 60.0
+
+_session = contextvars.ContextVar('llm_session', default=None)
+# {'charged': None, True or False, 'lock'} of the fan-out being run
+_fan_out = contextvars.ContextVar('llm_fan_out', default=None)
+
+
+def estimate_tokens(prompt):
+    # Roughly four characters per token for English text
+    return len(prompt) // 4 + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+class TokenBucket:
+    def __init__(self, capacity, rate_per_second):
+        self.capacity = capacity
+        self.rate = rate_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now, amount=1):
+        # now may predate the bucket when it is created for this call
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(now, self.updated)
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+
+class SessionUsage:
+    """Scheduling outcome of one session's analysis, for the UI."""
+
+    def __init__(self, session_id, weight=1.0):
+        self.session_id = session_id
+        self.weight = weight
+        self.calls = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait_seconds, admitted):
+        with self._lock:
+            self.calls += 1
+            self.wait_seconds += wait_seconds
+            if not admitted:
+                self.throttled += 1
+
+
+class FairScheduler:
+    def __init__(self, concurrency=LLM_SCHEDULER_CONCURRENCY, rpm=LLM_RPM, tpm=LLM_TPM,
+                 session_burst=LLM_SESSION_BURST, session_rate_per_minute=LLM_SESSION_RATE_PER_MINUTE,
+                 max_queue_seconds=LLM_MAX_QUEUE_SECONDS):
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.session_burst = session_burst
+        self.session_rate = session_rate_per_minute / 60.0
+        self.max_queue_seconds = max_queue_seconds
+        self._cond = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._buckets = {}
+        self._window = deque()
+        self._window_tokens = 0
+        self._in_flight = 0
+        self._swept = time.monotonic()
+
+    def _prune(self, now):
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _fits(self, tokens):
+        if self._in_flight >= self.concurrency:
+            return False
+        if self.rpm and len(self._window) >= self.rpm:
+            return False
+        # A call larger than the whole budget still runs, alone in its window
+        if self.tpm and self._window and self._window_tokens + tokens > self.tpm:
+            return False
+        return True
+
+    def _dispatch(self, now):
+        self._prune(now)
+        granted = False
+        while self._queue:
+            request = self._queue[0][2]
+            if request['cancelled']:
+                heapq.heappop(self._queue)
+                continue
+            if not self._fits(request['tokens']):
+                break
+            heapq.heappop(self._queue)
+            request['granted'] = True
+            granted = True
+            self._in_flight += 1
+            self._window.append((now, request['tokens']))
+            self._window_tokens += request['tokens']
+            self._virtual_time = max(self._virtual_time, request['start_tag'])
+        if granted:
+            self._cond.notify_all()
+        metrics.set_gauge('llm_queue_depth', sum(1 for _, _, request in self._queue if not request['cancelled']))
+
+    def _retry_in(self, now):
+        # When the rolling window is what blocks the head, wake as it frees up
+        if self._window and self._in_flight < self.concurrency:
+            return max(0.01, self._window[0][0] + WINDOW_SECONDS - now)
+        return None
+
+    def _take_session_token(self, session_id, now):
+        if now - self._swept >= LLM_SESSION_SWEEP_SECONDS:
+            self._forget_idle(now, LLM_SESSION_IDLE_SECONDS)
+        bucket = self._buckets.get(session_id)
+        if bucket is None:
+            bucket = self._buckets[session_id] = TokenBucket(self.session_burst, self.session_rate)
+        if not bucket.take(now):
+            metrics.increment('llm_throttled_total', reason='session_rate')
+            return False
+        return True
+
+    def charge(self, session_id):
+        """
+        Take a token from the session's bucket for calls that are then
+        acquired with charge_session=False. Returns False when the session
+        is over its rate.
+        """
+        with self._cond:
+            return self._take_session_token(session_id, time.monotonic())
+
+    def acquire(self, session_id, tokens, weight=1.0, cancel_token=None, charge_session=True):
+        """
+        Wait for a slot for a call of about `tokens` tokens.
+        Returns the seconds spent queued, or None if the call was rejected or
+        cancel_token was cancelled while it waited.
+        """
+        started = time.monotonic()
+        unregister = cancel_token.on_cancel(self._wake) if cancel_token is not None else None
+        try:
+            return self._acquire(session_id, tokens, weight, cancel_token, started, charge_session)
+        finally:
+            if unregister:
+                unregister()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _acquire(self, session_id, tokens, weight, cancel_token, started, charge_session):
+        with self._cond:
+            if session_id is not None and charge_session:
+                if not self._take_session_token(session_id, started):
+                    return None
+
+            start_tag = max(self._virtual_time, self._last_finish.get(session_id, 0.0))
+            finish_tag = start_tag + tokens / weight
+            self._last_finish[session_id] = finish_tag
+            request = {'tokens': tokens, 'start_tag': start_tag, 'granted': False, 'cancelled': False}
+            heapq.heappush(self._queue, (finish_tag, next(self._sequence), request))
+
+            deadline = started + self.max_queue_seconds
+            while True:
+                now = time.monotonic()
+                self._dispatch(now)
+                if request['granted']:
+                    break
+                remaining = deadline - now
+                withdrawn = cancel_token is not None and cancel_token.cancelled
+                if remaining <= 0 or withdrawn:
+                    request['cancelled'] = True
+                    # Give the unused share back so the session is not penalised twice
+                    self._last_finish[session_id] = start_tag
+                    if withdrawn:
+                        metrics.increment('llm_queue_cancelled_total')
+                    else:
+                        metrics.increment('llm_throttled_total', reason='global_budget')
+                    metrics.observe('llm_queue_wait_seconds', now - started)
+                    return None
+                retry_in = self._retry_in(now)
+                self._cond.wait(min(remaining, retry_in) if retry_in else remaining)
+
+        waited = time.monotonic() - started
+        metrics.observe('llm_queue_wait_seconds', waited)
+        return waited
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._dispatch(time.monotonic())
+            self._cond.notify_all()
+
+    def forget_idle_sessions(self, idle_seconds=LLM_SESSION_IDLE_SECONDS):
+        with self._cond:
+            self._forget_idle(time.monotonic(), idle_seconds)
+
+    def _forget_idle(self, now, idle_seconds):
+        # Called with the lock held; a bucket idle this long is full anyway
+        self._swept = now
+        for session_id in [sid for sid, bucket in self._buckets.items() if now - bucket.updated > idle_seconds]:
+            del self._buckets[session_id]
+            self._last_finish.pop(session_id, None)
+
+
+_scheduler = FairScheduler()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    """
+    Replace the shared scheduler, e.g. with unlimited budgets for load tests
+    """
+    global _scheduler
+    _scheduler = scheduler
+
+
+@contextmanager
+def session_scope(session_id, weight=1.0):
+    """
+    Attribute the model calls made in this block (including those submitted
+    to thread pools with the context copied) to a session.
+    Yields the SessionUsage collected for the block.
+    """
+    usage = SessionUsage(session_id, weight)
+    token = _session.set(usage)
+    try:
+        yield usage
+    finally:
+        _session.reset(token)
+
+
+@contextmanager
+def single_admission():
+    """
+    Charge the session's rate once for all the model calls made in this
+    block, e.g. the concurrent chunk summaries of one long resume: the first
+    call takes the token, and if it cannot, every call is rejected. The calls
+    still queue for the global budgets one by one.
+    """
+    token = _fan_out.set({'charged': None, 'lock': threading.Lock()})
+    try:
+        yield
+    finally:
+        _fan_out.reset(token)
+
+
+def _charge_fan_out(scheduler, session_id):
+    fan_out = _fan_out.get()
+    if fan_out is None or session_id is None:
+        return None
+    with fan_out['lock']:
+        if fan_out['charged'] is None:
+            fan_out['charged'] = scheduler.charge(session_id)
+        return fan_out['charged']
+
+
+def submit_in_context(executor, fn, *args):
+    """
+    executor.submit() that keeps the caller's session scope
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+@contextmanager
+def admitted(prompt):
+    """
+    Hold a scheduler slot for one model call. Yields False when the call is
+    rejected and should fall back to the local analysis.
+    """
+    usage = _session.get()
+    scheduler = _scheduler
+    cancel_token = current_token()
+    session_id = usage.session_id if usage else None
+    charged = _charge_fan_out(scheduler, session_id)
+    if charged is False:
+        waited = None
+    else:
+        waited = scheduler.acquire(
+            session_id,
+            estimate_tokens(prompt),
+            usage.weight if usage else 1.0,
+            cancel_token,
+            charge_session=charged is None
+        )
+    # A call withdrawn because its analysis was cancelled was not throttled
+    if usage is not None and not (waited is None and cancel_token is not None and cancel_token.cancelled):
+        usage.record(waited or 0.0, waited is not None)
+    if waited is None:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        scheduler.release()
@@ -0,0 +1,309 @@
+"""
+Compact, budgeted storage for each session's heavy analysis data.
+
+Snapshots are kept outside st.session_state in a process-wide store, as
+pickled bytes with the resume text compressed and structured data reduced
+to offsets into that text. Each session has a memory budget and the whole
+process a total budget; over budget, the least recently used data is moved
+to disk and loaded back transparently when its session asks for it.
+The data of a session is dropped once Streamlit has closed it, or it has
+been idle for SESSION_IDLE_SECONDS.
+"""
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from utils import metrics
+
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get("SESSION_MEMORY_BUDGET_MB", 2))
+SESSION_TOTAL_MEMORY_MB = float(os.environ.get("SESSION_TOTAL_MEMORY_MB", 256))
+# Data of sessions idle this long is dropped, including any copy on disk
+SESSION_IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", 3600))
+# How often sessions are checked for having been closed, and how long a
+# disconnected session may still reconnect (Streamlit keeps it 2 minutes)
+SESSION_SWEEP_SECONDS = float(os.environ.get("SESSION_SWEEP_SECONDS", 60))
+SESSION_RECONNECT_SECONDS = float(os.environ.get("SESSION_RECONNECT_SECONDS", 120))
+SESSION_SPILL_DIR = os.environ.get(
+    "SESSION_SPILL_DIR", os.path.join(tempfile.gettempdir(), "resume-advisor-sessions")
+)
+
+# Strings shorter than this are cheaper to keep than to reference
+MIN_SPAN_CHARS = 24
+
+
+class TextSpan:
+    """A substring of the resume text, stored as offsets."""
+    __slots__ = ('start', 'end')
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+
+def _to_spans(value, text):
+    if isinstance(value, str):
+        if len(value) >= MIN_SPAN_CHARS:
+            start = text.find(value)
+            if start != -1:
+                return TextSpan(start, start + len(value))
+        return value
+    if isinstance(value, dict):
+        return {key: _to_spans(item, text) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_spans(item, text) for item in value]
+    return value
+
+
+def _from_spans(value, text):
+    if isinstance(value, TextSpan):
+        return text[value.start:value.end]
+    if isinstance(value, dict):
+        return {key: _from_spans(item, text) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_from_spans(item, text) for item in value]
+    return value
+
+
+def compact_snapshot(snapshot):
+    """
+    Compact form of an analysis snapshot (see utils.incremental): compressed
+    resume text, structured data as offsets into it, and the markdown
+    analysis only when there is no typed report to render it from
+    """
+    structured_data = dict(snapshot['structured_data'])
+    text = structured_data.pop('raw_text')
+    compact = dict(snapshot)
+    compact['text'] = zlib.compress(text.encode('utf-8'), 6)
+    compact['structured_data'] = _to_spans(structured_data, text)
+    compact['analysis_text'] = (
+        zlib.compress(snapshot['analysis_text'].encode('utf-8'), 6) if snapshot['report'] is None else None
+    )
+    return compact
+
+
+def expand_snapshot(compact):
+    """
+    Inverse of compact_snapshot()
+    """
+    from utils.report_schema import report_to_markdown
+
+    text = zlib.decompress(compact['text']).decode('utf-8')
+    snapshot = dict(compact)
+    del snapshot['text']
+    snapshot['structured_data'] = _from_spans(compact['structured_data'], text)
+    snapshot['structured_data']['raw_text'] = text
+    if compact['report'] is not None:
+        snapshot['analysis_text'] = report_to_markdown(compact['report'])
+    else:
+        snapshot['analysis_text'] = zlib.decompress(compact['analysis_text']).decode('utf-8')
+    return snapshot
+
+
+class SessionStore:
+    """
+    {(session, key): pickled value} with per-session and total memory
+    budgets. Entries over budget are spilled to disk, least recently used
+    first, and read back on access.
+    """
+
+    def __init__(self, session_budget_bytes, total_budget_bytes, spill_dir, idle_seconds, is_active=None):
+        self.session_budget = session_budget_bytes
+        self.total_budget = total_budget_bytes
+        self.spill_dir = spill_dir
+        self.idle_seconds = idle_seconds
+        # is_active(session_id) is False once the session has disconnected
+        self.is_active = is_active
+        # (session, key) -> {'data': bytes or None, 'size': int, 'path': str or None, 'used': float}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._swept = time.monotonic()
+        # Session -> when it was first seen disconnected
+        self._inactive_since = {}
+
+    def put(self, session_id, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._discard(self._entries.pop((session_id, key), None))
+            self._entries[(session_id, key)] = {'data': data, 'size': len(data), 'path': None, 'used': time.monotonic()}
+            metrics.observe('session_memory_entry_bytes', len(data))
+            self._enforce(session_id)
+
+    def get(self, session_id, key, default=None):
+        with self._lock:
+            entry = self._entries.get((session_id, key))
+            if entry is None:
+                return default
+            self._entries.move_to_end((session_id, key))
+            entry['used'] = time.monotonic()
+            if entry['data'] is None:
+                with open(entry['path'], 'rb') as f:
+                    entry['data'] = f.read()
+                os.remove(entry['path'])
+                entry['path'] = None
+                metrics.increment('session_memory_reloads_total')
+                self._enforce(session_id)
+            data = entry['data']
+        return pickle.loads(data)
+
+    def drop_session(self, session_id):
+        with self._lock:
+            self._drop(session_id)
+            self._update_gauges()
+
+    def _drop(self, session_id):
+        for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == session_id]:
+            self._discard(self._entries.pop(entry_key))
+        self._inactive_since.pop(session_id, None)
+
+    def _sweep_closed(self, now):
+        # A session that stays disconnected past the reconnect window is gone
+        self._swept = now
+        for session_id in {entry_key[0] for entry_key in self._entries}:
+            if self.is_active(session_id):
+                self._inactive_since.pop(session_id, None)
+            elif now - self._inactive_since.setdefault(session_id, now) > SESSION_RECONNECT_SECONDS:
+                self._drop(session_id)
+                metrics.increment('session_memory_closed_sessions_total')
+
+    def _discard(self, entry):
+        if entry and entry['path']:
+            try:
+                os.remove(entry['path'])
+            except OSError:
+                pass
+
+    def _spill(self, entry_key, entry):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.spill_dir, suffix='.session')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(entry['data'])
+        entry['data'] = None
+        entry['path'] = path
+        metrics.increment('session_memory_spills_total')
+
+    def _enforce(self, session_id):
+        now = time.monotonic()
+        for entry_key, entry in list(self._entries.items()):
+            if now - entry['used'] > self.idle_seconds:
+                self._discard(self._entries.pop(entry_key))
+        if self.is_active is not None and now - self._swept >= SESSION_SWEEP_SECONDS:
+            self._sweep_closed(now)
+
+        # Per session: spill this session's older entries, keeping the newest
+        own = [(entry_key, entry) for entry_key, entry in self._entries.items()
+               if entry_key[0] == session_id and entry['data'] is not None]
+        resident = sum(entry['size'] for _, entry in own)
+        for entry_key, entry in own[:-1]:
+            if resident <= self.session_budget:
+                break
+            self._spill(entry_key, entry)
+            resident -= entry['size']
+
+        # Whole process: spill least recently used entries of any session
+        total = sum(entry['size'] for entry in self._entries.values() if entry['data'] is not None)
+        for entry_key, entry in list(self._entries.items())[:-1]:
+            if total <= self.total_budget:
+                break
+            if entry['data'] is not None:
+                self._spill(entry_key, entry)
+                total -= entry['size']
+        self._update_gauges()
+
+    def _update_gauges(self):
+        report = self._report()
+        metrics.set_gauge('session_memory_resident_bytes', report['resident_bytes'])
+        metrics.set_gauge('session_memory_spilled_bytes', report['spilled_bytes'])
+        metrics.set_gauge('session_memory_sessions', len(report['sessions']))
+
+    def _report(self):
+        sessions = {}
+        resident = spilled = 0
+        for (session_id, _), entry in self._entries.items():
+            usage = sessions.setdefault(session_id, {'resident_bytes': 0, 'spilled_bytes': 0})
+            if entry['data'] is not None:
+                usage['resident_bytes'] += entry['size']
+                resident += entry['size']
+            else:
+                usage['spilled_bytes'] += entry['size']
+                spilled += entry['size']
+        return {'resident_bytes': resident, 'spilled_bytes': spilled, 'sessions': sessions}
+
+    def report(self):
+        """
+        {'resident_bytes', 'spilled_bytes', 'sessions': {id: {'resident_bytes', 'spilled_bytes'}}}
+        """
+        with self._lock:
+            return self._report()
+
+
+def _streamlit_session_active(session_id):
+    from streamlit.runtime import Runtime
+    # Without a Streamlit server (scripts, load tests) no session closes
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
+
+
+_store = SessionStore(
+    int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024),
+    int(SESSION_TOTAL_MEMORY_MB * 1024 * 1024),
+    SESSION_SPILL_DIR,
+    SESSION_IDLE_SECONDS,
+    _streamlit_session_active,
+)
+
+
+def get_store():
+    return _store
+
+
+def current_session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+def snapshot_key(depth=None):
+    """
+    Store key of the analysis snapshot kept for each analysis depth
+    """
+    return f"resume_snapshot:{depth}" if depth else 'resume_snapshot'
+
+
+def save_snapshot(snapshot, key='resume_snapshot'):
+    """
+    Store an analysis snapshot for the current Streamlit session
+    """
+    _store.put(current_session_id(), key, compact_snapshot(snapshot))
+
+
+def load_snapshot(key='resume_snapshot'):
+    """
+    The current session's stored snapshot, or None
+    """
+    compact = _store.get(current_session_id(), key)
+    return expand_snapshot(compact) if compact is not None else None
+
+
+def save_value(key, value):
+    """
+    Store any picklable value for the current Streamlit session, within its
+    memory budget
+    """
+    _store.put(current_session_id(), key, value)
+
+
+def load_value(key, default=None):
+    """
+    The current session's value stored under key, or default
+    """
+    return _store.get(current_session_id(), key, default)
+
+
+def memory_report():
+    """
+    Resident and spilled bytes in total and per session
+    """
+    return _store.report()
@@ -0,0 +1,222 @@
+"""
+Speculative analysis of an upload while its options are being chosen.
+
+As soon as a single resume is uploaded, a background thread extracts its
+pages, runs the role-independent local work (see
+utils.incremental.prepare_pages), computes its near-duplicate signature and
+scores it for every role. The analysis for the selected role and depth is
+then run ahead too: always for Standard, which needs no model call, and for
+the other depths with SPECULATIVE_MODEL=1, which spends model quota on
+analyses that may never be asked for.
+
+Analyze claims the speculation of the session's upload and uses whatever
+is done, waiting for work already under way instead of starting it again.
+A different file (or none) cancels the speculation and drops it; a
+different role or depth cancels only the speculative analysis (see
+utils.cancellation).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils import metrics
+from utils.ai_analysis import DEPTH_TIERS, calculate_resume_score, load_role_profile
+from utils.cancellation import AnalysisCancelled, CancellationToken, cancellable, check, current_token
+from utils.history import upload_hash
+from utils.incremental import analyze_revision, prepare_pages
+from utils.near_duplicates import minhash
+from utils.pdf_processor import extract_pages
+from utils.scheduler import session_scope
+from utils.session_store import load_snapshot, snapshot_key
+
+SPECULATIVE_ANALYSIS = os.environ.get("SPECULATIVE_ANALYSIS", "1") != "0"
+# Also run analyses that need the model ahead of the click
+SPECULATIVE_MODEL = os.environ.get("SPECULATIVE_MODEL", "0") == "1"
+# Sessions whose speculation is kept; the least recently started is dropped
+SPECULATION_MAX_SESSIONS = int(os.environ.get("SPECULATION_MAX_SESSIONS", 200))
+SPECULATION_WORKERS = int(os.environ.get("SPECULATION_WORKERS", 4))
+
+# Analyses wait for their upload's preparation, so the two get separate
+# pools: a full analysis pool can never hold up the preparation it waits for
+_prepare_executor = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculation-prepare")
+_analysis_executor = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculation-analysis")
+
+
+def _run(token, fn, *args):
+    # A cancelled run returns None
+    with cancellable(token=token):
+        return fn(*args)
+
+
+def _await(future):
+    """
+    future.result(), waiting no longer than the current analysis runs
+    """
+    started = time.perf_counter()
+    token = current_token()
+    if token is not None:
+        wait([future, token.future], return_when=FIRST_COMPLETED)
+        token.check('speculation')
+    result = future.result()
+    metrics.observe('speculation_wait_seconds', time.perf_counter() - started)
+    return result
+
+
+def _same_previous(first, second):
+    if first is None or second is None:
+        return first is second
+    return first['page_fingerprints'] == second['page_fingerprints'] and first['job_category'] == second['job_category']
+
+
+class Speculation:
+    """
+    Background work on one upload of one session
+    """
+
+    def __init__(self, session_id, file_id, data, job_categories):
+        self.session_id = session_id
+        self.file_id = file_id
+        self.resume_hash = upload_hash(data)
+        self.token = CancellationToken()
+        self._analysis = None
+        self._prepared = _prepare_executor.submit(_run, self.token, self._prepare, data, job_categories)
+
+    def _prepare(self, data, job_categories):
+        started = time.perf_counter()
+        pages = extract_pages(data)
+        del data
+        prepared = prepare_pages(pages)
+        check('parse')
+        if prepared:
+            prepared['signature'] = minhash(prepared['normalized'].text)
+            for job_category in job_categories:
+                check('score')
+                prepared['scores'][job_category] = calculate_resume_score(
+                    prepared['structured_data'], job_category, load_role_profile(job_category)
+                )
+        metrics.observe('speculation_prepare_seconds', time.perf_counter() - started)
+        return pages, prepared
+
+    def _analyze(self, job_category, depth, previous, user_id):
+        wait([self._prepared, current_token().future], return_when=FIRST_COMPLETED)
+        check('speculation')
+        result = self._prepared.result()
+        if result is None or result[1] is None:
+            return None
+        pages, prepared = result
+        with session_scope(self.session_id):
+            return analyze_revision(
+                pages, job_category, previous, depth=depth, user_id=user_id, prepared=prepared
+            )
+
+    def analyze_ahead(self, job_category, depth, user_id):
+        """
+        Run the analysis for this role and depth in the background, replacing
+        one for other options. Reads the session's previous snapshot, so call
+        it from the script thread.
+        """
+        if self._analysis and self._analysis['options'] == (job_category, depth):
+            return
+        self._cancel_analysis()
+        tier = DEPTH_TIERS.get(depth)
+        if not tier or (tier['strategy'] != 'local' and not SPECULATIVE_MODEL):
+            return
+
+        previous = load_snapshot(snapshot_key(depth))
+        token = CancellationToken()
+        self._analysis = {
+            'options': (job_category, depth),
+            'previous': previous,
+            'token': token,
+            'unregister': self.token.on_cancel(lambda: token.cancel('discarded')),
+            'future': _analysis_executor.submit(_run, token, self._analyze, job_category, depth, previous, user_id),
+        }
+        metrics.increment('speculation_analyses_total', depth=depth)
+
+    def _cancel_analysis(self):
+        if self._analysis:
+            self._analysis['unregister']()
+            self._analysis['token'].cancel('discarded')
+            self._analysis = None
+
+    def discard(self):
+        self.token.cancel('discarded')
+
+    def pages(self):
+        """
+        (pages, prepare_pages() result), waiting for extraction if it is still
+        running. Raises PdfProcessingError as extract_pages() does, and
+        AnalysisCancelled if the current analysis is cancelled meanwhile;
+        None if the speculation was discarded.
+        """
+        return _await(self._prepared)
+
+    def analysis(self, job_category, depth, previous):
+        """
+        (snapshot, changes) of the speculative analysis for these options and
+        previous snapshot, waiting for it if it is still running; None if there
+        is none
+        """
+        analysis = self._analysis
+        result = None
+        if analysis and analysis['options'] == (job_category, depth) and _same_previous(analysis['previous'], previous):
+            try:
+                result = _await(analysis['future'])
+            except AnalysisCancelled:
+                raise
+            except Exception as e:
+                # The click analyzes it again
+                print(f"Speculative analysis failed: {e}")
+        metrics.increment('speculation_claims_total', outcome='hit' if result else 'prepared')
+        return result
+
+
+_speculations = OrderedDict()
+_lock = threading.Lock()
+
+
+def speculate(session_id, uploaded_file, job_category, depth, job_categories, user_id):
+    """
+    Start or update the session's speculation for the current upload
+    (uploaded_file is None for no single upload), discarding one for a
+    different file
+    """
+    if not SPECULATIVE_ANALYSIS:
+        return
+    with _lock:
+        speculation = _speculations.get(session_id)
+    if speculation and (uploaded_file is None or speculation.file_id != uploaded_file.file_id):
+        with _lock:
+            if _speculations.get(session_id) is speculation:
+                del _speculations[session_id]
+        speculation.discard()
+        metrics.increment('speculations_total', outcome='discarded')
+        speculation = None
+    if uploaded_file is None:
+        return
+
+    if speculation is None:
+        speculation = Speculation(session_id, uploaded_file.file_id, uploaded_file.getvalue(), job_categories)
+        dropped = []
+        with _lock:
+            _speculations[session_id] = speculation
+            while len(_speculations) > SPECULATION_MAX_SESSIONS:
+                dropped.append(_speculations.popitem(last=False)[1])
+        for old in dropped:
+            old.discard()
+        metrics.increment('speculations_total', outcome='started')
+    speculation.analyze_ahead(job_category, depth, user_id)
+
+
+def claim_speculation(session_id, file_id):
+    """
+    The session's speculation for this upload, or None
+    """
+    with _lock:
+        speculation = _speculations.get(session_id)
+    if speculation is None or speculation.file_id != file_id:
+        metrics.increment('speculation_claims_total', outcome='miss')
+        return None
+    return speculation
@@ -0,0 +1,133 @@
+"""
+Cold-start helpers: deferred warm-up of heavy imports and a startup benchmark.
+
+Run ``python -m utils.startup`` to report import time per module and the
+time for a fresh process to render the page once.
+"""
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Set when app.py first imports this module in a server process
+STARTED_AT = time.perf_counter()
+
+# Modules that are only needed once a resume is analyzed
+HEAVY_MODULES = ["google.generativeai"]
+
+# Modules reported by the benchmark, cheapest first
+BENCHMARK_MODULES = [
+    "components.hero",
+    "components.static",
+    "components.upload",
+    "components.results",
+    "utils.pdf_worker",
+    "utils.pdf_processor",
+    "utils.ai_analysis",
+    "utils.incremental",
+    "streamlit",
+    "pypdf",
+    "google.generativeai",
+]
+
+import_timings = {}
+first_render_ms = None
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+
+def _warm_up():
+    for module in HEAVY_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"[startup] warm-up could not import {module}: {e}")
+            continue
+        import_timings[module] = (time.perf_counter() - started) * 1000
+
+    from utils.ai_analysis import initialize_ai
+    from utils.pdf_worker import warm_pool
+    initialize_ai()
+    warm_pool()
+
+
+def warm_up_in_background():
+    """
+    Import the heavy modules and start the PDF workers in a background thread,
+    once per process. Call after the page has been rendered.
+    """
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+
+def record_first_render():
+    """
+    Record the time from the first import of the app to the end of the first
+    page render in this process.
+    """
+    global first_render_ms
+    if first_render_ms is None:
+        first_render_ms = (time.perf_counter() - STARTED_AT) * 1000
+        print(f"[startup] first render finished {first_render_ms:.0f} ms after app import")
+
+
+def _measure_import(module):
+    """
+    Import a module in a fresh interpreter; returns (self_ms, cumulative_ms)
+    from ``-X importtime`` or None if the import failed.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd()
+    )
+    if result.returncode != 0:
+        return None
+    for line in reversed(result.stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[0].split()[-1]) / 1000, int(parts[1]) / 1000
+    return None
+
+
+def _measure_first_render():
+    """
+    Render app.py once in a fresh interpreter; returns milliseconds or None.
+    """
+    script = (
+        "import time; started = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "AppTest.from_file('app.py', default_timeout=60).run()\n"
+        "print((time.perf_counter() - started) * 1000)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=os.getcwd())
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark():
+    print(f"{'module':<24}{'self ms':>10}{'total ms':>10}")
+    for module in BENCHMARK_MODULES:
+        timing = _measure_import(module)
+        if timing is None:
+            print(f"{module:<24}{'not installed':>20}")
+        else:
+            print(f"{module:<24}{timing[0]:>10.1f}{timing[1]:>10.1f}")
+
+    render_ms = _measure_first_render()
+    if render_ms is None:
+        print("time to first render: unavailable (streamlit not installed or app failed)")
+    else:
+        print(f"time to first render: {render_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,258 @@
+"""
+Line-oriented experience and timeline parser.
+
+One pass over the lines tracks the current section and the entry being
+read, so each line is matched against a single anchored date-range pattern
+instead of scanning the whole text with several regexes. Dates become
+month indexes (year * 12 + month - 1), and gaps, overlaps and total
+experience come from one sweep over the intervals sorted by start.
+"""
+import datetime
+import re
+from functools import lru_cache
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+_DATE = r'(?:(?P<{0}m>jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec)[a-z]*\.?\s+|(?P<{0}n>\d{{1,2}})/)?(?P<{0}y>(?:19|20)\d{{2}})'
+DATE_RANGE = re.compile(
+    r'\b' + _DATE.format('s') + r'\s*(?:-|–|—|to|until)\s*(?:' + _DATE.format('e') + r'|(?P<present>present|current|now|today))\b',
+    re.IGNORECASE
+)
+
+ROLE_WORDS = (
+    'engineer', 'developer', 'manager', 'analyst', 'designer', 'scientist', 'architect', 'lead',
+    'director', 'specialist', 'consultant', 'administrator', 'coordinator', 'officer', 'executive',
+    'technician', 'associate', 'intern', 'head', 'founder', 'programmer', 'researcher'
+)
+BULLETS = ('-', '*', '•', '◦', '▪', '–')
+# Separators between role and company on an entry line, most specific first
+SEPARATORS = (' at ', ' @ ', ' | ', ' – ', ' — ', ' - ', ', ')
+
+# A gap between roles longer than this is reported
+GAP_MONTHS = 6
+# Overlaps up to this long are normal notice-period handovers
+OVERLAP_MONTHS = 2
+# A role dated by year only ends or starts somewhere in that year, so
+# "2019 - 2021" followed by "2021 - 2023" may share up to a whole year
+APPROXIMATE_OVERLAP_MONTHS = 12
+EARLIEST_PLAUSIBLE_YEAR = 1980
+
+
+def _month_index(year, month):
+    return int(year) * 12 + int(month) - 1
+
+
+def format_month(index):
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def parse_month(value):
+    year, month = value.split('-')
+    return _month_index(year, month)
+
+
+def current_month(today=None):
+    today = today or datetime.date.today()
+    return _month_index(today.year, today.month)
+
+
+def _parse_date(match, prefix):
+    year = match.group(prefix + 'y')
+    month_name = match.group(prefix + 'm')
+    month_number = match.group(prefix + 'n')
+    if month_name:
+        return _month_index(year, MONTHS[month_name[:3].lower()]), True
+    if month_number and 1 <= int(month_number) <= 12:
+        return _month_index(year, month_number), True
+    return _month_index(year, 1), False
+
+
+def _is_role(text):
+    lower = text.lower()
+    return any(word in lower for word in ROLE_WORDS)
+
+
+def _split_title(title):
+    """
+    (role, company) from an entry line with its dates removed
+    """
+    title = title.strip(" \t,|-–—:()")
+    for separator in SEPARATORS:
+        if separator in title:
+            first, second = (part.strip(" ,|-–—:()") for part in title.split(separator, 1))
+            if _is_role(second) and not _is_role(first):
+                return second, first
+            return first, second
+    return (title, '') if _is_role(title) else ('', title)
+
+
+@lru_cache(maxsize=1)
+def _heading_lookup():
+    from utils.pdf_processor import SECTION_HEADINGS
+    return {heading: name for name, headings in SECTION_HEADINGS.items() for heading in headings}
+
+
+# Sections whose dates are not work experience
+NON_WORK_SECTIONS = ('education', 'certifications', 'projects', 'skills')
+
+
+def parse_experience(text, today=None):
+    """
+    Extract experience entries in one pass over the lines.
+    Returns [{'role', 'company', 'duration', 'impact', 'start', 'end',
+    'months', 'approximate'}]; start and end are "YYYY-MM" (end is the last
+    month in the role, or "present") and None for entries without dates.
+    A year without a month starts in January or ends in December, and
+    marks the entry approximate.
+    """
+    headings = _heading_lookup()
+    now = current_month(today)
+    lines = text.split('\n')
+    has_experience_heading = any(headings.get(line.strip().rstrip(':').lower()) == 'experience' for line in lines)
+
+    entries = []
+    section = None
+    entry = None
+    # Plain lines since the last entry: the title when dates stand alone
+    pending = []
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        key = line.rstrip(':').lower()
+        if len(key) <= 40 and key in headings:
+            section = headings[key]
+            entry = None
+            pending = []
+            continue
+
+        in_work = section == 'experience' if has_experience_heading else section not in NON_WORK_SECTIONS
+        if not in_work:
+            continue
+
+        if line.startswith(BULLETS):
+            # Bullets belong to the entry above; the first with a number is its impact
+            if entry is not None and entry['impact'] == 'Impact not detailed' and any(c.isdigit() for c in line):
+                entry['impact'] = line.lstrip(''.join(BULLETS) + ' ')
+            continue
+
+        match = DATE_RANGE.search(line)
+        if match:
+            start, start_has_month = _parse_date(match, 's')
+            has_month = True
+            if match.group('present'):
+                end, current = now + 1, True
+            else:
+                end, has_month = _parse_date(match, 'e')
+                # "Mar 2020 - Jun 2021" includes June; "2019 - 2021" includes
+                # all of 2021, or of this year up to this month
+                if has_month:
+                    end += 1
+                elif end // 12 == now // 12:
+                    end = now + 1
+                else:
+                    end += 12
+                current = False
+            role, company = _split_title(line[:match.start()] + ' ' + line[match.end():])
+            if not role and not company and pending:
+                # Dates on a line of their own: the title is on the line(s) above
+                if len(pending) == 1:
+                    role, company = _split_title(pending[0])
+                else:
+                    first, second = pending[-2:]
+                    role, company = (second, first) if _is_role(second) and not _is_role(first) else (first, second)
+                if entries and entries[-1]['start'] is None and entries[-1]['role'] == role:
+                    entries.pop()
+            months = max(0, end - start)
+            entry = {
+                'role': role or 'Role not specified',
+                'company': company or 'Company not specified',
+                'duration': f"{months // 12}y {months % 12}m" if months else 'Duration not specified',
+                'impact': 'Impact not detailed',
+                'start': format_month(start),
+                'end': 'present' if current else format_month(end - 1),
+                'months': months,
+                'approximate': not (start_has_month and has_month),
+            }
+            entries.append(entry)
+            pending = []
+            continue
+
+        if _is_role(line) and ' at ' in f" {line.lower()} ":
+            role, company = _split_title(line)
+            entry = {
+                'role': role or 'Role not specified',
+                'company': company or 'Company not specified',
+                'duration': 'Duration not specified',
+                'impact': 'Impact not detailed',
+                'start': None,
+                'end': None,
+                'months': 0,
+                'approximate': False,
+            }
+            entries.append(entry)
+        pending = (pending + [line])[-2:]
+
+    return entries
+
+
+def _allowed_overlap(first, second):
+    # Roles dated by year only that meet in the same year hand over in it
+    if (first.get('approximate') or second.get('approximate')) and first['end'][:4] == second['start'][:4]:
+        return APPROXIMATE_OVERLAP_MONTHS
+    return OVERLAP_MONTHS
+
+
+def analyze_timeline(entries, today=None):
+    """
+    Sweep the dated entries in start order.
+    Returns {'total_months', 'gaps', 'overlaps', 'future', 'inverted',
+    'earliest_year'}: total_months counts time covered by at least one role,
+    gaps and overlaps are (first entry, second entry, months) tuples.
+    """
+    now = current_month(today)
+    intervals = []
+    for entry in entries:
+        if entry.get('start') is None:
+            continue
+        start = parse_month(entry['start'])
+        end = now + 1 if entry['end'] == 'present' else parse_month(entry['end']) + 1
+        intervals.append((start, end, entry))
+    intervals.sort(key=lambda interval: interval[0])
+
+    result = {
+        'total_months': 0,
+        'gaps': [],
+        'overlaps': [],
+        'future': [entry for start, end, entry in intervals if start > now or end > now + 1],
+        'inverted': [entry for start, end, entry in intervals if end <= start],
+        'earliest_year': intervals[0][0] // 12 if intervals else None,
+    }
+
+    # Invalid intervals are reported above and left out of the sweep
+    invalid = {id(entry) for entry in result['future'] + result['inverted']}
+    covered_until = None
+    latest = None
+    for start, end, entry in intervals:
+        if id(entry) in invalid:
+            continue
+        if covered_until is None:
+            result['total_months'] += end - start
+        elif start >= covered_until:
+            if start - covered_until > GAP_MONTHS:
+                result['gaps'].append((latest, entry, start - covered_until))
+            result['total_months'] += end - start
+        else:
+            overlap = min(end, covered_until) - start
+            if overlap > _allowed_overlap(latest, entry):
+                result['overlaps'].append((latest, entry, overlap))
+            result['total_months'] += max(0, end - covered_until)
+        if covered_until is None or end > covered_until:
+            covered_until, latest = end, entry
+
+    return result